@@ -0,0 +1,130 @@
+"""
+Response cache of drawn-area analyses, keyed on a canonical polygon hash.
+
+The same zone is often submitted again (re-clicks, page reloads, shared links),
+with the ring closed or not, drawn in the other direction or starting from
+another vertex. The polygon is canonicalized before hashing so that all these
+variants hit the same entry:
+
+- coordinates quantized to a fixed grid (1e-5° by default, about 1 m)
+- closing vertex and consecutive duplicates dropped
+- winding normalized to counter-clockwise
+- ring rotated to start at its smallest vertex
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tools.map_actions import normalize_address
+
+DEFAULT_PRECISION = 5
+DEFAULT_MAX_ENTRIES = int(os.getenv("REVAGENT_AREA_CACHE_SIZE", "256"))
+DEFAULT_TTL_S = float(os.getenv("REVAGENT_AREA_CACHE_TTL_S", "3600"))
+
+
+def canonical_polygon(coordinates: Sequence[Sequence[float]], precision: int = DEFAULT_PRECISION) -> List[Tuple[int, int]]:
+    """
+    Canonical form of a polygon ring.
+
+    Args:
+        coordinates: Ring as [lng, lat] pairs, closed or not
+        precision: Decimal places kept (quantization grid)
+
+    Returns:
+        List: Quantized (lng, lat) integer vertices, counter-clockwise,
+        starting at the smallest vertex
+    """
+    scale = 10 ** precision
+    ring: List[Tuple[int, int]] = []
+    for point in coordinates:
+        vertex = (round(point[0] * scale), round(point[1] * scale))
+        if not ring or ring[-1] != vertex:
+            ring.append(vertex)
+    while len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+    if len(ring) < 3:
+        return ring
+
+    # Shoelace formula: negative signed area means clockwise
+    signed_area = sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(len(ring)))
+    if signed_area < 0:
+        ring.reverse()
+
+    # Smallest rotation among those starting at the smallest vertex (a vertex can repeat)
+    smallest = min(ring)
+    return min(ring[i:] + ring[:i] for i, vertex in enumerate(ring) if vertex == smallest)
+
+
+def polygon_hash(coordinates: Sequence[Sequence[float]], address: str = "", precision: int = DEFAULT_PRECISION) -> str:
+    """
+    Hash of a polygon (canonical form) and its normalized address.
+    """
+    payload = json.dumps([canonical_polygon(coordinates, precision), normalize_address(address)], separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class AreaResponseCache:
+    """
+    LRU cache of analysis responses with a time-to-live.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached response, or None if missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_s:
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """
+        Stores a response, evicting the least recently used ones above max_entries.
+        """
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns counters on the cache activity."""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+# Shared instance used by /analyze-area
+area_cache = AreaResponseCache()
@@ -0,0 +1,142 @@
+"""
+Deterministic fast-path router for simple map commands.
+
+Requests such as "go to République Paris", "clear the markers" or
+"find apartments under 400000€ in Lyon" map one-to-one onto a map tool.
+They are parsed here with a small grammar and executed directly, without
+an orchestrator LLM round trip. Anything that does not match falls back
+to RevAgent.
+"""
+
+import re
+from typing import Optional
+
+from tools.map_actions import (
+    geocode_address,
+    navigate_to_address_action,
+    search_properties_action,
+    clear_map_markers_action,
+)
+
+# Words hinting that the message asks for more than a map command
+_AGENT_ONLY_HINTS = re.compile(
+    r"\b(and|then|et|puis|risk|risque|analy[sz]e|flood|inondation|heat|canicule|"
+    r"project|projet|construction|why|pourquoi|how|comment)\b|\?",
+    re.IGNORECASE,
+)
+
+_CLEAR_PATTERN = re.compile(
+    r"^(?:"
+    r"(?:please\s+)?(?:clear|remove|delete|reset|erase)\s+(?:all\s+)?(?:the\s+)?(?:map\s+)?"
+    r"(?:markers?|pins?)(?:\s+(?:on|from)\s+the\s+map)?"
+    r"|(?:efface|effacer|supprime|supprimer|enl[eè]ve|enlever|retire|retirer)\s+"
+    r"(?:tous\s+)?(?:les\s+)?(?:marqueurs?|points?)(?:\s+de\s+la\s+carte)?"
+    r")\.?$",
+    re.IGNORECASE,
+)
+
+_SEARCH_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:find|search(?:\s+for)?|look\s+for|show(?:\s+me)?|list|"
+    r"cherche|chercher|trouve|trouver|montre(?:-moi)?)\s+"
+    r"(?:me\s+)?(?:an?\s+|some\s+|des\s+|un\s+|une\s+)?"
+    r"(?P<type>apartments?|flats?|houses?|studios?|appartements?|maisons?)\s+"
+    r"(?:under|below|for\s+less\s+than|less\s+than|up\s+to|max(?:imum)?|sous|"
+    r"[aà]\s+moins\s+de|moins\s+de|jusqu'?[aà])\s+"
+    r"(?P<price>\d[\d\s.,]*)\s*(?P<unit>k|m|mio|€|eur|euros?)?\s*€?\s+"
+    r"(?:in|at|around|near|[aà]|dans|vers|autour\s+de)\s+(?P<location>.+?)\.?$",
+    re.IGNORECASE,
+)
+
+_NAVIGATE_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:go\s+to|navigate\s+to|take\s+me\s+to|fly\s+to|center\s+(?:the\s+map\s+)?on|"
+    r"zoom\s+(?:in\s+)?(?:on|to)|va\s+[aà]|vas\s+[aà]|aller\s+[aà]|allons\s+[aà]|emm[eè]ne(?:-|\s)moi\s+[aà]|"
+    r"centre\s+(?:la\s+carte\s+)?sur)\s+(?P<address>.+?)\.?$",
+    re.IGNORECASE,
+)
+
+_PROPERTY_TYPES = {
+    "apartment": "apartment",
+    "flat": "apartment",
+    "appartement": "apartment",
+    "house": "house",
+    "maison": "house",
+    "studio": "studio",
+}
+
+
+def _parse_price(raw: str, unit: Optional[str]) -> Optional[int]:
+    """Parses "400000", "400 000", "400k" or "1.2m" into euros."""
+    digits = raw.strip().replace(" ", "").replace(" ", "")
+    multiplier = 1
+    if unit and unit.lower() == "k":
+        multiplier = 1_000
+    elif unit and unit.lower() in ("m", "mio"):
+        multiplier = 1_000_000
+
+    if multiplier == 1:
+        # Thousand separators: "400,000" / "400.000"
+        digits = digits.replace(",", "").replace(".", "")
+    else:
+        digits = digits.replace(",", ".")
+
+    try:
+        return int(float(digits) * multiplier)
+    except ValueError:
+        return None
+
+
+def _singular(word: str) -> str:
+    word = word.lower()
+    return word[:-1] if word.endswith("s") else word
+
+
+def route_command(user_message: str) -> Optional[str]:
+    """
+    Executes a simple map command directly when the message matches one.
+
+    Args:
+        user_message: Message de l'utilisateur
+
+    Returns:
+        The templated response text, or None when the message must go to RevAgent
+    """
+    message = " ".join(user_message.strip().split())
+    if not message or len(message) > 160:
+        return None
+
+    # Compound or analytical requests need the agent, whatever command they start with
+    if _AGENT_ONLY_HINTS.search(message):
+        return None
+
+    if _CLEAR_PATTERN.match(message):
+        clear_map_markers_action()
+        return "I cleared all the markers from the map."
+
+    match = _SEARCH_PATTERN.match(message)
+    if match:
+        max_price = _parse_price(match.group("price"), match.group("unit"))
+        location = match.group("location").strip()
+        property_type = _PROPERTY_TYPES.get(_singular(match.group("type")))
+        if not max_price or not property_type or geocode_address(location) is None:
+            return None
+
+        action = search_properties_action(max_price, location, property_type, 1)
+        results = action.search_results or []
+        lines = [f"I found {len(results)} {property_type}(s) under {max_price:,}€ in {location} and placed them on the map."]
+        for prop in results[:5]:
+            lines.append(f"- {prop['address']}: {prop['rooms']} rooms, {prop['surface']} m², {prop['price']:,}€")
+        if len(results) > 5:
+            lines.append(f"- ... and {len(results) - 5} more on the map.")
+        return "\n".join(lines)
+
+    match = _NAVIGATE_PATTERN.match(message)
+    if match:
+        address = match.group("address").strip()
+        # Unknown places are left to the agent, which can geocode remotely
+        if geocode_address(address) is None:
+            return None
+
+        navigate_to_address_action(address)
+        return f"I centered the map on {address}."
+
+    return None
@@ -4,17 +4,19 @@ Specialized agent for future construction and infrastructure projects analysis.
 
 from agents import Agent, Runner, WebSearchTool
 from agents.tool import function_tool
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from tools.geocoding import geocode_address
+from .singleflight import analysis_flight, analysis_key
+from .model_backend import get_run_config
+from .deadline import run_with_deadline, SUB_AGENT_BUDGET_SHARE
+from .scheduler import run_scheduler
+from .hedging import run_hedger
+from .registry import agent_registry
+from .sections import section_producer
 from models.zone_analysis import FutureConstructionData, ConstructionProject
 
-from datetime import datetime
-
-current_date = datetime.now()
 
 @function_tool
+@section_producer("future_construction")
 async def analyze_future_construction(zone_address: str) -> FutureConstructionData:
     """
     Analyze future construction projects in a given area.
@@ -25,14 +27,30 @@ async def analyze_future_construction(zone_address: str) -> FutureConstructionDa
     Returns:
         FutureConstructionData: Structured data on future construction projects
     """
-    agent = create_construction_agent()
+    return await analysis_flight.run(
+        analysis_key("future_construction", zone_address),
+        lambda: _run_agent(zone_address),
+    )
+
+
+async def _run_agent(zone_address: str) -> FutureConstructionData:
+    # Duplicated if slower than usual (opt-in, REVAGENT_HEDGE_AGENTS)
+    return await run_hedger.run("construction", lambda: _run_agent_once(zone_address))
+
 
-    result = await Runner.run(agent, f"Here is the area {zone_address}, return your analysis",max_turns=3,)
+async def _run_agent_once(zone_address: str) -> FutureConstructionData:
+    # Slot in the sub-agent pool, then only a share of the request budget:
+    # the orchestrator still has to answer
+    async with run_scheduler.sub_agent_run():
+        result = await run_with_deadline(
+            Runner.run(agent_registry.get("construction"), f"Here is the area {zone_address}, return your analysis",max_turns=3, run_config=get_run_config()),
+            share=SUB_AGENT_BUDGET_SHARE,
+        )
 
     return result.final_output
 
 
-CONSTRUCTION_AGENT_PROMPT = f"""
+CONSTRUCTION_AGENT_PROMPT = """
 You analyze future construction projects for a given area.
 
 TASK: Quickly return a FutureConstructionData object with:
@@ -0,0 +1,107 @@
+"""
+Request deadlines propagated from the API layer to the sub-agent runs.
+
+The API opens a deadline scope for each request. The deadline lives in a
+ContextVar, so it follows the orchestrator run into the tool calls and the
+nested sub-agent runs, which only get a share of the remaining budget.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+# Default budget of a request when the client does not send X-Request-Timeout
+DEFAULT_REQUEST_TIMEOUT_S = float(os.getenv("REVAGENT_REQUEST_TIMEOUT_S", "180"))
+
+# Share of the remaining budget given to a sub-agent run; the rest is kept
+# for the orchestrator to write its answer once the tool returns.
+SUB_AGENT_BUDGET_SHARE = 0.8
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a request runs out of time budget."""
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) after which work must stop."""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def child(self, share: float) -> "Deadline":
+        """Deadline for nested work allowed to use `share` of the remaining budget."""
+        return Deadline(time.monotonic() + self.remaining() * share)
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("revagent_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Returns the deadline of the current request, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Makes `deadline` the current deadline (a tighter parent deadline wins)."""
+    parent = _current_deadline.get()
+    if deadline is None or (parent is not None and parent.expires_at < deadline.expires_at):
+        deadline = parent
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline():
+    """Cooperative cancellation point: raises if the current deadline has passed."""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+async def run_with_deadline(awaitable: Awaitable[Any], share: float = 1.0) -> Any:
+    """
+    Awaits `awaitable` within `share` of the remaining budget of the current request.
+
+    Args:
+        awaitable: Coroutine to run (e.g. a Runner.run)
+        share: Fraction of the remaining budget it may use
+
+    Returns:
+        The result of the awaitable
+
+    Raises:
+        DeadlineExceeded: if the budget runs out first
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return await awaitable
+
+    child = deadline.child(share)
+    if child.expired:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+
+    with deadline_scope(child):
+        try:
+            return await asyncio.wait_for(awaitable, timeout=child.remaining())
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("Request deadline exceeded") from e
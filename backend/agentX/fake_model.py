@@ -0,0 +1,349 @@
+"""
+Offline fake model provider replaying recorded agent traces.
+
+Used to run the full pipeline (ChatSession, tools, SSE) deterministically and
+without network: every model call is answered from a trace file or from a
+scripted policy, with configurable latency and streaming-delta timing.
+
+Trace file format (JSON):
+
+    {
+      "latency_ms": 200,            # delay before the first event of a turn
+      "delta_interval_ms": 15,      # delay between two streamed text deltas
+      "delta_chars": 12,            # size of a streamed text delta
+      "scripts": [
+        {
+          "instructions_contains": "You are RevAgent",   # optional
+          "input_contains": "flood",                     # optional
+          "turns": [
+            {"tool_calls": [{"name": "analyze_flood_risk", "arguments": {"zone_address": "Lyon"}}]},
+            {"text": "Flood risk in Lyon is moderate."}
+          ]
+        },
+        {
+          "instructions_contains": "You analyze flood risks",
+          "turns": [{"output": {"risk_level": "medium", "...": "..."}}]
+        }
+      ]
+    }
+
+A turn is either a list of tool calls, a text answer or a structured output.
+Unscripted calls fall back to the default policy, which answers plain text or
+a schema-valid placeholder for agents with an output_type.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from agents import Model, ModelProvider, ModelResponse, ModelSettings, ModelTracing, Usage
+from agents.agent_output import AgentOutputSchemaBase
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseContentPartDoneEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseTextDoneEvent,
+    ResponseUsage,
+)
+
+# Prefix of generated call ids, used to find the current turn from the input
+_CALL_ID_PREFIX = "fake_call_"
+
+
+class FakeRequest:
+    """What the fake model knows about a model call."""
+
+    def __init__(self, instructions: str, input_items: List[Any], output_schema: Optional[AgentOutputSchemaBase], tool_names: List[str]):
+        self.instructions = instructions
+        self.input_items = input_items
+        self.output_schema = output_schema
+        self.tool_names = tool_names
+        self.user_message = _last_user_message(input_items)
+        self.turn = _current_turn(input_items)
+
+
+# A policy maps a request to a turn dict ({"tool_calls": ...}, {"text": ...} or {"output": ...})
+Policy = Callable[[FakeRequest], Dict[str, Any]]
+
+
+def _item_get(item: Any, key: str, default: Any = None) -> Any:
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+def _last_user_message(input_items: List[Any]) -> str:
+    for item in reversed(input_items):
+        if _item_get(item, "role") == "user":
+            content = _item_get(item, "content", "")
+            if isinstance(content, str):
+                return content
+            return " ".join(str(_item_get(part, "text", "")) for part in content)
+    return ""
+
+
+def _current_turn(input_items: List[Any]) -> int:
+    """Number of fake turns already answered since the last user message."""
+    turn = 0
+    for item in reversed(input_items):
+        if _item_get(item, "role") == "user":
+            break
+        call_id = _item_get(item, "call_id") or ""
+        if _item_get(item, "type") == "function_call" and call_id.startswith(_CALL_ID_PREFIX):
+            turn = max(turn, int(call_id[len(_CALL_ID_PREFIX):].split("_")[0]) + 1)
+    return turn
+
+
+def _example_from_schema(schema: Dict[str, Any], defs: Dict[str, Any]) -> Any:
+    """Builds a placeholder value that validates against a JSON schema."""
+    if "$ref" in schema:
+        return _example_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "anyOf" in schema:
+        return _example_from_schema(schema["anyOf"][0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "default" in schema and schema["default"] is not None:
+        return schema["default"]
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = schema_type[0]
+    if schema_type == "object":
+        return {key: _example_from_schema(value, defs) for key, value in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return []
+    if schema_type == "string":
+        return "n/a"
+    if schema_type in ("number", "integer"):
+        return 0
+    if schema_type == "boolean":
+        return False
+    return None
+
+
+def default_policy(request: FakeRequest) -> Dict[str, Any]:
+    """Answers without calling tools: schema placeholder or echo text."""
+    if request.output_schema is not None and not request.output_schema.is_plain_text():
+        schema = request.output_schema.json_schema()
+        return {"output": _example_from_schema(schema, schema.get("$defs", {}))}
+    return {"text": f"[offline] {request.user_message[:200]}"}
+
+
+class TracePolicy:
+    """Replays scripted turns from a trace, matched on instructions and user input."""
+
+    def __init__(self, scripts: List[Dict[str, Any]], fallback: Policy = default_policy):
+        self.scripts = scripts
+        self.fallback = fallback
+
+    @classmethod
+    def from_file(cls, path: str) -> "TracePolicy":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f).get("scripts", []))
+
+    def __call__(self, request: FakeRequest) -> Dict[str, Any]:
+        for script in self.scripts:
+            if script.get("instructions_contains", "") not in request.instructions:
+                continue
+            if script.get("input_contains", "").lower() not in request.user_message.lower():
+                continue
+            turns = script.get("turns", [])
+            if request.turn < len(turns):
+                return turns[request.turn]
+        return self.fallback(request)
+
+
+class FakeModel(Model):
+    """Model answering from a policy instead of calling OpenAI."""
+
+    def __init__(
+        self,
+        policy: Policy = default_policy,
+        latency_ms: float = 0.0,
+        delta_interval_ms: float = 0.0,
+        delta_chars: int = 12,
+    ):
+        self.policy = policy
+        self.latency_ms = latency_ms
+        self.delta_interval_ms = delta_interval_ms
+        self.delta_chars = max(1, delta_chars)
+
+    def _next_turn(self, system_instructions, input, tools, output_schema) -> Tuple[FakeRequest, Dict[str, Any]]:
+        input_items = [{"role": "user", "content": input}] if isinstance(input, str) else list(input)
+        request = FakeRequest(
+            instructions=system_instructions or "",
+            input_items=input_items,
+            output_schema=output_schema,
+            tool_names=[getattr(tool, "name", "") for tool in tools],
+        )
+        return request, self.policy(request)
+
+    def _build_output(self, request: FakeRequest, turn: Dict[str, Any]) -> List[Any]:
+        if "tool_calls" in turn:
+            return [
+                ResponseFunctionToolCall(
+                    id=f"fc_{uuid.uuid4().hex[:12]}",
+                    call_id=f"{_CALL_ID_PREFIX}{request.turn}_{index}_{uuid.uuid4().hex[:8]}",
+                    name=call["name"],
+                    arguments=json.dumps(call.get("arguments", {}), ensure_ascii=False),
+                    type="function_call",
+                    status="completed",
+                )
+                for index, call in enumerate(turn["tool_calls"])
+            ]
+
+        text = turn["text"] if "text" in turn else json.dumps(turn.get("output", {}), ensure_ascii=False)
+        return [
+            ResponseOutputMessage(
+                id=f"msg_{uuid.uuid4().hex[:12]}",
+                content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+                role="assistant",
+                status="completed",
+                type="message",
+            )
+        ]
+
+    @staticmethod
+    def _usage(request: FakeRequest, output: List[Any]) -> Usage:
+        # Rough token estimate (4 chars/token) so usage accounting stays meaningful
+        input_tokens = (len(request.instructions) + len(json.dumps(request.input_items, default=str))) // 4
+        output_tokens = len(json.dumps([item.model_dump() for item in output])) // 4
+        return Usage(requests=1, input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens)
+
+    async def get_response(
+        self,
+        system_instructions: Optional[str],
+        input: Any,
+        model_settings: ModelSettings,
+        tools: List[Any],
+        output_schema: Optional[AgentOutputSchemaBase],
+        handoffs: List[Any],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        prompt: Any = None,
+    ) -> ModelResponse:
+        request, turn = self._next_turn(system_instructions, input, tools, output_schema)
+        await asyncio.sleep(turn.get("latency_ms", self.latency_ms) / 1000)
+        output = self._build_output(request, turn)
+        return ModelResponse(output=output, usage=self._usage(request, output), response_id=f"resp_{uuid.uuid4().hex[:12]}")
+
+    async def stream_response(
+        self,
+        system_instructions: Optional[str],
+        input: Any,
+        model_settings: ModelSettings,
+        tools: List[Any],
+        output_schema: Optional[AgentOutputSchemaBase],
+        handoffs: List[Any],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        prompt: Any = None,
+    ) -> AsyncIterator[Any]:
+        request, turn = self._next_turn(system_instructions, input, tools, output_schema)
+        output = self._build_output(request, turn)
+        usage = self._usage(request, output)
+        response = Response(
+            id=f"resp_{uuid.uuid4().hex[:12]}",
+            created_at=time.time(),
+            model="fake",
+            object="response",
+            output=[],
+            parallel_tool_calls=True,
+            tool_choice="auto",
+            tools=[],
+        )
+        sequence = 0
+
+        def next_sequence() -> int:
+            nonlocal sequence
+            sequence += 1
+            return sequence
+
+        await asyncio.sleep(turn.get("latency_ms", self.latency_ms) / 1000)
+        yield ResponseCreatedEvent(response=response, type="response.created", sequence_number=next_sequence())
+
+        delta_interval = turn.get("delta_interval_ms", self.delta_interval_ms) / 1000
+        for output_index, item in enumerate(output):
+            if isinstance(item, ResponseOutputMessage):
+                text = item.content[0].text
+                empty_message = item.model_copy(update={"content": [], "status": "in_progress"})
+                yield ResponseOutputItemAddedEvent(item=empty_message, output_index=output_index, type="response.output_item.added", sequence_number=next_sequence())
+                yield ResponseContentPartAddedEvent(
+                    content_index=0, item_id=item.id, output_index=output_index,
+                    part=ResponseOutputText(text="", type="output_text", annotations=[]),
+                    type="response.content_part.added", sequence_number=next_sequence(),
+                )
+                for start in range(0, len(text), self.delta_chars):
+                    if start and delta_interval:
+                        await asyncio.sleep(delta_interval)
+                    yield ResponseTextDeltaEvent(
+                        content_index=0, delta=text[start:start + self.delta_chars], item_id=item.id,
+                        output_index=output_index, logprobs=[], type="response.output_text.delta",
+                        sequence_number=next_sequence(),
+                    )
+                yield ResponseTextDoneEvent(
+                    content_index=0, item_id=item.id, output_index=output_index, text=text, logprobs=[],
+                    type="response.output_text.done", sequence_number=next_sequence(),
+                )
+                yield ResponseContentPartDoneEvent(
+                    content_index=0, item_id=item.id, output_index=output_index, part=item.content[0],
+                    type="response.content_part.done", sequence_number=next_sequence(),
+                )
+            else:
+                yield ResponseOutputItemAddedEvent(item=item, output_index=output_index, type="response.output_item.added", sequence_number=next_sequence())
+            yield ResponseOutputItemDoneEvent(item=item, output_index=output_index, type="response.output_item.done", sequence_number=next_sequence())
+
+        completed = response.model_copy(update={
+            "output": output,
+            "status": "completed",
+            # model_construct: the details fields differ between openai versions
+            "usage": ResponseUsage.model_construct(
+                input_tokens=usage.input_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens=usage.output_tokens,
+                output_tokens_details=usage.output_tokens_details,
+                total_tokens=usage.total_tokens,
+            ),
+        })
+        yield ResponseCompletedEvent(response=completed, type="response.completed", sequence_number=next_sequence())
+
+
+class FakeModelProvider(ModelProvider):
+    """Model provider returning the same FakeModel for every agent."""
+
+    def __init__(self, model: Optional[FakeModel] = None):
+        self.model = model or FakeModel()
+
+    @classmethod
+    def from_trace(cls, path: Optional[str] = None, **overrides: Any) -> "FakeModelProvider":
+        """
+        Creates a provider replaying a trace file (or the default policy if no file).
+
+        Timing options come from the trace file, then from `overrides`.
+        """
+        settings: Dict[str, Any] = {}
+        policy: Policy = default_policy
+        if path:
+            with open(path, encoding="utf-8") as f:
+                trace = json.load(f)
+            policy = TracePolicy(trace.get("scripts", []))
+            settings = {key: trace[key] for key in ("latency_ms", "delta_interval_ms", "delta_chars") if key in trace}
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(FakeModel(policy=policy, **settings))
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.model
@@ -2,19 +2,27 @@
 Specialized agent for flood risk analysis.
 """
 
+import asyncio
 from agents import Agent, Runner, WebSearchTool
 from agents.tool import function_tool
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from tools.geocoding import geocode_address
+from tools.geocoding import geocode_address, locate
+from geodata.cell_summary import get_cell_summaries
+from geodata.flood_overlay import flood_risk_from_coverage, get_flood_overlay
+from geodata.geometry import circle_ring, current_polygon
+from .singleflight import analysis_flight, analysis_key
+from .model_backend import get_run_config
+from .deadline import run_with_deadline, SUB_AGENT_BUDGET_SHARE
+from .scheduler import run_scheduler
+from .hedging import run_hedger
+from .registry import agent_registry
+from .sections import section_producer
 from models.zone_analysis import FloodRiskData, RiskLevel
-from datetime import datetime
 
-current_date = datetime.now()
+# Zone analyzed around a geocoded address (no drawn polygon)
+POINT_ZONE_RADIUS_M = 300
 
 
-FLOOD_RISK_AGENT_PROMPT = f"""
+FLOOD_RISK_AGENT_PROMPT = """
 You analyze flood risks for a given area.
 
 TASK: Quickly return a FloodRiskData object with:
@@ -47,9 +55,9 @@ def create_flood_risk_agent() -> Agent:
         ],
     )
 
-agent = create_flood_risk_agent()
 
 @function_tool
+@section_producer("flood_risk")
 async def analyze_flood_risk(zone_address: str) -> FloodRiskData:
     """
     Analyze flood risks for a given area.
@@ -60,8 +68,49 @@ async def analyze_flood_risk(zone_address: str) -> FloodRiskData:
     Returns:
         FloodRiskData: Structured data on flood risks
     """
+    # Answer from the local TRI flood maps when they cover the area (no LLM call):
+    # the drawn zone of the request, else the precomputed cell of the address,
+    # else a circle around the address
+    overlay, cells = get_flood_overlay(), get_cell_summaries()
+    zone = current_polygon()
+    point = None
+    if zone is None and (overlay is not None or cells is not None):
+        point = await asyncio.to_thread(locate, zone_address)
+    if point is not None and cells is not None:
+        # Shards and memory-mapped tables may be read from disk: off the event loop
+        coverage = await asyncio.to_thread(cells.flood_coverage, point[0], point[1])
+        if coverage is not None:
+            flood_risk = flood_risk_from_coverage(*coverage)
+            print(f"[DEBUG] Flood risk for {zone_address} from the cell summaries: {coverage[0]}")
+            return flood_risk
+    if overlay is not None:
+        ring = zone.coordinates if zone is not None else None
+        if ring is None and point is not None:
+            ring = circle_ring(point[1], point[0], POINT_ZONE_RADIUS_M)
+        if ring is not None:
+            flood_risk = await asyncio.to_thread(overlay.flood_risk, ring)
+            if flood_risk is not None:
+                print(f"[DEBUG] Flood risk for {zone_address} from TRI overlay: {[(c.scenario, c.coverage_percent) for c in flood_risk.flood_zone_coverage]}")
+                return flood_risk
     
-    
-    result = await Runner.run(agent, f"Here is the area {zone_address}, return your analysis",max_turns=3)
+    return await analysis_flight.run(
+        analysis_key("flood_risk", zone_address),
+        lambda: _run_agent(zone_address),
+    )
+
+
+async def _run_agent(zone_address: str) -> FloodRiskData:
+    # Duplicated if slower than usual (opt-in, REVAGENT_HEDGE_AGENTS)
+    return await run_hedger.run("flood_risk", lambda: _run_agent_once(zone_address))
+
+
+async def _run_agent_once(zone_address: str) -> FloodRiskData:
+    # Slot in the sub-agent pool, then only a share of the request budget:
+    # the orchestrator still has to answer
+    async with run_scheduler.sub_agent_run():
+        result = await run_with_deadline(
+            Runner.run(agent_registry.get("flood_risk"), f"Here is the area {zone_address}, return your analysis",max_turns=3, run_config=get_run_config()),
+            share=SUB_AGENT_BUDGET_SHARE,
+        )
     
     return result.final_output
\ No newline at end of file
@@ -2,22 +2,22 @@
 Specialized agent for heat wave risk analysis.
 """
 
+import asyncio
 from agents import Agent, Runner, WebSearchTool
 from agents.tool import function_tool
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from tools.geocoding import geocode_address
+from tools.geocoding import geocode_address, locate
+from geodata.climate_store import get_climate_store
+from .singleflight import analysis_flight, analysis_key
+from .model_backend import get_run_config
+from .deadline import run_with_deadline, SUB_AGENT_BUDGET_SHARE
+from .scheduler import run_scheduler
+from .hedging import run_hedger
+from .registry import agent_registry
+from .sections import section_producer
 from models.zone_analysis import HeatWaveRiskData, RiskLevel
-from datetime import datetime
 
-current_date = datetime.now()
 
-
-
-
-
-HEAT_WAVE_AGENT_PROMPT = f"""
+HEAT_WAVE_AGENT_PROMPT = """
 You analyze heat wave risks for a given area.
 
 TASK: Quickly return a HeatWaveRiskData object with:
@@ -50,9 +50,9 @@ def create_heat_wave_agent() -> Agent:
         ],
     )
 
-agent = create_heat_wave_agent()
 
 @function_tool
+@section_producer("heat_wave_risk")
 async def analyze_heat_wave_risk(zone_address: str) -> HeatWaveRiskData:
     """
     Analyze heat wave risks for a given area.
@@ -64,6 +64,35 @@ async def analyze_heat_wave_risk(zone_address: str) -> HeatWaveRiskData:
         HeatWaveRiskData: Structured data on heat wave risks
     """
     
-    result = await Runner.run(agent, f"Here is the area {zone_address}, return your analysis",max_turns=3)
+    # Answer from the local climate grids when they cover the area (no LLM call)
+    store = get_climate_store()
+    if store is not None:
+        point = await asyncio.to_thread(locate, zone_address)
+        if point is not None:
+            # Shards may be loaded from disk: off the event loop
+            risk = await asyncio.to_thread(store.heat_wave_risk, *point)
+            if risk is not None:
+                print(f"[DEBUG] Heat wave risk for {zone_address} from climate grid at {point}")
+                return risk
+    
+    return await analysis_flight.run(
+        analysis_key("heat_wave_risk", zone_address),
+        lambda: _run_agent(zone_address),
+    )
+
+
+async def _run_agent(zone_address: str) -> HeatWaveRiskData:
+    # Duplicated if slower than usual (opt-in, REVAGENT_HEDGE_AGENTS)
+    return await run_hedger.run("heat_wave", lambda: _run_agent_once(zone_address))
+
+
+async def _run_agent_once(zone_address: str) -> HeatWaveRiskData:
+    # Slot in the sub-agent pool, then only a share of the request budget:
+    # the orchestrator still has to answer
+    async with run_scheduler.sub_agent_run():
+        result = await run_with_deadline(
+            Runner.run(agent_registry.get("heat_wave"), f"Here is the area {zone_address}, return your analysis",max_turns=3, run_config=get_run_config()),
+            share=SUB_AGENT_BUDGET_SHARE,
+        )
     
     return result.final_output
\ No newline at end of file
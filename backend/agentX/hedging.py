@@ -0,0 +1,148 @@
+"""
+Hedged sub-agent runs, to cut the latency tail.
+
+Most sub-agent runs take a few seconds, but an occasional slow model or web
+search response takes many times longer and sets the p99 of the whole
+analysis. For the agents where hedging is enabled, a run that has not finished
+by a percentile of the recent latencies of that agent gets a duplicate; the
+first one to finish wins and the other is cancelled.
+
+- Opt-in per agent: REVAGENT_HEDGE_AGENTS="flood_risk,heat_wave" (empty: off)
+- Trigger: REVAGENT_HEDGE_PERCENTILE (default 95) of the last latencies, once
+  REVAGENT_HEDGE_MIN_SAMPLES runs (default 20) have been observed
+- Budget: duplicates are at most REVAGENT_HEDGE_BUDGET (default 0.05) of the
+  runs of the agent, and only started when a sub-agent slot is free
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from .scheduler import run_scheduler
+
+DEFAULT_HEDGE_AGENTS = frozenset(name.strip() for name in os.getenv("REVAGENT_HEDGE_AGENTS", "").split(",") if name.strip())
+DEFAULT_HEDGE_PERCENTILE = float(os.getenv("REVAGENT_HEDGE_PERCENTILE", "95"))
+DEFAULT_HEDGE_MIN_SAMPLES = int(os.getenv("REVAGENT_HEDGE_MIN_SAMPLES", "20"))
+DEFAULT_HEDGE_BUDGET = float(os.getenv("REVAGENT_HEDGE_BUDGET", "0.05"))
+
+# Latencies kept per agent for the trigger percentile
+_LATENCY_WINDOW = 200
+
+
+class _AgentStats:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.runs = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0  # Trigger reached but no budget or no free slot
+
+
+class Hedger:
+    """
+    Runs attempts of a sub-agent and duplicates the slow ones.
+    """
+
+    def __init__(
+        self,
+        agents: frozenset = DEFAULT_HEDGE_AGENTS,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+        budget: float = DEFAULT_HEDGE_BUDGET,
+    ):
+        self.agents = agents
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = budget
+        self._stats: Dict[str, _AgentStats] = {}
+
+    def enabled(self, name: str) -> bool:
+        return name in self.agents or "all" in self.agents
+
+    def trigger_delay(self, name: str) -> Optional[float]:
+        """Seconds after which a run of `name` is hedged, or None (disabled, too few samples)."""
+        stats = self._stats.get(name)
+        if not self.enabled(name) or stats is None or len(stats.latencies) < self.min_samples:
+            return None
+        latencies = sorted(stats.latencies)
+        return latencies[min(len(latencies) - 1, int(self.percentile / 100 * len(latencies)))]
+
+    def _can_hedge(self, stats: _AgentStats) -> bool:
+        return stats.hedged + 1 <= self.budget * stats.runs and run_scheduler.sub_agent.has_free_slot()
+
+    async def run(self, name: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `attempt()`, and a second `attempt()` if the first one is slower
+        than the trigger percentile; returns the first result.
+
+        Args:
+            name: Agent name (registry name, e.g. "flood_risk")
+            attempt: Callable creating the coroutine of one complete run
+
+        Returns:
+            The result of the first attempt to succeed
+        """
+        stats = self._stats.setdefault(name, _AgentStats())
+        stats.runs += 1
+        delay = self.trigger_delay(name)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt())
+        tasks = {primary}
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done():
+                    if self._can_hedge(stats):
+                        stats.hedged += 1
+                        print(f"[DEBUG] Hedging {name} run after {delay:.2f}s")  # Debug
+                        tasks.add(asyncio.ensure_future(attempt()))
+                    else:
+                        stats.skipped += 1
+
+            # First attempt to succeed (an error only counts once every attempt has failed)
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if not task.cancelled() and task.exception() is None), None)
+                if winner is not None or not pending:
+                    break
+            if winner is None:
+                return primary.result()  # Re-raises the error of the primary run
+
+            if winner is not primary:
+                stats.hedge_wins += 1
+            stats.latencies.append(time.monotonic() - started)
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hedge rates, wins and trigger delays per agent."""
+        agents = {}
+        for name, stats in self._stats.items():
+            delay = self.trigger_delay(name)
+            agents[name] = {
+                "enabled": self.enabled(name),
+                "runs": stats.runs,
+                "hedged": stats.hedged,
+                "hedge_wins": stats.hedge_wins,
+                "skipped": stats.skipped,
+                "hedge_rate": round(stats.hedged / stats.runs, 3) if stats.runs else 0.0,
+                "win_rate": round(stats.hedge_wins / stats.hedged, 3) if stats.hedged else None,
+                "trigger_s": round(delay, 2) if delay is not None else None,
+            }
+        return {
+            "agents_enabled": sorted(self.agents),
+            "percentile": self.percentile,
+            "min_samples": self.min_samples,
+            "budget": self.budget,
+            "by_agent": agents,
+        }
+
+
+# Shared by the sub-agent runs of the process
+run_hedger = Hedger()
@@ -0,0 +1,100 @@
+"""
+Intent pre-classification of the messages that go to RevAgent.
+
+Each turn only exposes the toolsets the message needs (see TOOLSETS in the
+orchestrator) with their prompt fragments, instead of every tool schema and
+the full prompt. Matching is keyword based, like the command router. When a
+message matches no toolset, or too many of them, it is ambiguous and RevAgent
+gets every tool.
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+_INTENT_PATTERNS = {
+    "navigation": re.compile(
+        r"\b(go\s+to|navigate|take\s+me|fly\s+to|zoom|center|centre|where\s+is|locate|"
+        r"markers?|pins?|map|carte|va\s+[aà]|aller\s+[aà]|emm[eè]ne|o[uù]\s+est|localise|"
+        r"marqueurs?|efface|coordinates|coordonn[ée]es)\b",
+        re.IGNORECASE,
+    ),
+    "property_search": re.compile(
+        r"\b(apartments?|flats?|houses?|studios?|propert(?:y|ies)|listings?|buy|rent|"
+        r"appartements?|maisons?|biens?|logements?|acheter|louer|annonces?|"
+        r"rooms?|pi[eè]ces?|under|below|sous|moins\s+de)\b|\d\s*(?:k|€|eur)",
+        re.IGNORECASE,
+    ),
+    "risk_analysis": re.compile(
+        r"\b(risks?|risques?|flood\w*|inondations?|heat|canicules?|climat\w*|"
+        r"projects?|projets?|construction|infrastructures?|transports?|metro|m[ée]tro|"
+        r"bus|tram|trains?|stations?|gares?|served|desservi\w*|future|avenir|invest\w*|"
+        r"market|march[ée])\b",
+        re.IGNORECASE,
+    ),
+    "area_analysis": re.compile(
+        r"\b(drawn|drew|draw|polygon|selected\s+(?:area|zone)|this\s+(?:area|zone)|"
+        r"the\s+(?:area|zone)|zone\s+dessin[ée]e|cette\s+zone|la\s+zone|secteur\s+s[ée]lectionn[ée])\b",
+        re.IGNORECASE,
+    ),
+}
+
+# Above this many matching toolsets the message is treated as ambiguous
+MAX_TOOLSETS = int(os.getenv("REVAGENT_MAX_TOOLSETS", "2"))
+
+
+def _selection_enabled() -> bool:
+    return os.getenv("REVAGENT_TOOL_SELECTION", "on").lower() not in ("0", "off", "false", "no")
+
+
+class IntentRouter:
+    """Selects the toolsets of a message and counts the selections."""
+
+    def __init__(self, max_toolsets: int = MAX_TOOLSETS):
+        self.max_toolsets = max_toolsets
+        self.selections: Counter = Counter()
+
+    def classify(self, user_message: str) -> List[str]:
+        """
+        Returns the toolsets whose keywords appear in the message.
+
+        Args:
+            user_message: Message de l'utilisateur
+
+        Returns:
+            List: Matching toolset names, in TOOLSETS order
+        """
+        message = " ".join(user_message.split())
+        return [name for name, pattern in _INTENT_PATTERNS.items() if pattern.search(message)]
+
+    def select(self, user_message: str, override: Optional[List[str]] = None) -> Optional[List[str]]:
+        """
+        Chooses the toolsets exposed for this turn.
+
+        Args:
+            user_message: Message de l'utilisateur
+            override: Explicit toolsets, bypassing the classification ("all" for every tool)
+
+        Returns:
+            The toolset names, or None for the full toolset (ambiguous message
+            or selection disabled with REVAGENT_TOOL_SELECTION=off)
+        """
+        if override:
+            toolsets = None if "all" in override else [name for name in _INTENT_PATTERNS if name in override]
+        elif not _selection_enabled():
+            toolsets = None
+        else:
+            toolsets = self.classify(user_message)
+            if not toolsets or len(toolsets) > self.max_toolsets:
+                toolsets = None
+
+        self.selections["+".join(toolsets) if toolsets else "full"] += 1
+        print(f"[DEBUG] Toolsets for this turn: {toolsets or 'full'}")
+        return toolsets
+
+    def stats(self) -> Dict[str, Any]:
+        return {"selections": dict(self.selections)}
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,292 @@
+"""
+Background jobs for long-running analyses.
+
+A zone analysis can take minutes (orchestrator plus several sub-agents), longer
+than proxies keep an HTTP request open. Instead the client submits a job, gets
+its id back at once, and follows it (GET /jobs/{id}, or the SSE event stream)
+while a fixed pool of workers runs the queued jobs.
+
+- A job submitted while an identical one (same key) is queued or running is
+  deduplicated: the caller gets the existing job.
+- Finished jobs, with their result and events, are kept `ttl_s` seconds.
+- When the queue is full, submit() raises SchedulerSaturated (429).
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agentX.scheduler import SchedulerSaturated
+
+DEFAULT_JOB_WORKERS = int(os.getenv("REVAGENT_JOB_WORKERS", "4"))
+DEFAULT_MAX_QUEUED_JOBS = int(os.getenv("REVAGENT_MAX_QUEUED_JOBS", "100"))
+DEFAULT_JOB_TTL_S = float(os.getenv("REVAGENT_JOB_TTL_S", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Run times kept for the percentiles
+_RUN_TIME_WINDOW = 256
+
+
+class Job:
+    """
+    A submitted job: its state, result and the events published while it ran.
+
+    Events are numbered ({"seq", "type", "timestamp", ...}) so that a client
+    can resume a stream after the last one it received.
+    """
+
+    def __init__(self, kind: str, key: Optional[str], factory: Optional[Callable[["Job"], Awaitable[Any]]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.factory = factory
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.task: "Optional[asyncio.Task[Any]]" = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def emit(self, event_type: str, **data: Any):
+        """Publishes an event to the followers of the job."""
+        self.events.append({"seq": len(self.events), "type": event_type, "timestamp": datetime.now().isoformat(), **data})
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.now()
+        self.finished_monotonic = time.monotonic()
+        self.emit(status, **({"error": error} if error else {}))
+
+    async def events_after(self, seq: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Events numbered above `seq`, waiting for new ones (at most `timeout`
+        seconds) if there are none yet and the job is not finished.
+        """
+        if len(self.events) <= seq + 1 and not self.done:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.events[seq + 1:]
+
+    def describe(self) -> Dict[str, Any]:
+        """Public state of the job (without its events)."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+            "events": len(self.events),
+        }
+
+
+class JobManager:
+    """
+    Queue of jobs executed by a pool of asyncio workers.
+
+    The workers are started on the first submission, in the running event loop.
+    """
+
+    def __init__(self, workers: int = DEFAULT_JOB_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED_JOBS, ttl_s: float = DEFAULT_JOB_TTL_S):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl_s = ttl_s
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Dict[str, Job] = {}  # key -> queued or running job
+        self._queue: "Optional[asyncio.Queue[Job]]" = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List["asyncio.Task[None]"] = []
+        self._run_times: deque = deque(maxlen=_RUN_TIME_WINDOW)
+        self.running = 0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.expired = 0
+        self.finished = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use, or a new event loop (the previous one and its workers are gone)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._workers = [loop.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+        for job in list(self._jobs.values()):
+            if job.status == QUEUED:
+                self._queue.put_nowait(job)
+            elif job.status == RUNNING:
+                self.running -= 1
+                self._finish(job, FAILED, error="Interrupted (event loop stopped)")
+
+    def _purge(self):
+        """Drops the finished jobs older than the TTL."""
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_monotonic > self.ttl_s:
+                del self._jobs[job_id]
+                self.expired += 1
+
+    def _retry_after(self) -> float:
+        average = sum(self._run_times) / len(self._run_times) if self._run_times else 30.0
+        return max(1.0, average * (self._queue.qsize() + 1) / max(1, self.workers))
+
+    def submit(self, kind: str, key: Optional[str], factory: Callable[[Job], Awaitable[Any]]) -> Tuple[Job, bool]:
+        """
+        Queues a job, unless an identical one (same key) is already queued or running.
+
+        Args:
+            kind: Type of job (e.g. "analyze-area")
+            key: Identity used for deduplication, or None
+            factory: Called with the job when a worker picks it up; returns the coroutine to run
+
+        Returns:
+            (job, deduplicated)
+
+        Raises:
+            SchedulerSaturated: if the queue is full
+        """
+        self._ensure_workers()
+        self._purge()
+        if key is not None:
+            existing = self._pending.get(key)
+            if existing is not None and not existing.done:
+                self.deduplicated += 1
+                print(f"[DEBUG] Deduplicated job: {existing.id} ({key})")  # Debug
+                return existing, True
+
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerSaturated("job", self._retry_after())
+
+        job = Job(kind, key, factory)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._pending[key] = job
+        self.submitted += 1
+        job.emit(QUEUED)
+        self._queue.put_nowait(job)
+        return job, False
+
+    def completed(self, kind: str, result: Any) -> Job:
+        """Records a job whose result is already known (e.g. served from a cache)."""
+        self._purge()
+        job = Job(kind, None, None)
+        job.started_at = job.created_at
+        self._jobs[job.id] = job
+        self.submitted += 1
+        job.finish(SUCCEEDED, result)
+        self.finished[SUCCEEDED] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns the job, or None if unknown or expired."""
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancels a queued or running job (its sub-agent runs with it).
+
+        Returns:
+            The job, or None if unknown or expired
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.task is not None:
+            job.task.cancel()  # The worker records the cancellation
+        else:
+            self._finish(job, CANCELLED)
+        return job
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        job.finish(status, result, error)
+        self.finished[status] += 1
+        if self._pending.get(job.key) is job:
+            del self._pending[job.key]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != QUEUED:
+                continue  # Cancelled while queued
+
+            job.status = RUNNING
+            job.started_at = datetime.now()
+            job.emit(RUNNING)
+            self.running += 1
+            started = time.monotonic()
+            job.task = asyncio.ensure_future(job.factory(job))
+            try:
+                result = await asyncio.shield(job.task)
+            except asyncio.CancelledError:
+                if not job.task.done():
+                    # The worker itself is being stopped
+                    job.task.cancel()
+                    self._finish(job, CANCELLED)
+                    raise
+                self._finish(job, CANCELLED)
+            except Exception as e:
+                print(f"[DEBUG] Job {job.id} failed: {e}")  # Debug
+                self._finish(job, FAILED, error=str(e))
+            else:
+                self._finish(job, SUCCEEDED, result)
+            finally:
+                self.running -= 1
+                self._run_times.append(time.monotonic() - started)
+                job.task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns counters on the job queue and the retained jobs."""
+        self._purge()
+        run_times = sorted(self._run_times)
+
+        def pct(p: float) -> Optional[float]:
+            return round(run_times[min(len(run_times) - 1, int(p * len(run_times)))], 2) if run_times else None
+
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "retained": len(self._jobs),
+            "ttl_s": self.ttl_s,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            **self.finished,
+            "run_s_p50": pct(0.5),
+            "run_s_p95": pct(0.95),
+        }
+
+
+# Shared instance used by the /jobs endpoints
+job_manager = JobManager()
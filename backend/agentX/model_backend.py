@@ -0,0 +1,46 @@
+"""
+Selection of the model backend used by every agent run.
+
+REVAGENT_MODEL_BACKEND=openai (default) uses the OpenAI models of the SDK.
+REVAGENT_MODEL_BACKEND=fake answers offline with FakeModelProvider, replaying
+the trace file given by REVAGENT_FAKE_TRACE (latency can be overridden with
+REVAGENT_FAKE_LATENCY_MS and REVAGENT_FAKE_DELTA_INTERVAL_MS).
+"""
+
+import os
+from typing import Optional
+
+from agents import RunConfig
+
+_run_config: Optional[RunConfig] = None
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def get_run_config() -> RunConfig:
+    """Returns the RunConfig shared by the orchestrator and the sub-agents."""
+    global _run_config
+    if _run_config is None:
+        backend = os.getenv("REVAGENT_MODEL_BACKEND", "openai").lower()
+        if backend == "fake":
+            from .fake_model import FakeModelProvider
+
+            provider = FakeModelProvider.from_trace(
+                os.getenv("REVAGENT_FAKE_TRACE"),
+                latency_ms=_env_float("REVAGENT_FAKE_LATENCY_MS"),
+                delta_interval_ms=_env_float("REVAGENT_FAKE_DELTA_INTERVAL_MS"),
+            )
+            # No network: traces must not be exported either
+            _run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        else:
+            _run_config = RunConfig()
+    return _run_config
+
+
+def set_run_config(run_config: Optional[RunConfig]):
+    """Overrides the shared RunConfig (None resets it to the environment default)."""
+    global _run_config
+    _run_config = run_config
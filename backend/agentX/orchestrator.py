@@ -2,85 +2,173 @@
 RevAgent - Main real estate evaluation agent based on future signals.
 """
 
-from agents import Agent, Runner, WebSearchTool
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from tools.map_actions import action_map, analyze_drawn_area, navigate_to_address, search_properties, search_properties_in_zone, clear_map_markers
-from tools.geocoding import geocode_address, reverse_geocode
-from .flood_risk_agent import analyze_flood_risk
-from .heat_wave_agent import analyze_heat_wave_risk
-from .real_estate_agent import analyze_real_estate_projects
-from .construction_agent import analyze_future_construction
-
-REV_AGENT_PROMPT = """
+from typing import Dict, Iterable, List, Optional, Tuple
+from agents import Agent
+from .registry import tool_registry
+
+REV_AGENT_HEADER = """
 You are RevAgent, an expert in real estate evaluation based on future signals.
 
 AVAILABLE TOOLS:
+"""
+
+REV_AGENT_FOOTER = """
+You provide evaluations based on:
+- Future climate risks
+- Infrastructure projects
+- Real estate market evolution
+- Planned urban development
+
+Respond in English, in a structured and professional manner.
+"""
 
+# Toolsets exposed per turn: tool names and the matching prompt fragment
+TOOLSETS: Dict[str, List[str]] = {
+    "navigation": [
+        "navigate_to_address",
+        "clear_map_markers",
+        "geocode_address",
+        "reverse_geocode",
+    ],
+    "property_search": [
+        "search_properties",
+        "search_properties_in_zone",
+        "navigate_to_address",
+        "geocode_address",
+    ],
+    "risk_analysis": [
+        "web_search",
+        "geocode_address",
+        "analyze_flood_risk",
+        "analyze_heat_wave_risk",
+        "analyze_real_estate_projects",
+        "analyze_future_construction",
+        "analyze_transportation",
+    ],
+    "area_analysis": [
+        "action_map",
+        "analyze_drawn_area",
+        "search_properties_in_zone",
+        "geocode_address",
+        "reverse_geocode",
+    ],
+}
+
+PROMPT_FRAGMENTS: Dict[str, str] = {
+    "navigation": """
 🗺️ NAVIGATION AND MAP:
 - navigate_to_address(address) → Go to a specific address
 - clear_map_markers() → Clear all markers
+- geocode_address(address) → Convert address to coordinates
+- reverse_geocode(latitude, longitude) → Convert coordinates to address
 
+Examples:
+- "go to République Paris" → navigate_to_address("République Paris")
+""",
+    "property_search": """
 🏠 PROPERTY SEARCH:
 - search_properties(max_price, location, property_type, min_rooms) → Search in a city/area
 - search_properties_in_zone(max_price, zone_coordinates, zone_center, zone_address, property_type, min_rooms) → Search in a drawn area
 
-📍 GEOCODING:
-- geocode_address(address) → Convert address to coordinates
-- reverse_geocode(latitude, longitude) → Convert coordinates to address
-
+Examples:
+- "find apartments under 400000€ in Paris" → search_properties(400000, "Paris", "apartment", 1)
+""",
+    "risk_analysis": """
 🔍 SPECIALIZED ANALYSES:
 - analyze_flood_risk(zone_address) → Analyze flood risks
 - analyze_heat_wave_risk(zone_address) → Analyze heat wave risks
 - analyze_real_estate_projects(zone_address) → Analyze real estate projects
 - analyze_future_construction(zone_address) → Analyze construction projects
-- analyze_drawn_area() → Complete analysis of a drawn area
+- analyze_transportation(zone_address) → Analyze public transport (score, nearest lines, frequencies, hours)
 
-USAGE EXAMPLES:
-- "go to République Paris" → navigate_to_address("République Paris")
-- "find apartments under 400000€ in Paris" → search_properties(400000, "Paris", "apartment", 1)
+Examples:
 - "analyze flood risks in Lyon" → analyze_flood_risk("Lyon")
 - "what are the real estate projects in Marseille?" → analyze_real_estate_projects("Marseille")
 - "heat wave risks in Toulouse" → analyze_heat_wave_risk("Toulouse")
 - "future construction projects in Nice" → analyze_future_construction("Nice")
+- "is Bastille well served by public transport?" → analyze_transportation("Bastille Paris")
+""",
+    "area_analysis": """
+✏️ DRAWN AREA:
+- analyze_drawn_area() → Complete analysis of a drawn area
+- search_properties_in_zone(max_price, zone_coordinates, zone_center, zone_address, property_type, min_rooms) → Search in a drawn area
+""",
+}
 
+REV_AGENT_PROCESS = """
 RECOMMENDED ANALYSIS PROCESS:
 1. Navigation → navigate_to_address()
 2. Property search → search_properties()
 3. Risk analyses → analyze_flood_risk(), analyze_heat_wave_risk()
 4. Future projects → analyze_real_estate_projects(), analyze_future_construction()
 5. Summary and recommendations
+"""
 
-You provide evaluations based on:
-- Future climate risks
-- Infrastructure projects
-- Real estate market evolution
-- Planned urban development
+# Full toolset, used when the intent of a message is ambiguous
+REV_AGENT_TOOLS = [
+    "web_search",
+    "action_map",
+    "analyze_drawn_area",
+    "navigate_to_address",
+    "search_properties",
+    "search_properties_in_zone",
+    "clear_map_markers",
+    "geocode_address",
+    "reverse_geocode",
+    "analyze_flood_risk",
+    "analyze_heat_wave_risk",
+    "analyze_real_estate_projects",
+    "analyze_future_construction",
+    "analyze_transportation",
+]
 
-Respond in English, in a structured and professional manner.
-"""
 
-def create_rev_agent() -> Agent:
-    """Creates the RevAgent."""
+def build_prompt(toolsets: Optional[Iterable[str]] = None) -> str:
+    """
+    Builds the RevAgent instructions for a set of toolsets (all of them when None).
+    """
+    names = list(TOOLSETS) if toolsets is None else [name for name in TOOLSETS if name in toolsets]
+    prompt = REV_AGENT_HEADER + "".join(PROMPT_FRAGMENTS[name] for name in names)
+    # The end-to-end process only makes sense with every tool available
+    if len(names) == len(TOOLSETS):
+        prompt += REV_AGENT_PROCESS
+    return prompt + REV_AGENT_FOOTER
+
+
+def toolset_tools(toolsets: Optional[Iterable[str]] = None) -> List[str]:
+    """Tool names of a set of toolsets, in REV_AGENT_TOOLS order (all of them when None)."""
+    if toolsets is None:
+        return list(REV_AGENT_TOOLS)
+    selected = {tool for name in toolsets for tool in TOOLSETS[name]}
+    return [tool for tool in REV_AGENT_TOOLS if tool in selected]
+
+
+REV_AGENT_PROMPT = build_prompt()
+
+# Agents are stateless: one per toolset combination, shared by all sessions
+_agents: Dict[Optional[Tuple[str, ...]], Agent] = {}
+
+
+def create_rev_agent(toolsets: Optional[Iterable[str]] = None) -> Agent:
+    """
+    Creates the RevAgent.
+
+    Args:
+        toolsets: Names from TOOLSETS to expose, or None for every tool
+
+    Returns:
+        Agent: RevAgent restricted to these toolsets and their prompt fragments
+    """
     return Agent(
         name="RevAgent",
-        instructions=REV_AGENT_PROMPT,
-        tools=[
-            WebSearchTool(),
-            action_map,
-            analyze_drawn_area,
-            navigate_to_address,
-            search_properties,
-            search_properties_in_zone,
-            clear_map_markers,
-            geocode_address,
-            reverse_geocode,
-            analyze_flood_risk,
-            analyze_heat_wave_risk,
-            analyze_real_estate_projects,
-            analyze_future_construction
-        ],
+        instructions=build_prompt(toolsets),
+        tools=tool_registry.get_many(toolset_tools(toolsets)),
     )
 
 
+def get_rev_agent(toolsets: Optional[Iterable[str]] = None) -> Agent:
+    """Returns the cached RevAgent for a toolset combination (every tool when None)."""
+    key = None if toolsets is None else tuple(sorted(toolsets))
+    if key not in _agents:
+        _agents[key] = create_rev_agent(key)
+    return _agents[key]
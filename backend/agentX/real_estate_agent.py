@@ -4,20 +4,18 @@ Specialized agent for real estate projects analysis.
 
 from agents import Agent, Runner, WebSearchTool
 from agents.tool import function_tool
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from tools.geocoding import geocode_address
+from .singleflight import analysis_flight, analysis_key
+from .model_backend import get_run_config
+from .deadline import run_with_deadline, SUB_AGENT_BUDGET_SHARE
+from .scheduler import run_scheduler
+from .hedging import run_hedger
+from .registry import agent_registry
+from .sections import section_producer
 from models.zone_analysis import RealEstateProjectsData, RealEstateProject, PropertyType
-from datetime import datetime
 
-current_date = datetime.now()
 
-
-
-
-
-REAL_ESTATE_AGENT_PROMPT = f"""
+REAL_ESTATE_AGENT_PROMPT = """
 You analyze real estate projects for a given area.
 
 TASK: Quickly return a RealEstateProjectsData object with:
@@ -50,9 +48,8 @@ def create_real_estate_agent() -> Agent:
         ],)
 
 
-agent = create_real_estate_agent
-
 @function_tool
+@section_producer("real_estate_projects")
 async def analyze_real_estate_projects(zone_address: str) -> RealEstateProjectsData:
     """
     Analyze real estate projects in a given area.
@@ -65,6 +62,24 @@ async def analyze_real_estate_projects(zone_address: str) -> RealEstateProjectsD
     """
 
     
-    result = await Runner.run(agent, f"Here is the area {zone_address}, return your analysis",max_turns=3)
+    return await analysis_flight.run(
+        analysis_key("real_estate_projects", zone_address),
+        lambda: _run_agent(zone_address),
+    )
+
+
+async def _run_agent(zone_address: str) -> RealEstateProjectsData:
+    # Duplicated if slower than usual (opt-in, REVAGENT_HEDGE_AGENTS)
+    return await run_hedger.run("real_estate", lambda: _run_agent_once(zone_address))
+
+
+async def _run_agent_once(zone_address: str) -> RealEstateProjectsData:
+    # Slot in the sub-agent pool, then only a share of the request budget:
+    # the orchestrator still has to answer
+    async with run_scheduler.sub_agent_run():
+        result = await run_with_deadline(
+            Runner.run(agent_registry.get("real_estate"), f"Here is the area {zone_address}, return your analysis",max_turns=3, run_config=get_run_config()),
+            share=SUB_AGENT_BUDGET_SHARE,
+        )
     
     return result.final_output
\ No newline at end of file
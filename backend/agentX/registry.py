@@ -0,0 +1,91 @@
+"""
+Lazy registry of the tools and agents used by RevAgent.
+
+Tools and agents are declared by import path ("module:attribute"), which
+costs nothing at import time. The module is imported and the object built
+on first use, then cached. Importing the orchestrator therefore no longer
+imports every sub-agent module (nor numpy and the local geodata stores),
+which keeps cold start and worker fork cheap.
+"""
+
+import importlib
+import time
+from typing import Any, Dict, List
+
+
+class LazyRegistry:
+    """Named objects resolved from "module:attribute" paths on first use."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._specs: Dict[str, tuple] = {}
+        self._objects: Dict[str, Any] = {}
+        self.load_times_ms: Dict[str, float] = {}
+
+    def declare(self, name: str, path: str, call: bool = False):
+        """
+        Declares an object without importing it.
+
+        Args:
+            name: Registry name
+            path: "package.module:attribute"
+            call: Call the attribute (factory or class) to build the object
+        """
+        self._specs[name] = (path, call)
+
+    def get(self, name: str) -> Any:
+        """Returns the object, importing / building it on first use."""
+        if name not in self._objects:
+            if name not in self._specs:
+                raise KeyError(f"Unknown {self.kind}: {name}")
+            path, call = self._specs[name]
+            started = time.perf_counter()
+            module_name, attribute = path.split(":")
+            target = getattr(importlib.import_module(module_name), attribute)
+            self._objects[name] = target() if call else target
+            self.load_times_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[DEBUG] Materialized {self.kind} {name} in {self.load_times_ms[name]} ms")
+        return self._objects[name]
+
+    def get_many(self, names: List[str]) -> List[Any]:
+        return [self.get(name) for name in names]
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def materialized(self) -> List[str]:
+        return list(self._objects)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"declared": len(self._specs), "materialized": self.materialized(), "load_times_ms": dict(self.load_times_ms)}
+
+
+tool_registry = LazyRegistry("tool")
+agent_registry = LazyRegistry("agent")
+
+# Map tools
+tool_registry.declare("web_search", "agents:WebSearchTool", call=True)
+tool_registry.declare("action_map", "tools.map_actions:action_map")
+tool_registry.declare("analyze_drawn_area", "tools.map_actions:analyze_drawn_area")
+tool_registry.declare("navigate_to_address", "tools.map_actions:navigate_to_address")
+tool_registry.declare("search_properties", "tools.map_actions:search_properties")
+tool_registry.declare("search_properties_in_zone", "tools.map_actions:search_properties_in_zone")
+tool_registry.declare("clear_map_markers", "tools.map_actions:clear_map_markers")
+
+# Geocoding tools
+tool_registry.declare("geocode_address", "tools.geocoding:geocode_address")
+tool_registry.declare("reverse_geocode", "tools.geocoding:reverse_geocode")
+
+# Specialized analyses (each one runs a sub-agent, or answers from local data)
+tool_registry.declare("analyze_flood_risk", "agentX.flood_risk_agent:analyze_flood_risk")
+tool_registry.declare("analyze_heat_wave_risk", "agentX.heat_wave_agent:analyze_heat_wave_risk")
+tool_registry.declare("analyze_real_estate_projects", "agentX.real_estate_agent:analyze_real_estate_projects")
+tool_registry.declare("analyze_future_construction", "agentX.construction_agent:analyze_future_construction")
+tool_registry.declare("analyze_transportation", "agentX.transportation_agent:analyze_transportation")
+
+# Sub-agents, built once and shared by all runs
+agent_registry.declare("flood_risk", "agentX.flood_risk_agent:create_flood_risk_agent", call=True)
+agent_registry.declare("heat_wave", "agentX.heat_wave_agent:create_heat_wave_agent", call=True)
+agent_registry.declare("real_estate", "agentX.real_estate_agent:create_real_estate_agent", call=True)
+agent_registry.declare("construction", "agentX.construction_agent:create_construction_agent", call=True)
+agent_registry.declare("transportation", "agentX.transportation_agent:create_transportation_agent", call=True)
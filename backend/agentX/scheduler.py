@@ -0,0 +1,219 @@
+"""
+Admission control and prioritized run queue for LLM-backed work.
+
+Two pools limit how many runs execute at once: top-level orchestrator runs
+and nested sub-agent runs. Each pool has a bounded wait queue ordered by
+priority (interactive chat before batch analysis). When the queue is full the
+request is rejected at once with SchedulerSaturated, which the API turns into
+a 429 with a Retry-After header.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from .deadline import DeadlineExceeded, current_deadline
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # Chat messages, someone is waiting for the answer
+    BATCH = 1        # Area analyses and other heavy requests
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a run cannot be admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, pool: str, retry_after: float):
+        super().__init__(f"Too many concurrent {pool} runs, retry in {retry_after:.0f}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+# Priority of the request being served, inherited by its sub-agent runs
+_current_priority: ContextVar[Priority] = ContextVar("revagent_priority", default=Priority.INTERACTIVE)
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, future: "asyncio.Future[None]"):
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class RunPool:
+    """Concurrency limit with a bounded priority wait queue."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.running = 0
+        self._queue: List[Any] = []  # heap of (priority, sequence, waiter)
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._wait_times: Deque[float] = deque(maxlen=500)
+        self._avg_run_s = 5.0  # EMA of the run duration, used for Retry-After
+        self.admitted = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        """Estimated seconds before a slot frees up for a new request."""
+        backlog = self._queued + 1
+        return max(1.0, math.ceil(self._avg_run_s * backlog / self.max_concurrent))
+
+    def has_capacity(self, priority: Priority) -> bool:
+        """True if a request of this priority would be admitted right now."""
+        if self.running < self.max_concurrent or self._queued < self.max_queue:
+            return True
+        return any(entry[2].priority > priority for entry in self._queue if not entry[2].future.done())
+
+    def has_free_slot(self) -> bool:
+        """True if a run would start right now, without queuing."""
+        return self.running < self.max_concurrent and self._queued == 0
+
+    def _reject(self):
+        self.rejected += 1
+        raise SchedulerSaturated(self.name, self.retry_after())
+
+    def _evict_lower_priority(self, priority: Priority) -> bool:
+        """Rejects the newest queued waiter of lower priority to make room."""
+        candidates = [entry for entry in self._queue if entry[2].priority > priority and not entry[2].future.done()]
+        if not candidates:
+            return False
+        victim = max(candidates, key=lambda entry: (entry[0], entry[1]))[2]
+        self._queued -= 1
+        self.rejected += 1
+        victim.future.set_exception(SchedulerSaturated(self.name, self.retry_after()))
+        return True
+
+    async def acquire(self, priority: Priority):
+        """Waits for a slot (bounded by the current request deadline)."""
+        if self.running < self.max_concurrent and self._queued == 0:
+            self.running += 1
+            self.admitted += 1
+            self._wait_times.append(0.0)
+            return
+
+        if self._queued >= self.max_queue and not self._evict_lower_priority(priority):
+            self._reject()
+
+        waiter = _Waiter(priority, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (int(priority), next(self._sequence), waiter))
+        self._queued += 1
+
+        deadline = current_deadline()
+        try:
+            # shield(): a cancelled caller must not cancel the future itself,
+            # or the cleanup below would not give its place back
+            if deadline is None:
+                await asyncio.shield(waiter.future)
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=deadline.remaining())
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Slot handed over while we were giving up: give it back
+                self.release()
+            elif not waiter.future.done():
+                waiter.future.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.TimeoutError) and not isinstance(e, DeadlineExceeded):
+                raise DeadlineExceeded("Request deadline exceeded while queued") from e
+            raise
+
+        self.admitted += 1
+        self._wait_times.append(time.monotonic() - waiter.enqueued_at)
+
+    def release(self):
+        """Frees a slot, handing it over to the highest priority waiter."""
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue  # Cancelled or evicted while queued
+            self._queued -= 1
+            waiter.future.set_result(None)  # The slot is transferred, running unchanged
+            return
+        self.running -= 1
+
+    def record_run_time(self, seconds: float):
+        self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+
+        def pct(p: float) -> Optional[float]:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else None
+
+        return {
+            "running": self.running,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p95": pct(0.95),
+            "avg_run_s": round(self._avg_run_s, 2),
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_run_time(time.monotonic() - started)
+            self.release()
+
+
+class RunScheduler:
+    """Global scheduler with separate pools for top-level and sub-agent runs."""
+
+    def __init__(self):
+        self.top_level = RunPool(
+            "top-level",
+            int(os.getenv("REVAGENT_MAX_RUNS", "8")),
+            int(os.getenv("REVAGENT_MAX_QUEUED_RUNS", "32")),
+        )
+        self.sub_agent = RunPool(
+            "sub-agent",
+            int(os.getenv("REVAGENT_MAX_SUB_AGENT_RUNS", "16")),
+            int(os.getenv("REVAGENT_MAX_QUEUED_SUB_AGENT_RUNS", "64")),
+        )
+
+    def ensure_capacity(self, priority: Priority):
+        """Fails fast (SchedulerSaturated) when a top-level run would be rejected."""
+        if not self.top_level.has_capacity(priority):
+            self.top_level.rejected += 1
+            raise SchedulerSaturated(self.top_level.name, self.top_level.retry_after())
+
+    @asynccontextmanager
+    async def top_level_run(self, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        """Slot for an orchestrator run; its sub-agent runs inherit `priority`."""
+        async with self.top_level.slot(priority):
+            token = _current_priority.set(priority)
+            try:
+                yield
+            finally:
+                _current_priority.reset(token)
+
+    @asynccontextmanager
+    async def sub_agent_run(self) -> AsyncIterator[None]:
+        """Slot for a nested sub-agent run, at the priority of the current request."""
+        async with self.sub_agent.slot(_current_priority.get()):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {"top_level": self.top_level.stats(), "sub_agent": self.sub_agent.stats()}
+
+
+# Shared instance for the whole process
+run_scheduler = RunScheduler()
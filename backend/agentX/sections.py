@@ -0,0 +1,117 @@
+"""
+Progressive delivery of the typed sections of a zone analysis.
+
+Each specialized analysis (flood risk, heat wave risk, real estate projects,
+future construction, transportation) produces one section of
+ZoneAnalysisResult. Instead of waiting for the orchestrator's final text, a
+streaming request collects every section as soon as its producer returns and
+sends it to the client as structured JSON; the narrative comes last.
+
+The sink of the current request is held in a ContextVar, so it follows the
+orchestrator run into its tool calls (including sync tools run in threads).
+Outside a section_scope, publishing does nothing.
+"""
+
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Fields of ZoneAnalysisResult produced by the specialized analyses
+SECTIONS = ("flood_risk", "heat_wave_risk", "real_estate_projects", "future_construction", "transportation")
+
+SectionSink = Callable[[str, Any], None]
+
+_current_sink: ContextVar[Optional[SectionSink]] = ContextVar("revagent_section_sink", default=None)
+
+# End of the chunk stream in stream_with_sections
+_DONE = object()
+
+
+@contextmanager
+def section_scope(sink: Optional[SectionSink]) -> Iterator[None]:
+    """Sends the sections published by the code (and tasks) run inside the block to `sink`."""
+    token = _current_sink.set(sink)
+    try:
+        yield
+    finally:
+        _current_sink.reset(token)
+
+
+def publish_section(name: str, data: Any):
+    """Publishes a section (pydantic model) to the sink of the current request, if any."""
+    sink = _current_sink.get()
+    if sink is not None and data is not None:
+        sink(name, data)
+
+
+def section_producer(name: str):
+    """
+    Decorator publishing the result of an async analysis as section `name`.
+
+    Applied under @function_tool (functools.wraps keeps the signature and
+    docstring the tool schema is built from).
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            publish_section(name, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def section_event(name: str, data: Any) -> Dict[str, Any]:
+    return {
+        "type": "section",
+        "section": name,
+        "data": data.model_dump(mode="json") if hasattr(data, "model_dump") else data,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+async def stream_with_sections(chunks: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Interleaves the section events published during a streamed run with its chunks.
+
+    Args:
+        chunks: Chunk dicts of ChatSession.send_message_streamed (iterated in a task
+            started inside the section scope)
+
+    Yields:
+        {"type": "section", "section", "data", "timestamp"} events, as each section
+        is produced, and the chunks in their order ("final" last)
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def sink(name: str, data: Any):
+        # Sync tools publish from a worker thread
+        loop.call_soon_threadsafe(queue.put_nowait, section_event(name, data))
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                queue.put_nowait(chunk)
+        finally:
+            # After the sections scheduled by call_soon_threadsafe
+            loop.call_soon(queue.put_nowait, _DONE)
+
+    with section_scope(sink):
+        task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+        await task  # Re-raises the error of the run, if any
+    finally:
+        if not task.done():
+            task.cancel()
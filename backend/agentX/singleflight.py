@@ -0,0 +1,119 @@
+"""
+Single-flight coalescing of identical in-flight analyses.
+
+When several sessions ask for the same analysis (same type, same zone) at the
+same time, only one sub-agent run is started and every caller awaits its result.
+
+The shared run belongs to no caller in particular: it runs in a clean context
+under the server default deadline, while each waiter only waits within its
+own request budget.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from tools.map_actions import normalize_address
+from .deadline import DEFAULT_REQUEST_TIMEOUT_S, SUB_AGENT_BUDGET_SHARE, Deadline, deadline_scope, run_with_deadline
+
+
+class _Flight:
+    """An in-flight run shared by one or more waiters."""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing the same key into a single task.
+
+    The shared task is reference counted: a waiter that gets cancelled (or
+    runs out of time) only stops waiting, and the task itself is cancelled
+    once its last waiter is gone.
+
+    Args:
+        share: Share of its remaining request budget a waiter waits for the result
+    """
+
+    def __init__(self, share: float = 1.0):
+        self.share = share
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `factory()` unless an identical call is already in flight, in
+        which case the result of that call is awaited instead.
+
+        Args:
+            key: Identity of the call (e.g. analysis type + normalized zone)
+            factory: Callable creating the coroutine to run
+
+        Returns:
+            The result of the shared run
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(self._start(factory))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._forget(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            print(f"[DEBUG] Coalesced in-flight run: {key}")  # Debug
+
+        flight.waiters += 1
+        try:
+            # shield() so that cancelling one waiter (or its deadline) does not
+            # cancel the shared run
+            return await run_with_deadline(self._wait(flight), share=self.share)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last interested caller is gone: stop the run and make sure
+                # no new caller joins a flight that is being cancelled.
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    @staticmethod
+    async def _wait(flight: _Flight) -> Any:
+        return await asyncio.shield(flight.task)
+
+    @staticmethod
+    def _start(factory: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        """
+        Starts the shared run in a clean context: it must not inherit the
+        deadline (X-Request-Timeout) or priority of whichever caller came first.
+        """
+        context = contextvars.Context()
+
+        def create() -> "asyncio.Task[Any]":
+            with deadline_scope(Deadline.after(DEFAULT_REQUEST_TIMEOUT_S)):
+                return asyncio.get_running_loop().create_task(factory())
+
+        return context.run(create)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counters on the coalescing activity."""
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+def analysis_key(analysis_type: str, zone_address: str) -> Tuple[str, str]:
+    """Builds the single-flight key of an analysis for a zone."""
+    return analysis_type, normalize_address(zone_address)
+
+
+# Shared instance used by the specialized agents: a caller waits for a sub-agent
+# result within the share of its budget a sub-agent run would have had
+analysis_flight = SingleFlight(share=SUB_AGENT_BUDGET_SHARE)
@@ -0,0 +1,100 @@
+"""
+Specialized agent for public transport accessibility analysis.
+"""
+
+import asyncio
+from agents import Agent, Runner, WebSearchTool
+from agents.tool import function_tool
+from tools.geocoding import geocode_address, locate
+from geodata.gtfs import get_transport_engine
+from geodata.isochrones import get_walking_grid, walking_score
+from .singleflight import analysis_flight, analysis_key
+from .model_backend import get_run_config
+from .deadline import run_with_deadline, SUB_AGENT_BUDGET_SHARE
+from .scheduler import run_scheduler
+from .hedging import run_hedger
+from .registry import agent_registry
+from .sections import section_producer
+from models.zone_analysis import TransportationData
+
+
+TRANSPORTATION_AGENT_PROMPT = """
+You analyze public transport accessibility for a given area.
+
+TASK: Quickly return a TransportationData object with:
+- public_transport_score: accessibility score from 1 to 10
+- transport_options: list of TransportOption (transport_type metro/bus/train/tram/bike_share, line and station name, distance_meters from the zone center, frequency_minutes, operating_hours)
+- walking_score: score from 1 to 10
+- bike_infrastructure: available bike infrastructure
+- parking_availability: short assessment
+
+RULES:
+- Use geocode_address to locate
+- Make ONE search: "metro bus station near [zone]"
+- Respond in less than 2 minutes
+- Estimate logically if no precise data
+"""
+
+
+def create_transportation_agent() -> Agent:
+    """Creates the public transport analysis agent."""
+    return Agent(
+        name="TransportationAgent",
+        instructions=TRANSPORTATION_AGENT_PROMPT,
+        output_type=TransportationData,
+        tools=[
+            WebSearchTool(),
+            geocode_address
+        ],
+    )
+
+
+@function_tool
+@section_producer("transportation")
+async def analyze_transportation(zone_address: str) -> TransportationData:
+    """
+    Analyze public transport accessibility for a given area.
+
+    Args:
+        zone_address: Address or description of the area to analyze
+
+    Returns:
+        TransportationData: Transport score and nearest lines with their frequency and hours
+    """
+    # Answer from the local GTFS store when it covers the area (no LLM call)
+    engine = get_transport_engine()
+    if engine is not None:
+        point = await asyncio.to_thread(locate, zone_address)
+        if point is not None:
+            # Shards may be loaded from disk: off the event loop
+            transportation = await asyncio.to_thread(engine.analyze, *point)
+            walking_grid = get_walking_grid()
+            if walking_grid is not None:
+                score = walking_score(await asyncio.to_thread(walking_grid.minutes_at, *point))
+                if score is not None:
+                    transportation.walking_score = score
+            if transportation.transport_options:
+                print(f"[DEBUG] Transportation for {zone_address} from GTFS store at {point}")
+                return transportation
+
+    return await analysis_flight.run(
+        analysis_key("transportation", zone_address),
+        lambda: _run_agent(zone_address),
+    )
+
+
+async def _run_agent(zone_address: str) -> TransportationData:
+    # Duplicated if slower than usual (opt-in, REVAGENT_HEDGE_AGENTS)
+    return await run_hedger.run("transportation", lambda: _run_agent_once(zone_address))
+
+
+async def _run_agent_once(zone_address: str) -> TransportationData:
+    # Slot in the sub-agent pool, then only a share of the request budget:
+    # the orchestrator still has to answer
+    async with run_scheduler.sub_agent_run():
+        result = await run_with_deadline(
+            Runner.run(agent_registry.get("transportation"), f"Here is the area {zone_address}, return your analysis", max_turns=3, run_config=get_run_config()),
+            share=SUB_AGENT_BUDGET_SHARE,
+        )
+
+    return result.final_output
@@ -2,15 +2,32 @@
 FastAPI server for the real estate evaluation system API.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 import uuid
+import copy
+from datetime import datetime
 import json
+import asyncio
+from dotenv import load_dotenv
 
 from chat_session import ChatSessionManager
+from agentX.deadline import Deadline, DEFAULT_REQUEST_TIMEOUT_S, deadline_scope
+from agentX.scheduler import Priority, SchedulerSaturated, run_scheduler
+from agentX.singleflight import analysis_flight
+from agentX.registry import tool_registry, agent_registry
+from agentX.intent_router import intent_router
+from agentX.area_cache import area_cache, polygon_hash
+from agentX.orchestrator import TOOLSETS
+from agentX.jobs import job_manager
+from agentX.hedging import run_hedger
+from agentX.sections import SECTIONS, section_event, section_scope, stream_with_sections
+
+# Clés API (OpenAI, Mapbox) depuis .env, une seule fois au démarrage du serveur
+load_dotenv()
 
 app = FastAPI(title="RevAgent API", version="1.0.0")
 
@@ -29,6 +46,7 @@ session_manager = ChatSessionManager()
 class MessageRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    toolsets: Optional[List[str]] = None  # Forcer les outils exposés ("all" pour tous)
 
 class MessageResponse(BaseModel):
     success: bool
@@ -36,6 +54,7 @@ class MessageResponse(BaseModel):
     error: Optional[str] = None
     session_id: str
     timestamp: str
+    metadata: Optional[Dict[str, Any]] = None  # map_actions, cached
 
 class SessionInfo(BaseModel):
     session_id: str
@@ -51,17 +70,83 @@ class AreaAnalysisRequest(BaseModel):
     location_address: str
     session_id: Optional[str] = None
 
+class GeocodeBatchRequest(BaseModel):
+    addresses: List[str]
+
+class JobSubmission(BaseModel):
+    job_id: str
+    status: str
+    deduplicated: bool  # Job identique déjà en attente ou en cours
+
+@app.exception_handler(SchedulerSaturated)
+async def scheduler_saturated_handler(request: Request, exc: SchedulerSaturated):
+    """Runs saturated: ask the client to come back later."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+# Interval between two checks of the client connection during a run
+DISCONNECT_POLL_INTERVAL_S = 0.5
+# Addresses accepted by one /geocode/batch request
+GEOCODE_BATCH_MAX_ADDRESSES = 1000
+# Keep-alive comment sent on a job event stream when nothing happened
+JOB_EVENTS_KEEPALIVE_S = 15.0
+
+def request_deadline(http_request: Request) -> Deadline:
+    """
+    Deadline of a request: X-Request-Timeout header (seconds) if sent by the
+    client, capped by the server default.
+    """
+    timeout = DEFAULT_REQUEST_TIMEOUT_S
+    header = http_request.headers.get("x-request-timeout")
+    if header:
+        try:
+            timeout = min(max(float(header), 0.0), DEFAULT_REQUEST_TIMEOUT_S)
+        except ValueError:
+            pass
+    return Deadline.after(timeout)
+
+def check_toolsets(toolsets: Optional[List[str]]):
+    """
+    Rejects unknown toolset names (400) in a message request.
+    """
+    unknown = set(toolsets or []) - set(TOOLSETS) - {"all"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown toolsets: {sorted(unknown)}, expected {list(TOOLSETS)} or all")
+
+async def run_until_disconnect(http_request: Request, coro):
+    """
+    Runs `coro` and cancels it (with the sub-agent runs it started) if the
+    client disconnects before the end.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL_S)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                print("[DEBUG] Client disconnected, cancelling the run")  # Debug
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
 @app.get("/")
 async def root():
     """Point d'entrée de l'API."""
     return {"message": "RevAgent API - Real Estate Evaluation System"}
 
 @app.post("/chat", response_model=MessageResponse)
-async def chat(request: MessageRequest):
+async def chat(request: MessageRequest, http_request: Request):
     """
     Endpoint principal pour envoyer des messages à RevAgent.
     """
     print(f"Received request: {request}")  # Debug log
+    check_toolsets(request.toolsets)
     try:
         # Generate a session_id if not provided
         session_id = request.session_id or str(uuid.uuid4())
@@ -70,22 +155,26 @@ async def chat(request: MessageRequest):
         # Create or retrieve the session
         chat_session = session_manager.get_or_create_session(session_id)
         
-        # Envoyer le message
-        response = await chat_session.send_message(request.message)
+        # Envoyer le message (annulé si le client se déconnecte ou si la deadline expire)
+        with deadline_scope(request_deadline(http_request)):
+            response = await run_until_disconnect(http_request, chat_session.send_message(request.message, Priority.INTERACTIVE, request.toolsets))
         print(f"Response: {response}")  # Debug log
         
         return MessageResponse(**response)
         
+    except (HTTPException, SchedulerSaturated):
+        raise
     except Exception as e:
         print(f"Error in chat endpoint: {e}")  # Debug log
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat/stream")
-async def chat_stream(request: MessageRequest):
+async def chat_stream(request: MessageRequest, http_request: Request):
     """
     Endpoint pour les réponses streamées de RevAgent.
     """
     print(f"Received streaming request: {request}")  # Debug log
+    check_toolsets(request.toolsets)
     try:
         # Generate a session_id if not provided
         session_id = request.session_id or str(uuid.uuid4())
@@ -94,9 +183,16 @@ async def chat_stream(request: MessageRequest):
         # Create or retrieve the session
         chat_session = session_manager.get_or_create_session(session_id)
         
+        deadline = request_deadline(http_request)
+        
+        # Refuser tout de suite (429) plutôt qu'après l'envoi des en-têtes du stream
+        run_scheduler.ensure_capacity(Priority.INTERACTIVE)
+        
         async def generate_stream():
-            async for chunk in chat_session.send_message_streamed(request.message):
-                yield f"data: {json.dumps(chunk)}\n\n"
+            # Si le client se déconnecte, le générateur est fermé et le run annulé
+            with deadline_scope(deadline):
+                async for chunk in chat_session.send_message_streamed(request.message, Priority.INTERACTIVE, request.toolsets):
+                    yield f"data: {json.dumps(chunk)}\n\n"
         
         return StreamingResponse(
             generate_stream(),
@@ -108,6 +204,8 @@ async def chat_stream(request: MessageRequest):
             }
         )
         
+    except SchedulerSaturated:
+        raise
     except Exception as e:
         print(f"Error in streaming chat endpoint: {e}")  # Debug log
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,8 +287,167 @@ async def list_sessions():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/geocode/batch")
+async def geocode_batch(request: GeocodeBatchRequest):
+    """
+    Géocode une liste d'adresses (imports de portefeuille, comparaisons de
+    zones) en SSE : un résultat par adresse, dans l'ordre de la liste, dès
+    qu'il est connu, puis un récapitulatif.
+    """
+    if not request.addresses:
+        raise HTTPException(status_code=400, detail="No addresses to geocode")
+    if len(request.addresses) > GEOCODE_BATCH_MAX_ADDRESSES:
+        raise HTTPException(status_code=400, detail=f"At most {GEOCODE_BATCH_MAX_ADDRESSES} addresses per request")
+    # Import à la demande : le géocodeur (requests) n'est pas chargé au démarrage
+    from tools.geocoding import geocode_many
+    
+    async def generate_stream():
+        found = degraded = 0
+        index = 0
+        async for result in geocode_many(request.addresses):
+            found += result.found
+            degraded += result.degraded
+            yield f"data: {json.dumps({'type': 'result', 'index': index, 'result': result.model_dump()})}\n\n"
+            index += 1
+        yield f"data: {json.dumps({'type': 'final', 'count': index, 'found': found, 'degraded': degraded})}\n\n"
+    
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+        }
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics: run scheduler (queue depth, wait times), coalescing,
+    lazily materialized tools / agents, resident geodata shards, background jobs, hedged sub-agent runs and the geocoder circuit.
+    """
+    # Import à la demande : geodata et le géocodeur ne sont pas chargés au démarrage
+    from geodata.shards import shard_cache
+    from tools.geocoding import mapbox_breaker
+
+    return {
+        "scheduler": run_scheduler.stats(),
+        "singleflight": analysis_flight.stats(),
+        "registry": {"tools": tool_registry.stats(), "agents": agent_registry.stats()},
+        "toolsets": intent_router.stats(),
+        "area_cache": area_cache.stats(),
+        "shards": shard_cache.stats(),
+        "jobs": job_manager.stats(),
+        "hedging": run_hedger.stats(),
+        "geocoder": mapbox_breaker.stats(),
+    }
+
+def cached_area_analysis(cache_key: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cached response of a zone already analyzed (re-clic, rechargement, lien
+    partagé), adapted to the session, or None.
+    """
+    cached = area_cache.get(cache_key)
+    if cached is None:
+        return None
+    print(f"[DEBUG] Area analysis cache hit: {cache_key}")  # Debug
+    response = copy.deepcopy(cached)
+    response["session_id"] = session_id
+    response["timestamp"] = datetime.now().isoformat()
+    response["metadata"]["cached"] = True
+    return response
+
+def prepare_area_polygon(coordinates: List[List[float]]):
+    """
+    Nettoyage / simplification / réparation du polygone, une fois pour toute
+    la requête (400 si dégénéré ou trop de sommets). Calcul numpy de l'ordre
+    du dixième de seconde sur un tracé dense : à appeler via asyncio.to_thread.
+    """
+    # numpy importé à la première analyse, pas au démarrage
+    from geodata.geometry import prepare_polygon
+    try:
+        polygon = prepare_polygon(coordinates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid polygon: {e}")
+    print(f"[DEBUG] Prepared polygon: {polygon.summary()}")  # Debug
+    return polygon
+
+def area_analysis_message(request: AreaAnalysisRequest, polygon) -> str:
+    """
+    Build the analysis message with area data.
+    """
+    return f"""Analyze this area drawn on the map:
+
+AREA DATA:
+- Address: {request.location_address}
+- Center: [{request.area_center[1]}, {request.area_center[0]}] (lat, lng)
+- Area: {polygon.area_km2:.4f} km²
+- Coordinates: {polygon.vertices} polygon points
+- SW Bounds: [{request.area_bounds[0][1]}, {request.area_bounds[0][0]}]
+- NE Bounds: [{request.area_bounds[1][1]}, {request.area_bounds[1][0]}]
+
+Use analyze_drawn_area to analyze this area and identify nearby elements, points of interest, risks and opportunities."""
+
+def store_area_analysis(cache_key: str, response: Dict[str, Any]):
+    """
+    Caches a successful analysis response.
+    """
+    if response.get("success"):
+        response.setdefault("metadata", {})["cached"] = False
+        area_cache.put(cache_key, copy.deepcopy(response))
+
+def attach_zone_analysis(response: Dict[str, Any], request: AreaAnalysisRequest, sections: Dict[str, Any]):
+    """
+    Adds the typed sections produced during the run (ZoneAnalysisResult) to
+    the response metadata.
+    """
+    from models.zone_analysis import ZoneAnalysisResult
+    
+    zone_analysis = ZoneAnalysisResult(
+        zone_address=request.location_address,
+        latitude=request.area_center[1],
+        longitude=request.area_center[0],
+        analysis_timestamp=datetime.now().isoformat(),
+        **sections,
+    )
+    response.setdefault("metadata", {})["zone_analysis"] = zone_analysis.model_dump(mode="json")
+
+async def area_analysis_events(request: AreaAnalysisRequest, session_id: str, polygon, cache_key: str):
+    """
+    Streamed analysis of a drawn area: each section as soon as its analysis
+    is done, then the text chunks and the final response (cached on success).
+    """
+    from geodata.geometry import polygon_scope
+    
+    chat_session = session_manager.get_or_create_session(session_id)
+    analysis_message = area_analysis_message(request, polygon)
+    sections: Dict[str, Any] = {}
+    with polygon_scope(polygon):
+        chunks = chat_session.send_message_streamed(analysis_message, Priority.BATCH, ["area_analysis", "risk_analysis"])
+        async for event in stream_with_sections(chunks):
+            if event["type"] == "section":
+                sections[event["section"]] = event["data"]
+            elif event["type"] == "final":
+                response = {key: value for key, value in event.items() if key != "type"}
+                if response.get("success"):
+                    attach_zone_analysis(response, request, sections)
+                store_area_analysis(cache_key, response)
+                event = {"type": "final", **response}
+            yield event
+
+def cached_section_events(response: Dict[str, Any]):
+    """
+    Section events of a cached response, followed by its final event.
+    """
+    zone_analysis = response.get("metadata", {}).get("zone_analysis") or {}
+    for name in SECTIONS:
+        if zone_analysis.get(name) is not None:
+            yield section_event(name, zone_analysis[name])
+    yield {"type": "final", **response}
+
 @app.post("/analyze-area", response_model=MessageResponse)
-async def analyze_area(request: AreaAnalysisRequest):
+async def analyze_area(request: AreaAnalysisRequest, http_request: Request):
     """
     Endpoint to analyze a drawn area on the map.
     """
@@ -200,32 +457,173 @@ async def analyze_area(request: AreaAnalysisRequest):
         session_id = request.session_id or str(uuid.uuid4())
         print(f"Using session_id: {session_id}")  # Debug log
         
+        # Polygone validé avant le hash (400 si invalide)
+        polygon = await asyncio.to_thread(prepare_area_polygon, request.coordinates)
+        
+        # Zone déjà analysée : réponse en cache
+        cache_key = polygon_hash(request.coordinates, request.location_address)
+        cached = cached_area_analysis(cache_key, session_id)
+        if cached is not None:
+            return MessageResponse(**cached)
+        
+        from geodata.geometry import polygon_scope
+        
         # Create or retrieve the session
         chat_session = session_manager.get_or_create_session(session_id)
         
-        # Build the analysis message with area data
-        analysis_message = f"""Analyze this area drawn on the map:
-
-AREA DATA:
-- Address: {request.location_address}
-- Center: [{request.area_center[1]}, {request.area_center[0]}] (lat, lng)
-- Area: {request.area_size_km2} km²
-- Coordinates: {len(request.coordinates)} polygon points
-- SW Bounds: [{request.area_bounds[0][1]}, {request.area_bounds[0][0]}]
-- NE Bounds: [{request.area_bounds[1][1]}, {request.area_bounds[1][0]}]
-
-Use analyze_drawn_area to analyze this area and identify nearby elements, points of interest, risks and opportunities."""
-        
-        # Send the analysis message
-        response = await chat_session.send_message(analysis_message)
+        # Send the analysis message (cancelled on client disconnect or deadline)
+        analysis_message = area_analysis_message(request, polygon)
+        sections: Dict[str, Any] = {}
+        with deadline_scope(request_deadline(http_request)), polygon_scope(polygon), section_scope(sections.__setitem__):
+            response = await run_until_disconnect(http_request, chat_session.send_message(analysis_message, Priority.BATCH, ["area_analysis", "risk_analysis"]))
         print(f"Analysis response: {response}")  # Debug log
         
+        if response.get("success"):
+            attach_zone_analysis(response, request, {name: data.model_dump(mode="json") for name, data in sections.items()})
+        store_area_analysis(cache_key, response)
         return MessageResponse(**response)
         
+    except (HTTPException, SchedulerSaturated):
+        raise
     except Exception as e:
         print(f"Error in area analysis endpoint: {e}")  # Debug log
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze-area/stream")
+async def analyze_area_stream(request: AreaAnalysisRequest, http_request: Request):
+    """
+    Analyse d'une zone en SSE : chaque section de ZoneAnalysisResult (inondation,
+    canicule, projets immobiliers, constructions futures, transports) dès que
+    son analyse est terminée, puis le texte de synthèse.
+    """
+    print(f"Received streaming area analysis request: {request}")  # Debug log
+    session_id = request.session_id or str(uuid.uuid4())
+    
+    # Polygone validé avant le hash (400 si invalide)
+    polygon = await asyncio.to_thread(prepare_area_polygon, request.coordinates)
+    
+    # Zone déjà analysée : sections et réponse en cache
+    cache_key = polygon_hash(request.coordinates, request.location_address)
+    cached = cached_area_analysis(cache_key, session_id)
+    if cached is None:
+        # Refuser tout de suite (429) plutôt qu'après l'envoi des en-têtes du stream
+        run_scheduler.ensure_capacity(Priority.BATCH)
+    deadline = request_deadline(http_request)
+    
+    async def generate_stream():
+        if cached is not None:
+            for event in cached_section_events(cached):
+                yield f"data: {json.dumps(event)}\n\n"
+            return
+        # Si le client se déconnecte, le générateur est fermé et le run annulé
+        with deadline_scope(deadline):
+            async for event in area_analysis_events(request, session_id, polygon, cache_key):
+                yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+        }
+    )
+
+@app.post("/jobs/analyze-area", response_model=JobSubmission, status_code=202)
+async def submit_area_analysis(request: AreaAnalysisRequest):
+    """
+    Soumet l'analyse d'une zone en tâche de fond : répond tout de suite avec
+    l'id du job, à suivre via GET /jobs/{job_id} ou /jobs/{job_id}/events.
+    Une analyse identique de la même session déjà en attente ou en cours est
+    réutilisée.
+    """
+    print(f"Received area analysis job: {request}")  # Debug log
+    session_id = request.session_id or str(uuid.uuid4())
+    
+    # Polygone invalide : 400 à la soumission, pas un job en échec
+    polygon = await asyncio.to_thread(prepare_area_polygon, request.coordinates)
+    
+    # Zone déjà analysée : job terminé d'emblée
+    cache_key = polygon_hash(request.coordinates, request.location_address)
+    cached = cached_area_analysis(cache_key, session_id)
+    if cached is not None:
+        job = job_manager.completed("analyze-area", cached)
+        return JobSubmission(job_id=job.id, status=job.status, deduplicated=False)
+    
+    async def run_analysis(job):
+        response = None
+        with deadline_scope(Deadline.after(DEFAULT_REQUEST_TIMEOUT_S)):
+            async for event in area_analysis_events(request, session_id, polygon, cache_key):
+                if event["type"] == "section":
+                    job.emit("section", section=event["section"], data=event["data"])
+                elif event["type"] == "chunk":
+                    job.emit("chunk", chunk=event["chunk"])
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"])
+                else:
+                    response = {key: value for key, value in event.items() if key != "type"}
+        return response
+    
+    # Le job écrit dans l'historique de sa session : une autre session a son
+    # propre job (les sous-agents restent partagés par analysis_flight)
+    job, deduplicated = job_manager.submit("analyze-area", f"{cache_key}:{session_id}", run_analysis)
+    return JobSubmission(job_id=job.id, status=job.status, deduplicated=deduplicated)
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    État d'un job, avec son résultat une fois terminé.
+    """
+    return get_job_or_404(job_id).describe()
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, http_request: Request, after: int = -1):
+    """
+    Progression d'un job en SSE : événements passés puis nouveaux, jusqu'à la
+    fin du job. Reprise possible avec ?after=<seq> ou l'en-tête Last-Event-ID.
+    """
+    job = get_job_or_404(job_id)
+    last_event_id = http_request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+    
+    async def generate_events():
+        seq = after
+        while True:
+            events = await job.events_after(seq, timeout=JOB_EVENTS_KEEPALIVE_S)
+            for event in events:
+                seq = event["seq"]
+                yield f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+            if job.done and seq >= len(job.events) - 1:
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+        }
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Annule un job en attente ou en cours (et ses sous-agents).
+    """
+    get_job_or_404(job_id)
+    return job_manager.cancel(job_id).describe()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
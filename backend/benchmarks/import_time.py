@@ -0,0 +1,131 @@
+"""
+Import-time report for backend startup.
+
+Imports `api` in a fresh interpreter with `python -X importtime` and reports the
+slowest modules (cumulative time), the time spent in the project's own modules
+(self time, third-party packages excluded) and the modules that must stay out of
+startup: sub-agent modules and the local geodata stores (numpy) are materialized
+on first use through agentX.registry.
+
+The run fails (exit code 1) when the project self time exceeds the budget or a
+deferred module is imported at startup.
+
+    python benchmarks/import_time.py               # report, 0.5 s budget
+    python benchmarks/import_time.py --budget 0.3 --top 30
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_S = 0.5
+PROJECT_PACKAGES = ("api", "agentX", "tools", "geodata", "models", "chat_session", "command_router")
+
+# Modules that the lazy registry keeps out of startup
+DEFERRED_MODULES = (
+    "agentX.flood_risk_agent",
+    "agentX.heat_wave_agent",
+    "agentX.real_estate_agent",
+    "agentX.construction_agent",
+    "agentX.transportation_agent",
+    "geodata",
+    "numpy",
+)
+
+
+def measure(module: str = "api") -> Dict[str, Dict[str, float]]:
+    """
+    Imports a module in a fresh interpreter and parses the -X importtime output.
+
+    Returns:
+        Dict: module -> {"self_s", "cumulative_s"}
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr[-2000:]}")
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {"self_s": int(self_us) / 1e6, "cumulative_s": int(cumulative_us) / 1e6}
+    return modules
+
+
+def is_project_module(name: str) -> bool:
+    return name.split(".")[0] in PROJECT_PACKAGES
+
+
+def project_self_time(modules: Dict[str, Dict[str, float]]) -> float:
+    return sum(timing["self_s"] for name, timing in modules.items() if is_project_module(name))
+
+
+def deferred_imports(modules: Dict[str, Dict[str, float]]) -> List[str]:
+    """Deferred modules (or their submodules) imported at startup."""
+    return sorted(
+        name for name in modules
+        if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)
+    )
+
+
+def report(modules: Dict[str, Dict[str, float]], top: int = 20) -> str:
+    lines = [f"{'cumulative':>11} {'self':>9}  module"]
+    slowest = sorted(modules.items(), key=lambda item: item[1]["cumulative_s"], reverse=True)[:top]
+    for name, timing in slowest:
+        lines.append(f"{timing['cumulative_s'] * 1000:>9.1f}ms {timing['self_s'] * 1000:>7.1f}ms  {name}")
+
+    lines.append("")
+    lines.append("Project modules (self time):")
+    project = sorted(
+        ((name, timing) for name, timing in modules.items() if is_project_module(name)),
+        key=lambda item: item[1]["self_s"],
+        reverse=True,
+    )
+    for name, timing in project[:top]:
+        lines.append(f"{timing['self_s'] * 1000:>9.1f}ms  {name}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time report for backend startup")
+    parser.add_argument("--module", default="api", help="Module to import")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="Max project self time (s)")
+    parser.add_argument("--top", type=int, default=20, help="Number of modules listed")
+    args = parser.parse_args(argv)
+
+    modules = measure(args.module)
+    print(report(modules, args.top))
+
+    total = modules.get(args.module, {}).get("cumulative_s", 0.0)
+    own = project_self_time(modules)
+    print(f"\nimport {args.module}: {total:.2f}s total, {own:.2f}s in project modules (budget {args.budget:.2f}s)")
+
+    failures = []
+    if own > args.budget:
+        failures.append(f"project import time {own:.2f}s is over the {args.budget:.2f}s budget")
+    deferred = deferred_imports(modules)
+    if deferred:
+        failures.append(f"deferred modules imported at startup: {', '.join(deferred[:10])}")
+
+    if failures:
+        print("\n❌ Startup budget exceeded:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+    print("\n✅ Startup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
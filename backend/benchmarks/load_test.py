@@ -0,0 +1,475 @@
+"""
+End-to-end load test and latency benchmark for the RevAgent API.
+
+Drives /chat, /chat/stream and /analyze-area at a configurable concurrency and
+reports throughput, p50/p95/p99 latency, time-to-first-token (streaming),
+event-loop lag and RSS. Each /analyze-area request draws a slightly shifted
+polygon so that it runs a full analysis instead of hitting the area cache;
+--area-cache-ratio sends that share of them with the same polygon, and the
+cache hits are reported apart from the analyses. Results are written as JSON so two releases can be
+compared with --compare.
+
+By default the API is started in-process on a free port with the offline fake
+model backend (agentX/fake_model.py), so no OpenAI key nor network is needed:
+
+    python benchmarks/load_test.py --concurrency 20 --requests 200 --output results.json
+    python benchmarks/load_test.py --url http://localhost:8000 --scenarios chat_stream
+    python benchmarks/load_test.py --compare baseline.json --output results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_TRACE = os.path.join(BACKEND_DIR, "agentX", "traces", "revagent_offline.json")
+
+AREA_REQUEST = {
+    "coordinates": [[2.360, 48.865], [2.368, 48.865], [2.368, 48.870], [2.360, 48.870], [2.360, 48.865]],
+    "area_center": [2.364, 48.8675],
+    "area_bounds": [[2.360, 48.865], [2.368, 48.870]],
+    "area_size_km2": 0.33,
+    "location_address": "République Paris",
+}
+
+# Shift between two jittered polygons (~5 m, above the 1e-5° grid of the area cache hash)
+AREA_JITTER_DEG = 5e-5
+
+# Jittered polygons are never reused, warm-up included
+_area_sequence = itertools.count(1)
+
+SCENARIOS = {
+    "chat": ("POST", "/chat", {"message": "What are the flood risks in Lyon?"}),
+    "chat_stream": ("POST", "/chat/stream", {"message": "What are the flood risks in Lyon?"}),
+    "analyze_area": ("POST", "/analyze-area", AREA_REQUEST),
+}
+
+
+def area_payload(cache_ratio: float) -> Dict[str, Any]:
+    """AREA_REQUEST as is (share `cache_ratio`, cache hits) or shifted to a polygon not analyzed yet."""
+    if random.random() < cache_ratio:
+        return AREA_REQUEST
+    sequence = next(_area_sequence)
+    dx, dy = (sequence % 100) * AREA_JITTER_DEG, (sequence // 100) * AREA_JITTER_DEG
+
+    def shift(point: List[float]) -> List[float]:
+        return [round(point[0] + dx, 6), round(point[1] + dy, 6)]
+
+    return dict(
+        AREA_REQUEST,
+        coordinates=[shift(point) for point in AREA_REQUEST["coordinates"]],
+        area_center=shift(AREA_REQUEST["area_center"]),
+        area_bounds=[shift(point) for point in AREA_REQUEST["area_bounds"]],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Minimal HTTP/1.1 client (no extra dependency, streams the body as it arrives)
+# ---------------------------------------------------------------------------
+
+async def _read_chunked(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            await reader.readline()
+            return
+        data = await reader.readexactly(size)
+        await reader.readline()
+        yield data
+
+
+async def http_request(base_url: str, method: str, path: str, payload: Dict[str, Any]) -> Tuple[int, AsyncIterator[bytes], Any]:
+    """Sends a JSON request and returns (status, body chunks iterator, writer)."""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    body = json.dumps(payload).encode()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    async def body_chunks() -> AsyncIterator[bytes]:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            async for chunk in _read_chunked(reader):
+                yield chunk
+        elif "content-length" in headers:
+            yield await reader.readexactly(int(headers["content-length"]))
+        else:
+            yield await reader.read()
+
+    return status, body_chunks(), writer
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss is a peak value (kB on Linux, bytes on macOS): best effort fallback
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic callback fires on an event loop."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags_ms: List[float] = []
+        self.rss_samples_mb: List[float] = []
+        self._handle = None
+        self._stopped = False
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        def schedule():
+            expected = loop.time() + self.interval
+
+            def tick():
+                if self._stopped:
+                    return
+                self.lags_ms.append(max(0.0, (loop.time() - expected) * 1000))
+                if len(self.lags_ms) % 10 == 0:
+                    self.rss_samples_mb.append(rss_mb())
+                schedule()
+
+            self._handle = loop.call_at(expected, tick)
+
+        loop.call_soon_threadsafe(schedule)
+
+    def stop(self):
+        self._stopped = True
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies_ms: List[float] = []
+        self.ttft_ms: List[float] = []
+        self.cache_hit_ms: List[float] = []  # Responses served from the area cache
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+        self.elapsed_s = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = len(self.latencies_ms) + len(self.cache_hit_ms)
+        return {
+            "requests": completed + self.errors,
+            "errors": self.errors,
+            "status_codes": self.status_codes,
+            "throughput_rps": completed / self.elapsed_s if self.elapsed_s else None,
+            "latency_ms": summarize(self.latencies_ms),
+            "ttft_ms": summarize(self.ttft_ms) if self.ttft_ms else None,
+            "cache_hits": len(self.cache_hit_ms),
+            "cache_hit_latency_ms": summarize(self.cache_hit_ms) if self.cache_hit_ms else None,
+        }
+
+
+def _cached(body: bytes) -> bool:
+    """True for a JSON response served from the area cache (metadata.cached)."""
+    if not body.startswith(b"{"):
+        return False
+    try:
+        return bool((json.loads(body).get("metadata") or {}).get("cached"))
+    except ValueError:
+        return False
+
+
+async def run_one(base_url: str, scenario: str, result: ScenarioResult, session_id: str, area_cache_ratio: float = 0.0):
+    method, path, payload = SCENARIOS[scenario]
+    if payload is AREA_REQUEST:
+        payload = area_payload(area_cache_ratio)
+    payload = dict(payload, session_id=session_id)
+    start = time.perf_counter()
+    writer = None
+    try:
+        status, chunks, writer = await http_request(base_url, method, path, payload)
+        first_token = None
+        body = b""
+        async for chunk in chunks:
+            if first_token is None and b'"type": "chunk"' in chunk:
+                first_token = time.perf_counter()
+            body += chunk
+        end = time.perf_counter()
+        result.status_codes[str(status)] = result.status_codes.get(str(status), 0) + 1
+        if status >= 400:
+            result.errors += 1
+            return
+        if _cached(body):
+            result.cache_hit_ms.append((end - start) * 1000)
+            return
+        result.latencies_ms.append((end - start) * 1000)
+        if first_token is not None:
+            result.ttft_ms.append((first_token - start) * 1000)
+    except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+        result.errors += 1
+        result.status_codes[type(e).__name__] = result.status_codes.get(type(e).__name__, 0) + 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run_scenario(base_url: str, scenario: str, concurrency: int, total: int, sessions: int,
+                       area_cache_ratio: float = 0.0) -> ScenarioResult:
+    result = ScenarioResult(scenario)
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(total):
+        queue.put_nowait(index)
+
+    async def worker():
+        while True:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await run_one(base_url, scenario, result, f"load-{scenario}-{index % sessions}", area_cache_ratio)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    result.elapsed_s = time.perf_counter() - start
+    return result
+
+
+# ---------------------------------------------------------------------------
+# In-process server with the fake model backend
+# ---------------------------------------------------------------------------
+
+class InProcessServer:
+    """Runs api.app with uvicorn in a background thread and its own event loop."""
+
+    def __init__(self, trace: str, latency_ms: Optional[float], delta_interval_ms: Optional[float]):
+        os.environ["REVAGENT_MODEL_BACKEND"] = "fake"
+        os.environ["REVAGENT_FAKE_TRACE"] = trace
+        if latency_ms is not None:
+            os.environ["REVAGENT_FAKE_LATENCY_MS"] = str(latency_ms)
+        if delta_interval_ms is not None:
+            os.environ["REVAGENT_FAKE_DELTA_INTERVAL_MS"] = str(delta_interval_ms)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        import uvicorn
+        from api import app
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._server.serve())
+
+    def start(self):
+        self._thread.start()
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if self._server is not None and self._server.started:
+                return
+            time.sleep(0.05)
+        raise RuntimeError("In-process API server did not start")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    def fmt(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.1f}"
+
+    def delta(current: Optional[float], previous: Optional[float]) -> str:
+        if baseline is None or current is None or not previous:
+            return ""
+        return f" ({(current - previous) / previous * 100:+.0f}%)"
+
+    print(f"\n=== LOAD TEST ({results['config']['target']}, concurrency={results['config']['concurrency']}) ===")
+    for name, scenario in results["scenarios"].items():
+        previous = (baseline or {}).get("scenarios", {}).get(name, {})
+        latency, prev_latency = scenario["latency_ms"], previous.get("latency_ms") or {}
+        print(f"\n[{name}] {scenario['requests']} requests, {scenario['errors']} errors, "
+              f"{fmt(scenario['throughput_rps'])} req/s{delta(scenario['throughput_rps'], previous.get('throughput_rps'))}")
+        for key in ("p50", "p95", "p99"):
+            print(f"  latency {key}: {fmt(latency[key])} ms{delta(latency[key], prev_latency.get(key))}")
+        if scenario.get("cache_hits"):
+            hits, prev_hits = scenario["cache_hit_latency_ms"], previous.get("cache_hit_latency_ms") or {}
+            print(f"  cache hits: {scenario['cache_hits']} (not in the latencies above), "
+                  f"p50 {fmt(hits['p50'])} ms{delta(hits['p50'], prev_hits.get('p50'))}, "
+                  f"p99 {fmt(hits['p99'])} ms{delta(hits['p99'], prev_hits.get('p99'))}")
+        if scenario["ttft_ms"]:
+            prev_ttft = previous.get("ttft_ms") or {}
+            for key in ("p50", "p95", "p99"):
+                print(f"  ttft    {key}: {fmt(scenario['ttft_ms'][key])} ms{delta(scenario['ttft_ms'][key], prev_ttft.get(key))}")
+
+    server = results.get("server")
+    if server:
+        print(f"\n[server] loop lag p50={fmt(server['loop_lag_ms']['p50'])} ms p99={fmt(server['loop_lag_ms']['p99'])} ms "
+              f"max={fmt(server['loop_lag_ms']['max'])} ms, RSS peak={fmt(server['rss_mb']['peak'])} MB")
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    server = None
+    monitor = LoopLagMonitor()
+    rss_start = rss_mb()
+    if args.url:
+        target = args.url
+    else:
+        server = InProcessServer(args.trace, args.latency_ms, args.delta_interval_ms)
+        server.start()
+        monitor.start(server.loop)
+        target = server.url
+
+    scenarios = {}
+    try:
+        for scenario in args.scenarios.split(","):
+            scenario = scenario.strip()
+            if scenario not in SCENARIOS:
+                raise SystemExit(f"Unknown scenario: {scenario} (choose from {', '.join(SCENARIOS)})")
+            if args.warmup:
+                await run_scenario(target, scenario, min(args.concurrency, args.warmup), args.warmup, args.sessions,
+                                   args.area_cache_ratio)
+            scenarios[scenario] = (await run_scenario(target, scenario, args.concurrency, args.requests, args.sessions,
+                                                      args.area_cache_ratio)).to_dict()
+    finally:
+        monitor.stop()
+        if server is not None:
+            server.stop()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "target": "in-process (fake model)" if server else args.url,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "sessions": args.sessions,
+            "area_cache_ratio": args.area_cache_ratio,
+            "fake_latency_ms": args.latency_ms,
+            "fake_delta_interval_ms": args.delta_interval_ms,
+            "trace": os.path.relpath(args.trace, BACKEND_DIR) if server else None,
+        },
+        "scenarios": scenarios,
+    }
+    if server is not None:
+        results["server"] = {
+            "loop_lag_ms": summarize(monitor.lags_ms),
+            "rss_mb": {
+                "start": rss_start,
+                "peak": max(monitor.rss_samples_mb + [rss_mb()]),
+                "end": rss_mb(),
+            },
+        }
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the RevAgent API")
+    parser.add_argument("--url", help="Target an already running API instead of an in-process one")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated list of scenarios")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Warm-up requests per scenario (not measured)")
+    parser.add_argument("--sessions", type=int, default=20, help="Number of distinct session ids")
+    parser.add_argument("--area-cache-ratio", type=float, default=0.0,
+                        help="Share of /analyze-area requests reusing the same polygon (area cache hits)")
+    parser.add_argument("--trace", default=DEFAULT_TRACE, help="Fake model trace (in-process mode)")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Override the fake model latency")
+    parser.add_argument("--delta-interval-ms", type=float, default=None, help="Override the fake streaming delta interval")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server debug output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    # The tools print a lot of [DEBUG] lines: keep the report readable
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        results = asyncio.run(main_async(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Micro-benchmarks with regression thresholds for the geometry and lookup hot paths.
+
+Each benchmark runs over parameterized input sizes (polygon vertices, generated
+candidates, gazetteer size, markers) and is compared to a stored baseline.
+The run fails (exit code 1) when a benchmark is slower than its baseline by
+more than its tolerance: the threshold, raised for sub-millisecond cases and
+for cases whose baseline showed a wide spread between repeats. A case above
+its tolerance is measured again and only reported if it regresses every time.
+
+Timings are normalized by a fixed pure-Python calibration workload so that
+baselines recorded on one machine remain usable on another.
+
+    python benchmarks/micro_benchmarks.py                    # compare to baseline
+    python benchmarks/micro_benchmarks.py --update-baseline  # record a new baseline
+    python benchmarks/micro_benchmarks.py --filter polygon --threshold 0.5
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from geodata.geometry import prepare_polygon
+from geodata.spatial import PointIndex
+from tools import map_actions
+from tools.map_actions import (
+    AreaAnalysis,
+    MapAction,
+    generate_properties_in_area,
+    is_point_in_polygon,
+    simulate_property_search,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro_benchmarks.json")
+DEFAULT_THRESHOLD = 0.25
+# Sub-millisecond cases (serialization, exact geocoding) vary by 10-30% between runs
+SUB_MILLISECOND_THRESHOLD = 0.5
+# Tolerance is at least this multiple of the spread recorded with the baseline
+SPREAD_FACTOR = 3.0
+DEFAULT_RETRIES = 2
+
+# name -> (setup returning a zero-argument callable)
+Benchmark = Callable[[], Callable[[], Any]]
+
+
+def _regular_polygon(vertices: int, center: Tuple[float, float] = (2.35, 48.85), radius: float = 0.01) -> List[List[float]]:
+    return [
+        [center[0] + radius * math.cos(2 * math.pi * i / vertices), center[1] + radius * math.sin(2 * math.pi * i / vertices)]
+        for i in range(vertices)
+    ]
+
+
+def bench_point_in_polygon(vertices: int) -> Benchmark:
+    def setup():
+        rng = random.Random(vertices)
+        polygon = _regular_polygon(vertices)
+        points = [(2.35 + rng.uniform(-0.012, 0.012), 48.85 + rng.uniform(-0.012, 0.012)) for _ in range(100)]
+
+        def run():
+            for lng, lat in points:
+                is_point_in_polygon(lng, lat, polygon)
+
+        return run
+    return setup
+
+
+def _synthetic_gazetteer(size: int) -> Dict[str, Tuple[float, float]]:
+    gazetteer = dict(map_actions.ADDRESS_DB)
+    rng = random.Random(size)
+    while len(gazetteer) < size:
+        gazetteer[f"lieu {len(gazetteer)} commune{rng.randint(0, 10 * size)}"] = (rng.uniform(42, 51), rng.uniform(-4, 8))
+    return gazetteer
+
+
+def bench_geocode(size: int, query: str) -> Benchmark:
+    def setup():
+        gazetteer = _synthetic_gazetteer(size)
+
+        def run():
+            original, map_actions.ADDRESS_DB = map_actions.ADDRESS_DB, gazetteer
+            try:
+                map_actions.geocode_address(query)
+            finally:
+                map_actions.ADDRESS_DB = original
+
+        return run
+    return setup
+
+
+def bench_generate_properties(candidates: int) -> Benchmark:
+    def setup():
+        def run():
+            random.seed(candidates)
+            generate_properties_in_area(48.8566, 2.3522, 3.0, 10_000_000, num_properties=candidates)
+
+        return run
+    return setup
+
+
+def bench_simulate_search(location: str) -> Benchmark:
+    def setup():
+        def run():
+            random.seed(42)
+            simulate_property_search(10_000_000, location=location)
+
+        return run
+    return setup
+
+
+def bench_map_action_serialization(markers: int) -> Benchmark:
+    def setup():
+        random.seed(markers)
+        properties = generate_properties_in_area(48.8566, 2.3522, 3.0, 10_000_000, num_properties=markers)
+        marker_dicts = [
+            {"lat": p["latitude"], "lng": p["longitude"], "label": p["address"], "price": p["price"], "rooms": p["rooms"]}
+            for p in properties
+        ]
+
+        def run():
+            action = MapAction(action="search_properties", location="Paris", latitude=48.8566, longitude=2.3522,
+                               zoom_level=13, markers=marker_dicts, search_results=properties, message="bench")
+            with warnings.catch_warnings():
+                # .dict() is what add_map_action uses, deprecated in pydantic 2
+                warnings.simplefilter("ignore", DeprecationWarning)
+                action.dict()
+            action.model_dump_json()
+
+        return run
+    return setup
+
+
+def bench_area_analysis_serialization(pois: int) -> Benchmark:
+    def setup():
+        points_of_interest = [{"type": "transport", "name": f"Station {i}", "distance_km": i / 100} for i in range(pois)]
+
+        def run():
+            analysis = AreaAnalysis(
+                area_center=[2.35, 48.85], area_bounds=[[2.34, 48.84], [2.36, 48.86]], area_size_km2=1.0,
+                nearby_elements=points_of_interest, points_of_interest=points_of_interest,
+                demographic_insights={"population_density": "Moyenne"}, risk_assessment={"flood_risk": "Faible"},
+                infrastructure_analysis={"transport_score": "Bon"},
+            )
+            analysis.model_dump_json()
+
+        return run
+    return setup
+
+
+def bench_nearest_many(points: int, centers: int) -> Benchmark:
+    def setup():
+        rng = random.Random(points)
+        index, _ = PointIndex.build([rng.uniform(48.7, 49.0) for _ in range(points)],
+                                    [rng.uniform(2.1, 2.6) for _ in range(points)])
+        lats = [rng.uniform(48.75, 48.95) for _ in range(centers)]
+        lngs = [rng.uniform(2.2, 2.5) for _ in range(centers)]
+
+        def run():
+            index.nearest_many(lats, lngs, k=5)
+
+        return run
+    return setup
+
+
+def bench_prepare_polygon(vertices: int) -> Benchmark:
+    def setup():
+        # Freehand ring: jittered circle of ~1 km radius
+        rng = random.Random(vertices)
+        polygon = [[lng + rng.uniform(-2e-5, 2e-5), lat + rng.uniform(-2e-5, 2e-5)]
+                   for lng, lat in _regular_polygon(vertices, radius=0.012)]
+
+        def run():
+            prepare_polygon(polygon)
+
+        return run
+    return setup
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+for _vertices in (8, 64, 512):
+    BENCHMARKS[f"polygon.is_point_in_polygon[vertices={_vertices},points=100]"] = bench_point_in_polygon(_vertices)
+for _vertices in (64, 512, 4_096):
+    BENCHMARKS[f"polygon.prepare_polygon[vertices={_vertices}]"] = bench_prepare_polygon(_vertices)
+for _size in (50, 1_000, 10_000):
+    BENCHMARKS[f"gazetteer.geocode_address[size={_size},exact]"] = bench_geocode(_size, "Bastille Paris")
+    BENCHMARKS[f"gazetteer.geocode_address[size={_size},miss]"] = bench_geocode(_size, "Zzyzx Kansas")
+for _candidates in (25, 250, 2_500):
+    BENCHMARKS[f"properties.generate_properties_in_area[candidates={_candidates}]"] = bench_generate_properties(_candidates)
+for _location in ("Lyon", "Quelque part inconnu"):
+    BENCHMARKS[f"properties.simulate_property_search[location={_location}]"] = bench_simulate_search(_location)
+for _points in (1_000, 100_000):
+    BENCHMARKS[f"spatial.nearest_many[points={_points},centers=100,k=5]"] = bench_nearest_many(_points, 100)
+for _markers in (10, 100, 1_000):
+    BENCHMARKS[f"serialization.MapAction[markers={_markers}]"] = bench_map_action_serialization(_markers)
+for _pois in (10, 100, 1_000):
+    BENCHMARKS[f"serialization.AreaAnalysis[pois={_pois}]"] = bench_area_analysis_serialization(_pois)
+
+
+def calibration_workload():
+    total = 0
+    for i in range(20_000):
+        total += (i * i) % 7
+    return total
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Tuple[float, float]:
+    """Best time per call in seconds (min over `repeat` timed batches) and the
+    relative spread of the batches (median / best - 1)."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timer.timeit(number)
+    timings = sorted(timer.repeat(repeat=repeat, number=number))
+    return timings[0] / number, timings[len(timings) // 2] / timings[0] - 1
+
+
+def run_benchmarks(name_filter: Optional[str], repeat: int, min_time: float) -> Dict[str, Any]:
+    calibration, _ = measure(calibration_workload, repeat, min_time)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        seconds, spread = measure(setup(), repeat, min_time)
+        results[name] = {"seconds_per_call": seconds, "normalized": seconds / calibration, "spread": spread}
+        print(f"  {name:<70} {seconds * 1e6:>12.1f} µs")
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_seconds": calibration,
+        "benchmarks": results,
+    }
+
+
+def tolerance(previous: Dict[str, Any], threshold: float) -> float:
+    """Allowed slowdown for one benchmark given its baseline entry."""
+    if previous["seconds_per_call"] < 1e-3:
+        threshold = max(threshold, SUB_MILLISECOND_THRESHOLD)
+    # Baselines recorded before the spread was stored fall back to the threshold
+    return max(threshold, SPREAD_FACTOR * previous.get("spread", 0.0))
+
+
+def remeasure(name: str, calibration: float, repeat: int, min_time: float) -> float:
+    """Normalized time of one benchmark, measured again."""
+    seconds, _ = measure(BENCHMARKS[name](), repeat, min_time)
+    return seconds / calibration
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, retries: int = 0,
+            repeat: int = 5, min_time: float = 0.05) -> List[str]:
+    """Returns the list of regressions (normalized time above baseline * (1 + tolerance)).
+
+    A case above its tolerance is measured up to `retries` more times and kept
+    as a regression only if none of the new measurements is within tolerance.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<70} {'baseline':>10} {'current':>10} {'change':>8} {'allowed':>8}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            print(f"{name:<70} {'-':>10} {current['normalized']:>10.3g}    (new)")
+            continue
+        allowed = tolerance(previous, threshold)
+        normalized = current["normalized"]
+        for _ in range(retries):
+            if normalized / previous["normalized"] - 1 <= allowed:
+                break
+            normalized = min(normalized, remeasure(name, results["calibration_seconds"], repeat, min_time))
+        change = normalized / previous["normalized"] - 1
+        flag = ""
+        if change > allowed:
+            flag = "  REGRESSION"
+            regressions.append(f"{name}: {change * 100:+.0f}% (allowed {allowed * 100:+.0f}%)")
+        elif normalized != current["normalized"]:
+            flag = "  (re-run)"
+        print(f"{name:<70} {previous['normalized']:>10.3g} {normalized:>10.3g} {change * 100:>+7.0f}% "
+              f"{allowed * 100:>+7.0f}%{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with regression thresholds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.25 = +25%%), raised per benchmark for sub-millisecond or noisy cases")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum duration of a timed batch (s)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="Times a regressed benchmark is measured again before it is reported")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    print("Running micro-benchmarks...")
+    results = run_benchmarks(args.filter, args.repeat, args.min_time)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if args.filter and os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        merged = dict(results, benchmarks=dict(baseline.get("benchmarks", {}), **results["benchmarks"]))
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}: run with --update-baseline first")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.retries, args.repeat, args.min_time)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) above tolerance:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print("\n✅ No regression above tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
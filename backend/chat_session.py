@@ -3,10 +3,16 @@ ChatSession - Classe pour maintenir les sessions et communiquer avec le frontend
 Gère la communication entre le frontend et le RevAgent.
 """
 
+import asyncio
 from typing import Dict, List, Optional, Any, AsyncGenerator
 from datetime import datetime
-from agents import Agent, Runner
-from agentX.orchestrator import create_rev_agent
+from agents import Agent, Runner, SQLiteSession
+from agentX.orchestrator import get_rev_agent
+from agentX.intent_router import intent_router
+from agentX.command_router import route_command
+from agentX.model_backend import get_run_config
+from agentX.deadline import current_deadline, check_deadline, run_with_deadline
+from agentX.scheduler import Priority, SchedulerSaturated, run_scheduler
 from openai.types.responses import ResponseTextDeltaEvent
 from tools.map_actions import get_current_map_actions, clear_current_map_actions
 
@@ -19,21 +25,20 @@ class ChatSession:
     
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.session = {}
+        self.session = SQLiteSession(session_id)  # Historique en mémoire
         self.created_at = datetime.now()
         self.last_activity = datetime.now()
         self._last_map_actions = []  # Stocker les dernières actions de carte
         self.current_map_actions = []  # Actions de carte pour la requête courante
-        
-        # Agent RevAgent pour l'évaluation immobilière
-        self.rev_agent = create_rev_agent()
     
-    async def send_message_streamed(self, user_message: str) -> AsyncGenerator[Dict[str, Any], None]:
+    async def send_message_streamed(self, user_message: str, priority: Priority = Priority.INTERACTIVE, toolsets: Optional[List[str]] = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Envoie un message à RevAgent et stream la réponse.
         
         Args:
             user_message: Message de l'utilisateur
+            priority: Priorité du run dans l'ordonnanceur
+            toolsets: Outils exposés à RevAgent (classification du message si None, "all" pour tous)
             
         Yields:
             Dict contenant les chunks de réponse
@@ -44,30 +49,68 @@ class ChatSession:
             # Effacer les actions de carte précédentes
             clear_current_map_actions()
             
-            # Traiter le message avec RevAgent en streaming
-            result = Runner.run_streamed(
-                self.rev_agent,
-                user_message,
+            # Commandes de carte simples : exécutées directement, sans LLM
+            fast_response = route_command(user_message)
+            if fast_response is not None:
+                await self._record_fast_path(user_message, fast_response)
+                yield {
+                    "type": "chunk",
+                    "chunk": fast_response,
+                    "session_id": self.session_id,
+                    "timestamp": datetime.now().isoformat(),
+                }
+                yield {
+                    "type": "final",
+                    **self._fast_path_response(fast_response),
+                }
+                return
+            
+            # N'exposer que les outils utiles à ce message (prompt plus court)
+            rev_agent = get_rev_agent(intent_router.select(user_message, toolsets))
+            
+            # Slot dans l'ordonnanceur : limite le nombre de runs simultanés
+            async with run_scheduler.top_level_run(priority):
+                # Traiter le message avec RevAgent en streaming
+                result = Runner.run_streamed(
+                    rev_agent,
+                    user_message,
+                    run_config=get_run_config(),
     #            session=self.session
-            )
+                )
+            
+                # Stopper le run (et les sous-agents) quand la deadline de la requête expire
+                deadline = current_deadline()
+                deadline_timer = None
+                if deadline is not None:
+                    deadline_timer = asyncio.get_running_loop().call_later(deadline.remaining(), result.cancel)
             
-            full_response = ""
+                full_response = ""
             
-            async for event in result.stream_events():
-                print(f"[DEBUG] Stream event type: {event.type}")  # Debug
-                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
-                    chunk = event.data.delta
-                    full_response += chunk
+                try:
+                    async for event in result.stream_events():
+                        print(f"[DEBUG] Stream event type: {event.type}")  # Debug
+                        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                            chunk = event.data.delta
+                            full_response += chunk
                     
-                    # Envoyer le chunk au frontend
-                    yield {
-                        "type": "chunk",
-                        "chunk": chunk,
-                        "session_id": self.session_id,
-                        "timestamp": datetime.now().isoformat(),
-                    }
+                            # Envoyer le chunk au frontend
+                            yield {
+                                "type": "chunk",
+                                "chunk": chunk,
+                                "session_id": self.session_id,
+                                "timestamp": datetime.now().isoformat(),
+                            }
                     
-                # Les actions de carte sont maintenant gérées automatiquement par les outils
+                        # Les actions de carte sont maintenant gérées automatiquement par les outils
+                finally:
+                    # Client déconnecté (générateur fermé) ou erreur : ne pas laisser le run tourner
+                    if deadline_timer is not None:
+                        deadline_timer.cancel()
+                    if not result.is_complete:
+                        result.cancel()
+            
+                # Run interrompu par la deadline
+                check_deadline()
             
             # Récupérer les actions de carte
             map_actions = get_current_map_actions()
@@ -96,15 +139,20 @@ class ChatSession:
                 "timestamp": datetime.now().isoformat(),
             }
 
-    async def send_message(self, user_message: str) -> Dict[str, Any]:
+    async def send_message(self, user_message: str, priority: Priority = Priority.INTERACTIVE, toolsets: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Envoie un message à RevAgent et retourne la réponse formatée.
         
         Args:
             user_message: Message de l'utilisateur
+            priority: Priorité du run dans l'ordonnanceur
+            toolsets: Outils exposés à RevAgent (classification du message si None, "all" pour tous)
             
         Returns:
             Dict contenant la réponse et les métadonnées
+            
+        Raises:
+            SchedulerSaturated: si trop de runs sont déjà en cours ou en attente
         """
         try:
             self.last_activity = datetime.now()
@@ -112,12 +160,23 @@ class ChatSession:
             # Effacer les actions de carte précédentes
             clear_current_map_actions()
             
+            # Commandes de carte simples : exécutées directement, sans LLM
+            fast_response = route_command(user_message)
+            if fast_response is not None:
+                await self._record_fast_path(user_message, fast_response)
+                return self._fast_path_response(fast_response)
+            
+            # N'exposer que les outils utiles à ce message (prompt plus court)
+            rev_agent = get_rev_agent(intent_router.select(user_message, toolsets))
+            
             # Traiter le message avec RevAgent
-            result = await Runner.run(
-                self.rev_agent,
-                user_message,
-                session=self.session
-            )
+            async with run_scheduler.top_level_run(priority):
+                result = await run_with_deadline(Runner.run(
+                    rev_agent,
+                    user_message,
+                    session=self.session,
+                    run_config=get_run_config(),
+                ))
             
             # Récupérer les actions de carte
             map_actions = get_current_map_actions()
@@ -137,6 +196,8 @@ class ChatSession:
             
             return response
             
+        except SchedulerSaturated:
+            raise
         except Exception as e:
             return {
                 "success": False,
@@ -145,6 +206,38 @@ class ChatSession:
                 "timestamp": datetime.now().isoformat(),
             }
     
+    async def _record_fast_path(self, user_message: str, response: str):
+        """
+        Ajoute la commande et sa réponse templatée à l'historique, comme le
+        ferait un tour de l'agent (les questions suivantes y font référence).
+        """
+        await self.session.add_items([
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": response},
+        ])
+    
+    def _fast_path_response(self, message: str) -> Dict[str, Any]:
+        """
+        Construit la réponse d'une commande traitée par le routeur rapide.
+        
+        Args:
+            message: Réponse templatée du routeur
+            
+        Returns:
+            Dict au même format que send_message
+        """
+        return {
+            "success": True,
+            "message": message,
+            "session_id": self.session_id,
+            "timestamp": datetime.now().isoformat(),
+            "metadata": {
+                "response_time": "fast_path",
+                "tokens_used": len(message.split()),
+                "map_actions": get_current_map_actions()
+            }
+        }
+    
     async def get_conversation_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Récupère l'historique de la conversation.
@@ -196,8 +289,8 @@ class ChatSession:
             True si succès, False sinon
         """
         try:
-            # Créer une nouvelle session avec le même ID
-            self.session = {}
+            # Vider l'historique de la session
+            await self.session.clear_session()
             return True
         except Exception:
             return False
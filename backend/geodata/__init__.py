@@ -0,0 +1,3 @@
+"""
+Package geodata - Données géographiques locales (grilles, index spatiaux) pour des analyses sans LLM.
+"""
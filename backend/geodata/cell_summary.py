@@ -0,0 +1,467 @@
+"""
+Precomputed per-cell risk summaries over a region (offline batch job).
+
+A region is tiled into a regular lat/lng grid. For every cell an offline job
+computes, from the other local stores, what the interactive tools would
+otherwise compute on each request:
+
+- flood_<scenario>_pct: share (%) of the cell inside each TRI flood scenario
+- tmax_2030, tmax_2050, heat_island_intensity, green_spaces_pct: climate
+  indicators at the cell center
+- poi_<category>: number of POIs of each category in the cell
+- transport_score: public transport score (1-10) at the cell center
+- walk_minutes: mean walking time to the nearest rail station over the cell
+
+Columns of a missing store are left out; NaN means "no data" (or not computed
+yet). At request time a lookup is a single row read from a memory-mapped
+table.
+
+The cells are computed in chunks (blocks of chunk_cells x chunk_cells cells)
+by a process pool. Each finished chunk is written into the table and
+checkpointed (its cells are no longer dirty), so an interrupted build resumes
+where it stopped. Cells can be marked dirty (a bounding box whose data
+changed) and recomputed alone; a rebuilt source store marks every cell dirty.
+
+Store layout (directory):
+
+    manifest.json   {"lat0", "lon0", "cell_deg", "nrows", "ncols", "chunk_cells",
+                     "columns", "sources", "source"}
+    values.npy      float32 (nrows, ncols, len(columns)), NaN where no data
+    dirty.npy       bool (nrows, ncols) cells to recompute
+
+lat0/lon0 are the coordinates of the south-west corner of cell [0, 0].
+
+    python -m geodata.cell_summary build --bbox 2.22,48.81,2.47,48.91 --workers 8
+    python -m geodata.cell_summary build            # resume an interrupted build
+    python -m geodata.cell_summary dirty --bbox 2.30,48.85,2.32,48.86
+    python -m geodata.cell_summary update           # recompute dirty cells
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodata.shards import ShardedDataset
+from geodata.spatial import KM_PER_DEGREE_LAT
+
+DEFAULT_CELL_SUMMARY_DIR = os.getenv(
+    "CELL_SUMMARY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cells"),
+)
+
+# Grid cell size in degrees (~500 m in latitude) and chunk side in cells
+DEFAULT_CELL_DEG = 0.005
+DEFAULT_CHUNK_CELLS = 16
+
+CLIMATE_COLUMNS = ("tmax_2030", "tmax_2050", "heat_island_intensity", "green_spaces_pct")
+
+Task = Tuple[float, float, float, int, int, int, int, Tuple[str, ...], Optional[np.ndarray]]
+
+
+def _stores() -> Dict[str, Any]:
+    """Source stores installed locally (imported here: workers load them on first use)."""
+    from geodata.climate_store import DEFAULT_CLIMATE_GRID_DIR, get_climate_store
+    from geodata.flood_overlay import DEFAULT_FLOOD_DATA_DIR, get_flood_overlay
+    from geodata.gtfs import DEFAULT_TRANSPORT_DIR, get_transport_engine
+    from geodata.isochrones import DEFAULT_ISOCHRONE_DIR, get_walking_grid
+    from geodata.poi_index import DEFAULT_POI_INDEX_DIR, get_poi_index
+
+    return {
+        "flood": (DEFAULT_FLOOD_DATA_DIR, get_flood_overlay()),
+        "climate": (DEFAULT_CLIMATE_GRID_DIR, get_climate_store()),
+        "poi": (DEFAULT_POI_INDEX_DIR, get_poi_index()),
+        "transport": (DEFAULT_TRANSPORT_DIR, get_transport_engine()),
+        "walking": (DEFAULT_ISOCHRONE_DIR, get_walking_grid()),
+    }
+
+
+def source_fingerprint(path: str) -> str:
+    """Hash of the names, sizes and modification times of a store's files."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(path)):
+        stat = os.stat(os.path.join(path, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def available_columns(stores: Dict[str, Any]) -> List[str]:
+    """Columns that the installed stores can fill."""
+    columns: List[str] = []
+    if stores["flood"][1] is not None:
+        columns += [f"flood_{code}_pct" for code in stores["flood"][1].scenarios]
+    if stores["climate"][1] is not None:
+        columns += [layer for layer in CLIMATE_COLUMNS if layer in stores["climate"][1].layers]
+    if stores["poi"][1] is not None:
+        columns += [f"poi_{category}" for category in stores["poi"][1].categories]
+    if stores["transport"][1] is not None:
+        columns.append("transport_score")
+    if stores["walking"][1] is not None:
+        columns.append("walk_minutes")
+    return columns
+
+
+def cell_ring(lat0: float, lon0: float, cell_deg: float, row: int, col: int) -> List[List[float]]:
+    """Counter-clockwise [[lng, lat], ...] ring of a cell."""
+    south, west = lat0 + row * cell_deg, lon0 + col * cell_deg
+    north, east = south + cell_deg, west + cell_deg
+    return [[west, south], [east, south], [east, north], [west, north]]
+
+
+def compute_chunk(task: Task) -> Tuple[int, int, np.ndarray]:
+    """
+    Computes the cells of a chunk (runs in a worker process).
+
+    Args:
+        task: (lat0, lon0, cell_deg, row0, row1, col0, col1, columns, mask), mask
+            being the (row1 - row0, col1 - col0) cells to compute, or None for all
+
+    Returns:
+        (row0, col0, float32 block of shape (rows, cols, len(columns)))
+    """
+    lat0, lon0, cell_deg, row0, row1, col0, col1, columns, mask = task
+    stores = _stores()
+    position = {name: j for j, name in enumerate(columns)}
+    rows, cols = row1 - row0, col1 - col0
+    block = np.full((rows, cols, len(columns)), np.nan, dtype=np.float32)
+    if mask is None:
+        mask = np.ones((rows, cols), dtype=bool)
+    cells = np.argwhere(mask)
+
+    lats = lat0 + (np.arange(row0, row1) + 0.5) * cell_deg
+    lngs = lon0 + (np.arange(col0, col1) + 0.5) * cell_deg
+    center_lats, center_lngs = np.meshgrid(lats, lngs, indexing="ij")
+
+    climate = stores["climate"][1]
+    if climate is not None:
+        for layer in CLIMATE_COLUMNS:
+            if layer in position:
+                block[:, :, position[layer]] = climate.sample(layer, center_lats.ravel(), center_lngs.ravel()).reshape(rows, cols)
+
+    pois = stores["poi"][1]
+    if pois is not None:
+        # One bounding box query for the chunk (per shard), then per-cell / per-category counts
+        south, west = lat0 + row0 * cell_deg, lon0 + col0 * cell_deg
+        bbox = (west, south, west + cols * cell_deg, south + rows * cell_deg)
+        categories = len(pois.categories)
+        counts = np.zeros((rows, cols, categories), dtype=np.int64)
+        for index in (pois.covering(bbox) if isinstance(pois, ShardedDataset) else [pois]):
+            candidates = index.candidates(*bbox)
+            poi_rows = np.floor((np.asarray(index.lat[candidates]) - south) / cell_deg).astype(np.int64)
+            poi_cols = np.floor((np.asarray(index.lon[candidates]) - west) / cell_deg).astype(np.int64)
+            inside = (poi_rows >= 0) & (poi_rows < rows) & (poi_cols >= 0) & (poi_cols < cols)
+            keys = (poi_rows[inside] * cols + poi_cols[inside]) * categories + np.asarray(index.category[candidates])[inside]
+            counts += np.bincount(keys, minlength=rows * cols * categories).reshape(rows, cols, categories)
+        for code, category in enumerate(pois.categories):
+            if f"poi_{category}" in position:
+                block[:, :, position[f"poi_{category}"]] = counts[:, :, code]
+
+    overlay, engine, walking = stores["flood"][1], stores["transport"][1], stores["walking"][1]
+    for r, c in cells:
+        row, col = row0 + r, col0 + c
+        if overlay is not None:
+            result = overlay.coverage(cell_ring(lat0, lon0, cell_deg, row, col))
+            if result is not None:
+                for code, percent in result[0].items():
+                    if f"flood_{code}_pct" in position:
+                        block[r, c, position[f"flood_{code}_pct"]] = percent
+        if engine is not None and "transport_score" in position:
+            block[r, c, position["transport_score"]] = engine.analyze(float(lats[r]), float(lngs[c]), max_options=0).public_transport_score
+        if walking is not None and "walk_minutes" in position:
+            south, west = lat0 + row * cell_deg, lon0 + col * cell_deg
+            minutes, _ = walking.bbox_mean(west, south, west + cell_deg, south + cell_deg)
+            if minutes is not None:
+                block[r, c, position["walk_minutes"]] = minutes
+    return row0, col0, block
+
+
+class CellSummaryTable:
+    """Memory-mapped per-cell summaries with O(1) point lookups."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.path = path
+        self.lat0, self.lon0 = float(self.manifest["lat0"]), float(self.manifest["lon0"])
+        self.cell_deg = float(self.manifest["cell_deg"])
+        self.shape = (int(self.manifest["nrows"]), int(self.manifest["ncols"]))
+        self.columns: List[str] = self.manifest["columns"]
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    def cell(self, lat: float, lng: float) -> Optional[Tuple[int, int]]:
+        """(row, col) of the cell containing a point, or None outside the grid."""
+        row = math.floor((lat - self.lat0) / self.cell_deg)
+        col = math.floor((lng - self.lon0) / self.cell_deg)
+        if 0 <= row < self.shape[0] and 0 <= col < self.shape[1]:
+            return row, col
+        return None
+
+    def cell_area_km2(self, row: int) -> float:
+        """Area of the cells of a grid row."""
+        lat = self.lat0 + (row + 0.5) * self.cell_deg
+        return (self.cell_deg * KM_PER_DEGREE_LAT) ** 2 * math.cos(math.radians(lat))
+
+    def lookup(self, lat: float, lng: float) -> Optional[Dict[str, float]]:
+        """
+        Summary of the cell containing a point.
+
+        Returns:
+            {column: value} without the NaN columns, or None outside the grid or
+            when nothing is known about the cell
+        """
+        cell = self.cell(lat, lng)
+        if cell is None:
+            return None
+        row = np.asarray(self.values[cell[0], cell[1]], dtype=np.float64)
+        summary = {name: float(value) for name, value in zip(self.columns, row) if not math.isnan(value)}
+        return summary or None
+
+    def flood_coverage(self, lat: float, lng: float) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+        """
+        Flood scenario coverage of the cell containing a point, in the form of
+        FloodOverlay.coverage: ({scenario: percent}, {scenario: km²}), or None.
+        """
+        summary = self.lookup(lat, lng)
+        if summary is None:
+            return None
+        percents = {name[len("flood_"):-len("_pct")]: value for name, value in summary.items()
+                    if name.startswith("flood_") and name.endswith("_pct")}
+        if not percents:
+            return None
+        area = self.cell_area_km2(self.cell(lat, lng)[0])
+        return percents, {code: area * percent / 100 for code, percent in percents.items()}
+
+
+_table: Optional[CellSummaryTable] = None
+_table_loaded = False
+
+
+def get_cell_summaries() -> Optional[CellSummaryTable]:
+    """Returns the shared cell summary table, or None if none is installed."""
+    global _table, _table_loaded
+    if not _table_loaded:
+        _table_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_CELL_SUMMARY_DIR, "manifest.json")):
+            _table = CellSummaryTable(DEFAULT_CELL_SUMMARY_DIR)
+            print(f"[DEBUG] Cell summaries loaded: {_table.shape} cells, {len(_table.columns)} columns from {DEFAULT_CELL_SUMMARY_DIR}")
+    return _table
+
+
+def _save_atomic(path: str, array: np.ndarray):
+    """np.save through a temporary file, so that a checkpoint is never half written."""
+    temporary = path + ".tmp.npy"
+    np.save(temporary, array)
+    os.replace(temporary, path)
+
+
+def _write_manifest(path: str, manifest: Dict[str, Any]):
+    temporary = os.path.join(path, "manifest.json.tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary, os.path.join(path, "manifest.json"))
+
+
+def create(path: str, bbox: Sequence[float], cell_deg: float = DEFAULT_CELL_DEG,
+           chunk_cells: int = DEFAULT_CHUNK_CELLS, source: str = "") -> Dict[str, Any]:
+    """
+    Creates an empty table (all cells dirty) over a bounding box.
+
+    Args:
+        path: Output directory
+        bbox: (min_lng, min_lat, max_lng, max_lat)
+        cell_deg: Cell size in degrees
+        chunk_cells: Chunk side in cells (unit of work and of checkpointing)
+        source: Free text describing the region
+
+    Returns:
+        The manifest
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    lat0 = math.floor(min_lat / cell_deg) * cell_deg
+    lon0 = math.floor(min_lng / cell_deg) * cell_deg
+    nrows = max(1, math.ceil((max_lat - lat0) / cell_deg))
+    ncols = max(1, math.ceil((max_lng - lon0) / cell_deg))
+    stores = _stores()
+    columns = available_columns(stores)
+    if not columns:
+        raise ValueError("No local store installed (flood, climate, POI, transport or walking)")
+
+    os.makedirs(path, exist_ok=True)
+    values = np.lib.format.open_memmap(os.path.join(path, "values.npy"), mode="w+", dtype=np.float32,
+                                       shape=(nrows, ncols, len(columns)))
+    values[:] = np.nan
+    values.flush()
+    del values
+    _save_atomic(os.path.join(path, "dirty.npy"), np.ones((nrows, ncols), dtype=bool))
+    manifest = {
+        "lat0": lat0, "lon0": lon0, "cell_deg": cell_deg, "nrows": nrows, "ncols": ncols,
+        "chunk_cells": chunk_cells, "columns": columns,
+        "sources": {name: source_fingerprint(directory) for name, (directory, store) in stores.items() if store is not None},
+        "source": source,
+    }
+    _write_manifest(path, manifest)
+    return manifest
+
+
+def mark_dirty(path: str, bbox: Sequence[float]) -> int:
+    """
+    Marks the cells overlapping a bounding box for recomputation.
+
+    Returns:
+        Number of cells marked
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    min_lng, min_lat, max_lng, max_lat = bbox
+    cell_deg = manifest["cell_deg"]
+    r0 = max(0, math.floor((min_lat - manifest["lat0"]) / cell_deg))
+    c0 = max(0, math.floor((min_lng - manifest["lon0"]) / cell_deg))
+    r1 = min(manifest["nrows"], math.floor((max_lat - manifest["lat0"]) / cell_deg) + 1)
+    c1 = min(manifest["ncols"], math.floor((max_lng - manifest["lon0"]) / cell_deg) + 1)
+    dirty = np.load(os.path.join(path, "dirty.npy"))
+    dirty[r0:r1, c0:c1] = True
+    _save_atomic(os.path.join(path, "dirty.npy"), dirty)
+    return max(0, r1 - r0) * max(0, c1 - c0)
+
+
+def changed_sources(path: str) -> List[str]:
+    """Source stores rebuilt (or removed) since the table was computed."""
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    current = {name: source_fingerprint(directory) for name, (directory, store) in _stores().items() if store is not None}
+    return sorted(name for name in set(current) | set(manifest["sources"]) if current.get(name) != manifest["sources"].get(name))
+
+
+def run(path: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Computes the dirty cells, chunk by chunk, in a process pool.
+
+    Chunks are written into the table as they complete, and their cells
+    cleared in the saved dirty flags: the job can be stopped and run again at
+    any time, only the chunks not written yet are computed.
+
+    Args:
+        path: Table directory (see create)
+        workers: Worker processes (0 computes in this process)
+
+    Returns:
+        {"chunks", "cells", "seconds"}
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    lat0, lon0, cell_deg = manifest["lat0"], manifest["lon0"], manifest["cell_deg"]
+    nrows, ncols, chunk = manifest["nrows"], manifest["ncols"], manifest["chunk_cells"]
+    columns = tuple(manifest["columns"])
+    dirty = np.load(os.path.join(path, "dirty.npy"))
+
+    tasks: List[Task] = []
+    for row0 in range(0, nrows, chunk):
+        for col0 in range(0, ncols, chunk):
+            row1, col1 = min(row0 + chunk, nrows), min(col0 + chunk, ncols)
+            mask = dirty[row0:row1, col0:col1]
+            if not mask.any():
+                continue
+            tasks.append((lat0, lon0, cell_deg, row0, row1, col0, col1, columns, None if mask.all() else mask.copy()))
+
+    values = np.load(os.path.join(path, "values.npy"), mmap_mode="r+")
+    started = time.perf_counter()
+    cells = finished = 0
+
+    def checkpoint(row0: int, col0: int, block: np.ndarray):
+        nonlocal cells, finished
+        rows, cols = block.shape[:2]
+        mask = dirty[row0:row0 + rows, col0:col0 + cols].copy()
+        target = values[row0:row0 + rows, col0:col0 + cols]
+        target[mask] = block[mask]
+        values.flush()
+        dirty[row0:row0 + rows, col0:col0 + cols] = False
+        _save_atomic(os.path.join(path, "dirty.npy"), dirty)
+        cells += int(mask.sum())
+        finished += 1
+        elapsed = time.perf_counter() - started
+        print(f"[{finished}/{len(tasks)}] chunk ({row0}, {col0}): {cells} cells in {elapsed:.1f}s ({cells / max(elapsed, 1e-9):.0f} cells/s)")
+
+    if workers == 0:
+        for task in tasks:
+            checkpoint(*compute_chunk(task))
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(compute_chunk, task) for task in tasks]):
+                checkpoint(*future.result())
+    return {"chunks": len(tasks), "cells": cells, "seconds": round(time.perf_counter() - started, 1)}
+
+
+def update(path: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Incremental recompute: the cells marked dirty, or all of them when a
+    source store was rebuilt since the last run.
+    """
+    changed = changed_sources(path)
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if changed:
+        stores = _stores()
+        if available_columns(stores) != manifest["columns"]:
+            raise ValueError(f"Columns changed with the sources {changed}: run a full build")
+        print(f"[DEBUG] Sources changed since the last run: {changed}, every cell is recomputed")
+        dirty = np.load(os.path.join(path, "dirty.npy"))
+        dirty[:] = True
+        _save_atomic(os.path.join(path, "dirty.npy"), dirty)
+        manifest["sources"] = {name: source_fingerprint(directory) for name, (directory, store) in stores.items() if store is not None}
+        _write_manifest(path, manifest)
+    stats = run(path, workers)
+    return {"changed_sources": changed, **stats}
+
+
+def _bbox(value: str) -> Tuple[float, float, float, float]:
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4 or parts[0] >= parts[2] or parts[1] >= parts[3]:
+        raise argparse.ArgumentTypeError("expected min_lng,min_lat,max_lng,max_lat")
+    return tuple(parts)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute per-cell risk summaries from the local stores")
+    parser.add_argument("command", choices=["build", "dirty", "update"])
+    parser.add_argument("--out", default=DEFAULT_CELL_SUMMARY_DIR, help="Table directory")
+    parser.add_argument("--bbox", type=_bbox, help="min_lng,min_lat,max_lng,max_lat (region to build, or cells to mark dirty)")
+    parser.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG, help="Cell size in degrees")
+    parser.add_argument("--chunk-cells", type=int, default=DEFAULT_CHUNK_CELLS, help="Chunk side in cells")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count, 0: no pool)")
+    parser.add_argument("--restart", action="store_true", help="Discard an interrupted build")
+    args = parser.parse_args(argv)
+
+    exists = os.path.exists(os.path.join(args.out, "manifest.json"))
+    if args.command == "build":
+        if not exists or args.restart:
+            if args.bbox is None:
+                parser.error("build needs --bbox")
+            create(args.out, args.bbox, args.cell_deg, args.chunk_cells, source=",".join(map(str, args.bbox)))
+        else:
+            with open(os.path.join(args.out, "manifest.json"), encoding="utf-8") as f:
+                columns = json.load(f)["columns"]
+            if available_columns(_stores()) != columns:
+                parser.error(f"the installed stores changed since the build in {args.out} started: run build --restart")
+            print(f"Resuming the build in {args.out}")
+        print(f"Table written to {args.out}: {run(args.out, args.workers)}")
+    elif not exists:
+        parser.error(f"no table in {args.out}: run build first")
+    elif args.command == "dirty":
+        if args.bbox is None:
+            parser.error("dirty needs --bbox")
+        print(f"{mark_dirty(args.out, args.bbox)} cells marked dirty in {args.out}")
+    else:
+        print(f"Table updated in {args.out}: {update(args.out, args.workers)}")
+
+
+if __name__ == "__main__":
+    main()
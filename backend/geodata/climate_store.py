@@ -0,0 +1,272 @@
+"""
+Local store of gridded climate projections (DRIAS-style grids).
+
+Each layer is a 2D float32 grid saved as .npy and opened memory-mapped, so
+a lookup only touches the pages around the requested cells. Lookups are
+vectorized bilinear interpolations, for one point or thousands at once.
+
+Store layout (directory):
+
+    manifest.json   {"grid": {"lat0", "lon0", "dlat", "dlon", "nlat", "nlon"},
+                     "layers": {"tmax_2030": "tmax_2030.npy", ...}, "source": "..."}
+    <layer>.npy     float32 array of shape (nlat, nlon), NaN where no data
+
+lat0/lon0 are the coordinates of the center of cell [0, 0].
+
+Build a store from a CSV export (one row per grid point):
+
+    python -m geodata.climate_store drias.csv --out data/climate \\
+        --layer tmax_2030=TXx_H1 --layer tmax_2050=TXx_H2 \\
+        --layer heat_island_intensity=ICU --layer green_spaces_pct=VEG
+"""
+
+import argparse
+import csv
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from geodata.shards import SHARD_INDEX, ShardCache, ShardedDataset
+from models.zone_analysis import HeatWaveRiskData, RiskLevel
+
+DEFAULT_CLIMATE_GRID_DIR = os.getenv(
+    "CLIMATE_GRID_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "climate"),
+)
+
+# Layers needed to build a HeatWaveRiskData without the agent
+HEAT_WAVE_LAYERS = ("tmax_2030", "tmax_2050", "heat_island_intensity", "green_spaces_pct")
+
+# Max temperature projected for 2050 (°C) -> risk level
+HEAT_WAVE_RISK_THRESHOLDS = ((35.0, RiskLevel.LOW), (38.0, RiskLevel.MEDIUM), (41.0, RiskLevel.HIGH))
+
+# Urban heat island intensity (°C) from which the effect is considered present
+HEAT_ISLAND_THRESHOLD = 1.0
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+class ClimateQueries:
+    """Point and heat wave queries on top of sample() and layers (single store or shards)."""
+
+    def sample_point(self, latitude: float, longitude: float) -> Dict[str, Optional[float]]:
+        """Values of every layer at one point (None where there is no data)."""
+        values = {}
+        for layer in self.layers:
+            value = float(self.sample(layer, latitude, longitude))
+            values[layer] = None if np.isnan(value) else value
+        return values
+
+    def heat_wave_risk(self, latitude: float, longitude: float) -> Optional[HeatWaveRiskData]:
+        """Builds a HeatWaveRiskData from the grids, or None if the point is not covered."""
+        if any(layer not in self.layers for layer in HEAT_WAVE_LAYERS):
+            return None
+        values = self.sample_point(latitude, longitude)
+        if any(values[layer] is None for layer in HEAT_WAVE_LAYERS):
+            return None
+        return heat_wave_risk_from_values(values)
+
+    def heat_wave_risks(self, latitudes: ArrayLike, longitudes: ArrayLike) -> list:
+        """Batch version of heat_wave_risk (None for uncovered points)."""
+        if any(layer not in self.layers for layer in HEAT_WAVE_LAYERS):
+            return [None] * np.size(latitudes)
+        columns = {layer: np.atleast_1d(self.sample(layer, latitudes, longitudes)) for layer in HEAT_WAVE_LAYERS}
+        results = []
+        for index in range(len(columns["tmax_2030"])):
+            values = {layer: float(column[index]) for layer, column in columns.items()}
+            covered = not any(np.isnan(value) for value in values.values())
+            results.append(heat_wave_risk_from_values(values) if covered else None)
+        return results
+
+
+class ClimateGridStore(ClimateQueries):
+    """Memory-mapped climate projection grids with bilinear lookups."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        grid = manifest["grid"]
+        self.path = path
+        self.source = manifest.get("source", "")
+        self.lat0, self.lon0 = float(grid["lat0"]), float(grid["lon0"])
+        self.dlat, self.dlon = float(grid["dlat"]), float(grid["dlon"])
+        self.shape = (int(grid["nlat"]), int(grid["nlon"]))
+        self.layers: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, filename), mmap_mode="r")
+            for name, filename in manifest["layers"].items()
+        }
+
+    def sample(self, layer: str, latitudes: ArrayLike, longitudes: ArrayLike) -> np.ndarray:
+        """
+        Bilinear interpolation of a layer at the given points.
+
+        NaN cells are ignored (weights renormalized over valid neighbours);
+        points outside the grid, or with no valid neighbour, get NaN.
+
+        Args:
+            layer: Layer name (e.g. "tmax_2050")
+            latitudes: Latitude(s) of the points
+            longitudes: Longitude(s) of the points
+
+        Returns:
+            Array of interpolated values, same shape as the inputs
+        """
+        grid = self.layers[layer]
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        fi = (lat - self.lat0) / self.dlat
+        fj = (lon - self.lon0) / self.dlon
+        nlat, nlon = self.shape
+
+        # Points further than half a cell outside the grid have no value
+        outside = (fi < -0.5) | (fi > nlat - 0.5) | (fj < -0.5) | (fj > nlon - 0.5)
+        fi = np.clip(fi, 0, nlat - 1)
+        fj = np.clip(fj, 0, nlon - 1)
+        i0 = np.minimum(np.floor(fi).astype(np.intp), max(nlat - 2, 0))
+        j0 = np.minimum(np.floor(fj).astype(np.intp), max(nlon - 2, 0))
+        i1 = np.minimum(i0 + 1, nlat - 1)
+        j1 = np.minimum(j0 + 1, nlon - 1)
+        ti = fi - i0
+        tj = fj - j0
+
+        values = np.stack([grid[i0, j0], grid[i0, j1], grid[i1, j0], grid[i1, j1]]).astype(np.float64)
+        weights = np.stack([(1 - ti) * (1 - tj), (1 - ti) * tj, ti * (1 - tj), ti * tj])
+        valid = ~np.isnan(values)
+        weights = np.where(valid, weights, 0.0)
+        total = weights.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = (np.where(valid, values, 0.0) * weights).sum(axis=0) / total
+        return np.where(outside | (total <= 0), np.nan, result)
+
+
+def heat_wave_risk_from_values(values: Dict[str, float]) -> HeatWaveRiskData:
+    """Maps interpolated grid values to a HeatWaveRiskData."""
+    tmax_2050 = values["tmax_2050"]
+    risk_level = RiskLevel.VERY_HIGH
+    for threshold, level in HEAT_WAVE_RISK_THRESHOLDS:
+        if tmax_2050 < threshold:
+            risk_level = level
+            break
+    return HeatWaveRiskData(
+        risk_level=risk_level,
+        max_temperature_projection_2030=round(values["tmax_2030"], 1),
+        max_temperature_projection_2050=round(tmax_2050, 1),
+        heat_island_effect=values["heat_island_intensity"] >= HEAT_ISLAND_THRESHOLD,
+        cooling_infrastructure=[],
+        green_spaces_percentage=round(min(max(values["green_spaces_pct"], 0.0), 100.0), 1),
+    )
+
+
+class ShardedClimateStore(ClimateQueries, ShardedDataset):
+    """Climate grids split in tiles, opened on demand (see geodata.shards)."""
+
+    kind = "climate"
+
+    def __init__(self, root: str, cache: Optional[ShardCache] = None):
+        super().__init__(root, ClimateGridStore, cache)
+        self.layers: List[str] = sorted({layer for shard in self.shards for layer in shard.get("layers", [])})
+
+    def sample(self, layer: str, latitudes: ArrayLike, longitudes: ArrayLike) -> np.ndarray:
+        """ClimateGridStore.sample, each point read from the first tile with a value there."""
+        lat, lon = np.broadcast_arrays(np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+        result = np.full(lat.shape, np.nan)
+        for shard in self.shards:
+            if layer not in shard.get("layers", []):
+                continue
+            min_lng, min_lat, max_lng, max_lat = shard["bbox"]
+            todo = np.isnan(result) & (lon >= min_lng) & (lon <= max_lng) & (lat >= min_lat) & (lat <= max_lat)
+            if todo.any():
+                result[todo] = self.open(shard).sample(layer, lat[todo], lon[todo])
+        return result
+
+
+_store: Optional[Union[ClimateGridStore, ShardedClimateStore]] = None
+_store_loaded = False
+
+
+def get_climate_store() -> Optional[Union[ClimateGridStore, ShardedClimateStore]]:
+    """Returns the shared store (single grid or tiles), or None if no grid is installed."""
+    global _store, _store_loaded
+    if not _store_loaded:
+        _store_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_CLIMATE_GRID_DIR, "manifest.json")):
+            _store = ClimateGridStore(DEFAULT_CLIMATE_GRID_DIR)
+            print(f"[DEBUG] Climate grid store loaded: {list(_store.layers)} from {DEFAULT_CLIMATE_GRID_DIR}")
+        elif os.path.exists(os.path.join(DEFAULT_CLIMATE_GRID_DIR, SHARD_INDEX)):
+            _store = ShardedClimateStore(DEFAULT_CLIMATE_GRID_DIR)
+            print(f"[DEBUG] Climate grid store indexed: {len(_store.shards)} tiles {_store.layers} from {DEFAULT_CLIMATE_GRID_DIR}")
+    return _store
+
+
+def write_store(path: str, grid: Dict[str, float], layers: Dict[str, np.ndarray], source: str = "") -> ClimateGridStore:
+    """
+    Writes a store (manifest + one .npy per layer) and opens it.
+
+    Args:
+        path: Output directory
+        grid: {"lat0", "lon0", "dlat", "dlon"} of the cell centers
+        layers: Layer name -> 2D array (nlat, nlon)
+        source: Free text describing the data origin
+    """
+    os.makedirs(path, exist_ok=True)
+    shapes = {array.shape for array in layers.values()}
+    if len(shapes) != 1:
+        raise ValueError(f"All layers must have the same shape, got {shapes}")
+    nlat, nlon = shapes.pop()
+    for name, array in layers.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.asarray(array, dtype=np.float32))
+    manifest = {
+        "grid": dict(grid, nlat=nlat, nlon=nlon),
+        "layers": {name: f"{name}.npy" for name in layers},
+        "source": source,
+    }
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return ClimateGridStore(path)
+
+
+def build_from_csv(csv_path: str, out: str, layer_columns: Dict[str, str], lat_col: str = "lat", lon_col: str = "lon", delimiter: str = ",") -> ClimateGridStore:
+    """Builds a store from a CSV with one row per point of a regular grid."""
+    with open(csv_path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f, delimiter=delimiter))
+    lats = np.array([float(row[lat_col]) for row in rows])
+    lons = np.array([float(row[lon_col]) for row in rows])
+    unique_lats, unique_lons = np.unique(lats.round(6)), np.unique(lons.round(6))
+    dlat = float(np.min(np.diff(unique_lats))) if len(unique_lats) > 1 else 1.0
+    dlon = float(np.min(np.diff(unique_lons))) if len(unique_lons) > 1 else 1.0
+    lat0, lon0 = float(unique_lats[0]), float(unique_lons[0])
+    nlat = int(round((unique_lats[-1] - lat0) / dlat)) + 1
+    nlon = int(round((unique_lons[-1] - lon0) / dlon)) + 1
+    rows_index = np.round((lats - lat0) / dlat).astype(np.intp)
+    cols_index = np.round((lons - lon0) / dlon).astype(np.intp)
+
+    layers = {}
+    for layer, column in layer_columns.items():
+        array = np.full((nlat, nlon), np.nan, dtype=np.float32)
+        values = np.array([float(row[column]) if row[column] not in ("", "NA", "nan") else np.nan for row in rows])
+        array[rows_index, cols_index] = values
+        layers[layer] = array
+
+    grid = {"lat0": lat0, "lon0": lon0, "dlat": dlat, "dlon": dlon}
+    return write_store(out, grid, layers, source=os.path.basename(csv_path))
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build a climate projection grid store from a CSV export")
+    parser.add_argument("csv", help="CSV file with one row per grid point")
+    parser.add_argument("--out", default=DEFAULT_CLIMATE_GRID_DIR, help="Output directory")
+    parser.add_argument("--layer", action="append", required=True, help="layer=column, e.g. tmax_2050=TXx_H2")
+    parser.add_argument("--lat-col", default="lat")
+    parser.add_argument("--lon-col", default="lon")
+    parser.add_argument("--delimiter", default=",")
+    args = parser.parse_args(argv)
+
+    layer_columns = dict(item.split("=", 1) for item in args.layer)
+    store = build_from_csv(args.csv, args.out, layer_columns, args.lat_col, args.lon_col, args.delimiter)
+    print(f"Store written to {args.out}: grid {store.shape}, layers {list(store.layers)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,632 @@
+"""
+Flood scenario overlay: share of a zone inside each TRI flood extent.
+
+The TRI maps (Territoires à Risque important d'Inondation) give, per scenario,
+the polygons flooded by a frequent (01For), medium (02Moy), medium with climate
+change (03Mcc) and extreme (04Fai) event. For a drawn zone, the area of its
+intersection with the union of each scenario's polygons is computed in the
+projected metric CRS of the data, and turned into a FloodRiskData.
+
+Intersection areas use Green's theorem: the boundary of A ∩ B is made of the
+parts of ∂A inside B and the parts of ∂B inside A. Every edge is split where
+it meets another one (crossings, T-junctions, collinear overlaps), so that
+sub-segments either do not overlap or coincide; coinciding ones (boundaries
+shared by adjacent polygons, polygons repeated across shards) are merged and
+kept only where the intersection lies on one side of them. The shoelace terms
+of these boundary segments are summed. Non-convex polygons, holes and
+multipolygons are handled, with points closer than 1e-9 of the zone size
+treated as one, and the work vectorizes over all the candidate polygons of a
+scenario at once (their edges are concatenated).
+
+Store layout (directory):
+
+    manifest.json       {"crs", "scenarios", "extent", "count", "source"}
+    vertices.npy        float64 (V, 2) ring vertices in the store CRS, outer rings
+                        counter-clockwise, holes clockwise
+    ring_start.npy      int64 (R + 1) offsets (CSR) of the rings in vertices
+    polygon_rings.npy   int64 (P + 1) offsets of the rings of each polygon
+    polygon_scenario.npy  uint8 index into "scenarios"
+    polygon_bbox.npy    float64 (P, 4) min_x, min_y, max_x, max_y
+    polygon_map.npy     unicode id_carte of each polygon
+
+Build from the TRI GeoJSON exports (EPSG:2154, UTM or WGS84); the files are
+streamed (geodata.ingest), so national exports of several GB fit in memory:
+
+    python -m geodata.flood_overlay n_tri_chat2014_carte_inond_s_086.json --out data/flood
+
+For the whole country, build one store per département under the data
+directory and index them (geodata.shards): only the départements queried are
+opened.
+"""
+
+import argparse
+import itertools
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from geodata.geometry import points_in_polygon, signed_area
+from geodata.ingest import ColumnWriter, FeatureStream, StringColumnWriter, chunked, normalize_properties
+from geodata.projection import crs_from_geojson, is_supported, project, utm_crs
+from geodata.shards import SHARD_INDEX, ShardCache, ShardedDataset, ring_bbox
+from models.zone_analysis import FloodRiskData, FloodScenarioCoverage, RiskLevel
+
+DEFAULT_FLOOD_DATA_DIR = os.getenv(
+    "FLOOD_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "flood"),
+)
+
+# TRI scenarios: label and return period (years) used for the probabilities
+SCENARIOS = {
+    "01For": ("Frequent flood (10-30 year return period)", 20),
+    "02Moy": ("Medium flood (100-300 year return period)", 100),
+    "03Mcc": ("Medium flood with climate change", 100),
+    "04Fai": ("Extreme flood (about 1000 year return period)", 1000),
+}
+
+# Coverage (%) below which a scenario is treated as absent (slivers along the edge)
+MIN_COVERAGE_PERCENT = 1.0
+
+# Polygons appended to the store files at once when building
+DEFAULT_CHUNK_POLYGONS = 10000
+
+# Point-by-edge pairs evaluated per block (bounds memory)
+_PAIR_BLOCK = 1 << 21
+
+# Points closer than this share of the zone size are the same point (shared vertices, crossings)
+_SNAP_RELATIVE = 1e-9
+
+
+def _sub_segments(starts: np.ndarray, ends: np.ndarray, edge_ids: np.ndarray, params: np.ndarray,
+                  points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Splits edges at split points.
+
+    Args:
+        starts, ends: Edge endpoints (n, 2)
+        edge_ids: Edge of each split point
+        params: Position of each split point along its edge, in (0, 1)
+        points: Split points (m, 2), used as is so that edges split at a shared
+            vertex end on exactly that vertex
+
+    Returns:
+        (a, b, edge): Endpoints of the sub-segments, in edge order, and their edge
+    """
+    n = len(starts)
+    ids = np.concatenate([np.arange(n), np.arange(n), edge_ids])
+    ts = np.concatenate([np.zeros(n), np.ones(n), params])
+    coordinates = np.concatenate([starts, ends, points.reshape(-1, 2)])
+    order = np.lexsort((ts, ids))
+    ids, coordinates = ids[order], coordinates[order]
+    same_edge = ids[1:] == ids[:-1]
+    return coordinates[:-1][same_edge], coordinates[1:][same_edge], ids[:-1][same_edge]
+
+
+def _split_points(a0: np.ndarray, a1: np.ndarray, tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Points where each edge meets the others: proper crossings, and endpoints of
+    other edges lying on it (T-junctions, collinear overlaps), within `tolerance`.
+    Only the pairs of edges whose bounding boxes touch are evaluated.
+
+    Returns:
+        (i, t, points): edge a[i] is split at points = a0 + t (a1 - a0), 0 < t < 1
+    """
+    n = len(a0)
+    low = np.minimum(a0, a1) - tolerance
+    high = np.maximum(a0, a1) + tolerance
+    pairs_i, pairs_j = [], []
+    rows = max(1, _PAIR_BLOCK // max(1, n))
+    for start in range(0, n, rows):
+        block = slice(start, start + rows)
+        touch = ((low[block, None, 0] <= high[None, :, 0]) & (high[block, None, 0] >= low[None, :, 0])
+                 & (low[block, None, 1] <= high[None, :, 1]) & (high[block, None, 1] >= low[None, :, 1]))
+        i, j = np.nonzero(touch)
+        pairs_i.append(i + start)
+        pairs_j.append(j)
+    i, j = np.concatenate(pairs_i), np.concatenate(pairs_j)
+    i, j = i[i != j], j[i != j]
+
+    r, s = a1[i] - a0[i], a1[j] - a0[j]
+    qp = a0[j] - a0[i]
+    denominator = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denominator
+        u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denominator
+    crossing = (denominator != 0) & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+    found_i, found_t = [i[crossing]], [t[crossing]]
+    found_points = [a0[i[crossing]] + t[crossing, None] * r[crossing]]
+
+    # Endpoints of the other edge on the edge, away from its own endpoints
+    length = np.hypot(r[:, 0], r[:, 1])
+    for ends in (a0[j], a1[j]):
+        d = ends - a0[i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distance = np.abs(r[:, 0] * d[:, 1] - r[:, 1] * d[:, 0]) / length
+            t = (r[:, 0] * d[:, 0] + r[:, 1] * d[:, 1]) / length ** 2
+        on_edge = (distance <= tolerance) & (t * length > tolerance) & ((1 - t) * length > tolerance)
+        found_i.append(i[on_edge])
+        found_t.append(t[on_edge])
+        found_points.append(ends[on_edge])
+    return np.concatenate(found_i), np.concatenate(found_t), np.concatenate(found_points)
+
+
+def _inside_polygons(points: np.ndarray, edge_a: np.ndarray, edge_b: np.ndarray, edge_group: np.ndarray, groups: int) -> np.ndarray:
+    """
+    Even-odd containment of points in several polygons at once.
+
+    Args:
+        points: (p, 2)
+        edge_a, edge_b: Edge endpoints of the polygons, contiguous per polygon
+            (edges that no horizontal ray from the points can cross may be left out)
+        edge_group: Polygon of each edge, non-decreasing
+        groups: Number of polygons
+
+    Returns:
+        Boolean (p, groups) matrix
+    """
+    inside = np.zeros((len(points), groups), dtype=bool)
+    if len(points) == 0 or len(edge_a) == 0:
+        return inside
+    present, starts = np.unique(edge_group, return_index=True)
+    rows = max(1, _PAIR_BLOCK // len(edge_a))
+    ay, by = edge_a[:, 1], edge_b[:, 1]
+    ax, bx = edge_a[:, 0], edge_b[:, 0]
+    for start in range(0, len(points), rows):
+        px = points[start:start + rows, 0:1]
+        py = points[start:start + rows, 1:2]
+        crosses = (ay > py) != (by > py)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x_intersect = (bx - ax) * (py - ay) / (by - ay) + ax
+        counts = np.add.reduceat((crosses & (px < x_intersect)).astype(np.int32), starts, axis=1)
+        inside[start:start + rows, present] = counts % 2 == 1
+    return inside
+
+
+def _shoelace_terms(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return 0.5 * (a[:, 0] * b[:, 1] - b[:, 0] * a[:, 1])
+
+
+def union_intersection_area(query: np.ndarray, edge_a: np.ndarray, edge_b: np.ndarray, edge_group: np.ndarray, groups: int,
+                            tolerance: Optional[float] = None) -> float:
+    """
+    Area of query ∩ (union of polygons), all in the same projected CRS.
+
+    Args:
+        query: Query ring (n, 2), counter-clockwise
+        edge_a, edge_b: Oriented edges of the polygons (outer rings CCW, holes CW),
+            contiguous per polygon
+        edge_group: Polygon of each edge, non-decreasing
+        groups: Number of polygons
+        tolerance: Distance below which points are merged (default: 1e-9 of the query size)
+
+    Returns:
+        Area in squared CRS units
+    """
+    if len(edge_a) == 0:
+        return 0.0
+    min_x, min_y = query.min(axis=0)
+    max_x, max_y = query.max(axis=0)
+    if tolerance is None:
+        tolerance = _SNAP_RELATIVE * max(max_x - min_x, max_y - min_y)
+    edge_min = np.minimum(edge_a, edge_b)
+    edge_max = np.maximum(edge_a, edge_b)
+    # Every test point lies in the query bbox: rays (towards +x) only meet the edges of its band
+    band = (edge_max[:, 1] >= min_y) & (edge_min[:, 1] <= max_y) & (edge_max[:, 0] >= min_x)
+    near = band & (edge_min[:, 0] <= max_x)
+    band_a, band_b, band_group = edge_a[band], edge_b[band], edge_group[band]
+
+    # Query and polygon edges (owner -1: query) split wherever they meet, so that
+    # two sub-segments either do not overlap or coincide
+    starts = np.concatenate([query, edge_a[near]])
+    ends = np.concatenate([np.roll(query, -1, axis=0), edge_b[near]])
+    owner = np.concatenate([np.full(len(query), -1, dtype=np.int64), edge_group[near]])
+    a, b, edge = _sub_segments(starts, ends, *_split_points(starts, ends, tolerance))
+    keep = np.hypot(*(b - a).T) > tolerance
+    a, b, owner = a[keep], b[keep], owner[edge[keep]]
+    if len(a) == 0:
+        return 0.0
+
+    # Coinciding sub-segments (shared or repeated boundaries) become one segment,
+    # oriented from its smallest endpoint; forward: sub-segment in that direction
+    key_a = np.round(a / tolerance).astype(np.int64)
+    key_b = np.round(b / tolerance).astype(np.int64)
+    forward = (key_a[:, 0] < key_b[:, 0]) | ((key_a[:, 0] == key_b[:, 0]) & (key_a[:, 1] < key_b[:, 1]))
+    keys = np.where(forward[:, None], np.column_stack([key_a, key_b]), np.column_stack([key_b, key_a]))
+    _, first, segment = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    segment = segment.ravel()
+    seg_a = np.where(forward[:, None], a, b)[first]
+    seg_b = np.where(forward[:, None], b, a)[first]
+    middles = (seg_a + seg_b) / 2
+    count = len(first)
+
+    def sides(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # A ring lies on the left of its edges: a forward edge covers the left side
+        left, right = np.zeros(count, dtype=bool), np.zeros(count, dtype=bool)
+        left[segment[mask & forward]] = True
+        right[segment[mask & ~forward]] = True
+        return left, right
+
+    # Sides of each segment inside the query: its own edges, else containment
+    is_query = owner < 0
+    query_left, query_right = sides(is_query)
+    off_query = np.flatnonzero(~(query_left | query_right))
+    inside = off_query[points_in_polygon(middles[off_query, 0], middles[off_query, 1], query)]
+    query_left[inside] = query_right[inside] = True
+
+    # Sides inside the union: edges along the segment, or containment in a
+    # polygon without any (even-odd is ambiguous on a polygon's own boundary)
+    union_left, union_right = sides(~is_query)
+    candidates = np.flatnonzero(query_left | query_right)
+    row = np.full(count, -1, dtype=np.int64)
+    row[candidates] = np.arange(len(candidates))
+    inside_polygon = _inside_polygons(middles[candidates], band_a, band_b, band_group, groups)
+    along = ~is_query & (row[segment] >= 0)
+    inside_polygon[row[segment[along]], owner[along]] = False
+    covered = candidates[inside_polygon.any(axis=1)]
+    union_left[covered] = union_right[covered] = True
+
+    # Green's theorem on the boundary of query ∩ union: segments with the
+    # intersection on one side only, oriented with it on their left
+    orientation = (query_left & union_left).astype(np.float64) - (query_right & union_right)
+    return float((_shoelace_terms(seg_a, seg_b) * orientation).sum())
+
+
+def flood_risk_from_coverage(coverage: Dict[str, float], areas_km2: Dict[str, float]) -> FloodRiskData:
+    """
+    Builds a FloodRiskData from the share (%) of a zone inside each scenario.
+
+    Scenario extents are nested (a frequent flood is also a medium one), so the
+    zone is split into bands by the most frequent scenario covering them; the
+    probabilities are the area-weighted chance of at least one flood in 10 / 30
+    years, from the return period of each band.
+    """
+    frequent = coverage.get("01For", 0.0)
+    medium = max([frequent] + [coverage.get(code, 0.0) for code in ("02Moy", "03Mcc")])
+    extreme = max(medium, coverage.get("04Fai", 0.0))
+    bands = ((frequent, 20), (medium - frequent, 100), (extreme - medium, 1000))
+
+    def probability(years: int) -> float:
+        return round(sum(share * (1 - (1 - 1 / period) ** years) for share, period in bands), 2)
+
+    if frequent >= 25:
+        risk_level = RiskLevel.VERY_HIGH
+    elif frequent >= MIN_COVERAGE_PERCENT or medium >= 25:
+        risk_level = RiskLevel.HIGH
+    elif medium >= MIN_COVERAGE_PERCENT or extreme >= 25:
+        risk_level = RiskLevel.MEDIUM
+    else:
+        risk_level = RiskLevel.LOW
+
+    return FloodRiskData(
+        risk_level=risk_level,
+        flood_probability_10_years=probability(10),
+        flood_probability_30_years=probability(30),
+        flood_zone_coverage=[
+            FloodScenarioCoverage(
+                scenario=code,
+                label=SCENARIOS.get(code, (code, None))[0],
+                return_period_years=SCENARIOS.get(code, (code, None))[1],
+                coverage_percent=round(percent, 2),
+                area_km2=round(areas_km2.get(code, 0.0), 4),
+            )
+            for code, percent in coverage.items()
+        ],
+    )
+
+
+class FloodOverlay:
+    """TRI flood polygons (memory-mapped) with zone / scenario overlay queries."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.crs = self.manifest["crs"]
+        self.scenarios: List[str] = self.manifest["scenarios"]
+        self.extent = tuple(self.manifest["extent"])
+
+        self.vertices = np.load(os.path.join(path, "vertices.npy"), mmap_mode="r")
+        self.ring_start = np.load(os.path.join(path, "ring_start.npy"))
+        self.polygon_rings = np.load(os.path.join(path, "polygon_rings.npy"))
+        self.polygon_scenario = np.load(os.path.join(path, "polygon_scenario.npy"))
+        self.polygon_bbox = np.load(os.path.join(path, "polygon_bbox.npy"))
+        self.polygon_map = np.load(os.path.join(path, "polygon_map.npy"))
+
+    def __len__(self) -> int:
+        return len(self.polygon_scenario)
+
+    def project(self, coordinates: Sequence[Sequence[float]]) -> np.ndarray:
+        """Projects a [[lng, lat], ...] ring into the store CRS."""
+        lnglat = np.asarray(coordinates, dtype=np.float64)
+        x, y = project(self.crs, lnglat[:, 0], lnglat[:, 1])
+        return np.column_stack([x, y])
+
+    def covers(self, ring: np.ndarray) -> bool:
+        """Whether a projected ring intersects the extent of the data."""
+        min_x, min_y, max_x, max_y = self.extent
+        return bool(ring[:, 0].max() >= min_x and ring[:, 0].min() <= max_x and ring[:, 1].max() >= min_y and ring[:, 1].min() <= max_y)
+
+    def _polygon_edges(self, polygons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Concatenated edges of polygons, contiguous per polygon: (a, b, polygon position)."""
+        edge_a, edge_b, edge_group = [], [], []
+        for position, polygon in enumerate(polygons):
+            for ring in range(self.polygon_rings[polygon], self.polygon_rings[polygon + 1]):
+                vertices = np.asarray(self.vertices[self.ring_start[ring]:self.ring_start[ring + 1]])
+                edge_a.append(vertices)
+                edge_b.append(np.roll(vertices, -1, axis=0))
+                edge_group.append(np.full(len(vertices), position, dtype=np.int64))
+        if not edge_a:
+            return np.empty((0, 2)), np.empty((0, 2)), np.empty(0, dtype=np.int64)
+        return np.concatenate(edge_a), np.concatenate(edge_b), np.concatenate(edge_group)
+
+    def candidates(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """Polygons whose bounding box overlaps a box in the store CRS."""
+        bbox = self.polygon_bbox
+        return np.flatnonzero((bbox[:, 2] >= min_x) & (bbox[:, 0] <= max_x) & (bbox[:, 3] >= min_y) & (bbox[:, 1] <= max_y))
+
+    def coverage(self, coordinates: Sequence[Sequence[float]]) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+        """
+        Share of a zone inside each scenario.
+
+        Args:
+            coordinates: Zone ring [[lng, lat], ...], counter-clockwise (see geodata.geometry)
+
+        Returns:
+            ({scenario: percent}, {scenario: km²}), or None when the zone is outside the data
+        """
+        return zone_coverage(coordinates, [self])
+
+    def flood_risk(self, coordinates: Sequence[Sequence[float]]) -> Optional[FloodRiskData]:
+        """FloodRiskData of a zone, or None when the zone is outside the data."""
+        result = self.coverage(coordinates)
+        if result is None:
+            return None
+        return flood_risk_from_coverage(*result)
+
+
+def zone_coverage(coordinates: Sequence[Sequence[float]], overlays: Sequence[FloodOverlay]) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+    """
+    Share of a zone inside the union of each scenario's polygons over several
+    overlays in the same CRS (shards: polygons may overlap across them).
+
+    Returns:
+        ({scenario: percent}, {scenario: km²}), or None when the zone is outside all of them
+    """
+    query = overlays[0].project(coordinates)
+    if signed_area(query) < 0:
+        query = query[::-1]
+    overlays = [overlay for overlay in overlays if overlay.covers(query)]
+    if not overlays:
+        return None
+    zone_area = signed_area(query)
+    if zone_area <= 0:
+        return None
+
+    # Candidates: bounding box overlap, then coordinates relative to the zone (precision)
+    min_x, min_y = query.min(axis=0)
+    max_x, max_y = query.max(axis=0)
+    candidates = [overlay.candidates(min_x, min_y, max_x, max_y) for overlay in overlays]
+    origin = query.mean(axis=0)
+
+    percents, areas = {}, {}
+    for code in sorted({code for overlay in overlays for code in overlay.scenarios}):
+        edge_a, edge_b, edge_group, groups = [], [], [], 0
+        for overlay, polygons in zip(overlays, candidates):
+            if code not in overlay.scenarios:
+                continue
+            polygons = polygons[overlay.polygon_scenario[polygons] == overlay.scenarios.index(code)]
+            if len(polygons):
+                a, b, group = overlay._polygon_edges(polygons)
+                edge_a.append(a)
+                edge_b.append(b)
+                edge_group.append(group + groups)
+                groups += len(polygons)
+        area = 0.0
+        if groups:
+            area = union_intersection_area(query - origin, np.concatenate(edge_a) - origin, np.concatenate(edge_b) - origin,
+                                           np.concatenate(edge_group), groups)
+        area = min(max(area, 0.0), zone_area)
+        percents[code] = 100 * area / zone_area
+        areas[code] = area / 1e6
+    return percents, areas
+
+
+class ShardedFloodOverlay(ShardedDataset):
+    """Flood overlay split in département shards, opened on demand (see geodata.shards)."""
+
+    kind = "flood"
+
+    def __init__(self, root: str, cache: Optional[ShardCache] = None):
+        super().__init__(root, FloodOverlay, cache)
+        self.scenarios: List[str] = sorted({code for shard in self.shards for code in shard.get("scenarios", [])})
+        self.crs = ", ".join(sorted({shard["crs"] for shard in self.shards}))
+
+    def coverage(self, coordinates: Sequence[Sequence[float]]) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+        """
+        FloodOverlay.coverage over the shards the zone touches: union of their
+        polygons within a CRS, summed across CRS (disjoint regions).
+        """
+        by_crs: Dict[str, List[FloodOverlay]] = {}
+        for overlay in self.covering(ring_bbox(coordinates)):
+            by_crs.setdefault(overlay.crs, []).append(overlay)
+        results = [result for result in (zone_coverage(coordinates, overlays) for overlays in by_crs.values()) if result is not None]
+        if not results:
+            return None
+        percents: Dict[str, float] = {}
+        areas: Dict[str, float] = {}
+        for crs_percents, crs_areas in results:
+            for code, percent in crs_percents.items():
+                percents[code] = min(100.0, percents.get(code, 0.0) + percent)
+                areas[code] = areas.get(code, 0.0) + crs_areas[code]
+        return percents, areas
+
+    def flood_risk(self, coordinates: Sequence[Sequence[float]]) -> Optional[FloodRiskData]:
+        """FloodRiskData of a zone, or None when the zone is outside every shard."""
+        result = self.coverage(coordinates)
+        if result is None:
+            return None
+        return flood_risk_from_coverage(*result)
+
+
+_overlay: Optional[Union[FloodOverlay, ShardedFloodOverlay]] = None
+_overlay_loaded = False
+
+
+def get_flood_overlay() -> Optional[Union[FloodOverlay, ShardedFloodOverlay]]:
+    """Returns the shared overlay (single store or shards), or None if no flood store is installed."""
+    global _overlay, _overlay_loaded
+    if not _overlay_loaded:
+        _overlay_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_FLOOD_DATA_DIR, "manifest.json")):
+            _overlay = FloodOverlay(DEFAULT_FLOOD_DATA_DIR)
+            print(f"[DEBUG] Flood overlay loaded: {len(_overlay)} polygons ({_overlay.crs}) from {DEFAULT_FLOOD_DATA_DIR}")
+        elif os.path.exists(os.path.join(DEFAULT_FLOOD_DATA_DIR, SHARD_INDEX)):
+            _overlay = ShardedFloodOverlay(DEFAULT_FLOOD_DATA_DIR)
+            print(f"[DEBUG] Flood overlay indexed: {len(_overlay.shards)} shards from {DEFAULT_FLOOD_DATA_DIR}")
+    return _overlay
+
+
+def _oriented(ring: np.ndarray, counter_clockwise: bool) -> np.ndarray:
+    if len(ring) > 1 and (ring[0] == ring[-1]).all():
+        ring = ring[:-1]
+    return ring if (signed_area(ring) > 0) == counter_clockwise else ring[::-1]
+
+
+def read_geojson_polygons(path: str, crs: Optional[str] = None, report_every_s: Optional[float] = None) -> Tuple[str, Iterator[Dict[str, Any]]]:
+    """
+    Reads the flood polygons of a TRI GeoJSON export, as a stream.
+
+    Only the header is read here; the polygons are parsed (and projected) one
+    feature at a time as the iterator is consumed.
+
+    Args:
+        path: GeoJSON file
+        crs: Store CRS for WGS84 files (default: UTM zone of the data)
+        report_every_s: Print the read progress at this interval
+
+    Returns:
+        (crs, iterator of {"scenario", "id_carte", "rings": [outer, *holes]})
+    """
+    stream = FeatureStream(path, report_every_s=report_every_s)
+    source_crs = crs_from_geojson(stream.read_header())
+
+    def polygons() -> Iterator[Dict[str, Any]]:
+        for feature in stream:
+            # Padded fixed-width attributes in the shapefile exports
+            properties = normalize_properties(feature.get("properties"))
+            scenario = properties.get("scenario") or ""
+            geometry = feature.get("geometry") or {}
+            if not scenario or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+                continue
+            parts = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            for part in parts:
+                yield {
+                    "scenario": scenario,
+                    "id_carte": properties.get("id_carte") or "",
+                    "rings": [np.asarray(ring, dtype=np.float64)[:, :2] for ring in part if len(ring) >= 4],
+                }
+        if crs_from_geojson(stream.header) != source_crs:
+            raise ValueError(f"{path}: the crs member follows the features, convert the file first")
+
+    iterator = polygons()
+    if source_crs == "EPSG:4326":
+        first = next(iterator, None)
+        if crs is None:
+            ring = first["rings"][0] if first is not None and first["rings"] else np.zeros((1, 2))
+            crs = utm_crs(float(ring[:, 0].mean()), float(ring[:, 1].mean()))
+        target_crs = crs
+
+        def projected() -> Iterator[Dict[str, Any]]:
+            for polygon in itertools.chain([first] if first is not None else [], iterator):
+                polygon["rings"] = [np.column_stack(project(target_crs, ring[:, 0], ring[:, 1])) for ring in polygon["rings"]]
+                yield polygon
+
+        return crs, projected()
+    if not is_supported(source_crs):
+        raise ValueError(f"{path}: unsupported CRS {source_crs}")
+    if crs is not None and crs != source_crs:
+        raise ValueError(f"{path}: CRS {source_crs} differs from the store CRS {crs}")
+    return source_crs, iterator
+
+
+def write_store(path: str, crs: str, polygons: Iterable[Dict[str, Any]], source: str = "",
+                chunk_size: int = DEFAULT_CHUNK_POLYGONS) -> FloodOverlay:
+    """
+    Writes a store from polygons in a projected CRS and opens it.
+
+    Polygons are consumed chunk by chunk and appended to the store files, so
+    memory does not grow with the number of polygons.
+
+    Args:
+        path: Output directory
+        crs: "EPSG:<code>" of the coordinates
+        polygons: {"scenario", "id_carte", "rings": [outer, *holes]} in meters
+        source: Free text describing the data origin
+        chunk_size: Polygons appended at once
+    """
+    os.makedirs(path, exist_ok=True)
+    vertices = ColumnWriter(os.path.join(path, "vertices.npy"), np.float64, (2,))
+    ring_start = ColumnWriter(os.path.join(path, "ring_start.npy"), np.int64)
+    polygon_rings = ColumnWriter(os.path.join(path, "polygon_rings.npy"), np.int64)
+    polygon_scenario = ColumnWriter(os.path.join(path, "polygon_scenario.npy"), np.uint8)
+    polygon_bbox = ColumnWriter(os.path.join(path, "polygon_bbox.npy"), np.float64, (4,))
+    polygon_map = StringColumnWriter(os.path.join(path, "polygon_map.npy"))
+    ring_start.append([0])
+    polygon_rings.append([0])
+
+    # Scenario codes in order of appearance, sorted when saving
+    seen: List[str] = []
+    extent = [np.inf, np.inf, -np.inf, -np.inf]
+    ring_count = 0
+    for chunk in chunked((polygon for polygon in polygons if polygon["rings"]), chunk_size):
+        rings, ring_ends, bboxes = [], [], []
+        for polygon in chunk:
+            outer, holes = polygon["rings"][0], polygon["rings"][1:]
+            oriented = [_oriented(outer, True)] + [_oriented(hole, False) for hole in holes]
+            rings.extend(oriented)
+            ring_count += len(oriented)
+            ring_ends.append(ring_count)
+            bboxes.append([*oriented[0].min(axis=0), *oriented[0].max(axis=0)])
+            if polygon["scenario"] not in seen:
+                seen.append(polygon["scenario"])
+        ring_start.append(vertices.length + np.cumsum([len(ring) for ring in rings]))
+        vertices.append(np.concatenate(rings))
+        polygon_rings.append(ring_ends)
+        polygon_scenario.append([seen.index(polygon["scenario"]) for polygon in chunk])
+        polygon_bbox.append(bboxes)
+        polygon_map.append([polygon["id_carte"] for polygon in chunk])
+        bbox = np.asarray(bboxes)
+        extent = [min(extent[0], bbox[:, 0].min()), min(extent[1], bbox[:, 1].min()),
+                  max(extent[2], bbox[:, 2].max()), max(extent[3], bbox[:, 3].max())]
+
+    scenarios = sorted(seen)
+    remap = np.asarray([scenarios.index(code) for code in seen] or [0], dtype=np.uint8)
+    count = polygon_scenario.length
+    for writer in (vertices, ring_start, polygon_rings, polygon_bbox, polygon_map):
+        writer.save()
+    polygon_scenario.save(lambda codes: remap[codes])
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        extent = [float(value) for value in extent] if count else [0, 0, 0, 0]
+        json.dump({"crs": crs, "scenarios": scenarios, "extent": extent, "count": count, "source": source}, f, indent=2)
+    return FloodOverlay(path)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the local flood overlay store from TRI GeoJSON exports")
+    parser.add_argument("inputs", nargs="+", help="TRI GeoJSON files (same projected CRS, or WGS84)")
+    parser.add_argument("--out", default=DEFAULT_FLOOD_DATA_DIR, help="Output directory")
+    parser.add_argument("--crs", help="Store CRS for WGS84 inputs (default: UTM zone of the data)")
+    parser.add_argument("--report-every-s", type=float, default=10.0, help="Progress report interval")
+    args = parser.parse_args(argv)
+
+    crs, polygons = args.crs, []
+    for path in args.inputs:
+        crs, file_polygons = read_geojson_polygons(path, crs, report_every_s=args.report_every_s)
+        polygons.append(file_polygons)
+    overlay = write_store(args.out, crs, itertools.chain.from_iterable(polygons), source=", ".join(os.path.basename(path) for path in args.inputs))
+    print(f"Store written to {args.out}: {len(overlay)} polygons ({crs}), scenarios {overlay.scenarios}")
+
+
+if __name__ == "__main__":
+    main()
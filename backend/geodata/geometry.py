@@ -0,0 +1,363 @@
+"""
+Preparation of drawn polygons: cleanup, simplification, repair and area.
+
+Freehand polygons drawn on the map arrive with hundreds of vertices, repeated
+points and sometimes self-intersections (a lasso crossing itself near its
+closing point). prepare_polygon() turns them once per request into a
+PreparedPolygon that every downstream step reuses:
+
+1. non-finite and consecutive duplicate vertices and the closing vertex are dropped
+2. the ring is simplified with Douglas-Peucker to a tolerance in meters (coarser
+   if more than REPAIR_MAX_VERTICES remain, as the crossing search is quadratic);
+   if the simplification creates a crossing, the tolerance is halved and it is retried
+3. remaining self-intersections are repaired by cutting the ring at each crossing
+   and keeping the larger of the two loops
+4. the tolerance is doubled until the ring fits the vertex budget
+5. the ring is oriented counter-clockwise and its area computed in meters
+
+Geometry is computed in a local equirectangular projection (meters) centered
+on the polygon, accurate for city-sized areas.
+"""
+
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodata.spatial import KM_PER_DEGREE_LAT
+
+DEFAULT_TOLERANCE_M = 5.0
+DEFAULT_MAX_VERTICES = 256
+
+# Larger drawn rings are rejected (ValueError)
+DEFAULT_MAX_INPUT_VERTICES = 20000
+
+# Vertices left by the simplification before the crossing search and repair
+REPAIR_MAX_VERTICES = 1024
+
+# Below this area (m²) the polygon is considered degenerate
+MIN_AREA_M2 = 1.0
+
+# Halvings of the tolerance tried when a simplification creates a crossing
+_TOPOLOGY_RETRIES = 3
+
+# Edge pairs tested per block in the crossing search (bounds memory)
+_PAIR_BLOCK = 1 << 20
+
+M_PER_DEGREE_LAT = KM_PER_DEGREE_LAT * 1000
+
+
+def points_in_polygon(lngs: np.ndarray, lats: np.ndarray, polygon_coords: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Vectorized ray casting: which points (lng, lat) fall inside the polygon.
+
+    Args:
+        lngs: Longitudes of the points
+        lats: Latitudes of the points
+        polygon_coords: Polygon [[lng, lat], ...] (closed or not)
+
+    Returns:
+        Boolean mask, True for points inside
+    """
+    inside = np.zeros(len(lngs), dtype=bool)
+    if len(polygon_coords) < 3:
+        return inside
+    polygon = np.asarray(polygon_coords, dtype=np.float64)
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            crosses = (ay > lats) != (by > lats)
+            if not crosses.any():
+                continue
+            x_intersect = (bx - ax) * (lats - ay) / (by - ay) + ax
+            inside ^= crosses & (lngs < x_intersect)
+    return inside
+
+
+def signed_area(ring: np.ndarray) -> float:
+    """Shoelace area of an open ring (n, 2): positive when counter-clockwise."""
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def _dedupe(ring: np.ndarray) -> np.ndarray:
+    ring = ring[np.isfinite(ring).all(axis=1)]
+    if len(ring) == 0:
+        return ring
+    keep = np.ones(len(ring), dtype=bool)
+    keep[1:] = (np.diff(ring, axis=0) != 0).any(axis=1)
+    ring = ring[keep]
+    while len(ring) > 1 and (ring[0] == ring[-1]).all():
+        ring = ring[:-1]
+    return ring
+
+
+def _simplify_line(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker on an open line: mask of the kept vertices (ends always kept)."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        a, b = points[start], points[end]
+        relative = points[start + 1:end] - a
+        segment = b - a
+        length2 = float(segment @ segment)
+        if length2 == 0:
+            distances = np.hypot(relative[:, 0], relative[:, 1])
+        else:
+            # Distance to the segment (not the line), so spikes past its ends are kept
+            t = np.clip(relative @ segment / length2, 0.0, 1.0)
+            offset = relative - t[:, None] * segment
+            distances = np.hypot(offset[:, 0], offset[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def simplify_ring(ring: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker on a closed ring (n, 2), in projected units.
+
+    The ring is split at its first vertex and the vertex farthest from it, and
+    both halves are simplified separately.
+    """
+    if len(ring) <= 3 or tolerance <= 0:
+        return ring
+    far = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+    if far == 0:
+        return ring
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[:far + 1] |= _simplify_line(ring[:far + 1], tolerance)
+    closing = np.vstack([ring[far:], ring[:1]])
+    keep[far:] |= _simplify_line(closing, tolerance)[:-1]
+    return ring[keep]
+
+
+def _first_crossing(ring: np.ndarray) -> Optional[Tuple[int, int, np.ndarray]]:
+    """
+    First proper crossing between two non-adjacent edges of an open ring.
+
+    All edge pairs are tested at once (blocks of rows of the n x n pair matrix).
+
+    Returns:
+        (i, j, point) with i < j: edge i (ring[i] -> ring[i + 1]) crosses edge j
+    """
+    n = len(ring)
+    if n < 4:
+        return None
+    a = ring
+    d = np.roll(ring, -1, axis=0) - ring
+    j = np.arange(n)
+    rows = max(1, _PAIR_BLOCK // n)
+    for start in range(0, n - 2, rows):
+        i = np.arange(start, min(start + rows, n - 2))[:, None]
+        r = d[i[:, 0]]
+        qp = a[None, :, :] - a[i[:, 0]][:, None, :]
+        denominator = r[:, 0:1] * d[None, :, 1] - r[:, 1:2] * d[None, :, 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = (qp[:, :, 0] * d[None, :, 1] - qp[:, :, 1] * d[None, :, 0]) / denominator
+            u = (qp[:, :, 0] * r[:, 1:2] - qp[:, :, 1] * r[:, 0:1]) / denominator
+        # Non-adjacent pairs only: j > i + 1, and not the closing edge with edge 0
+        hits = (j >= i + 2) & ~((i == 0) & (j == n - 1)) & (denominator != 0) & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+        if hits.any():
+            row, col = np.unravel_index(int(np.argmax(hits)), hits.shape)
+            return start + int(row), int(col), a[start + row] + t[row, col] * r[row]
+    return None
+
+
+def repair_ring(ring: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Removes self-intersections by cutting the ring at each crossing and keeping
+    the larger loop (a figure-eight keeps its larger lobe).
+
+    Returns:
+        (ring, number of crossings removed)
+    """
+    repairs = 0
+    for _ in range(len(ring)):
+        crossing = _first_crossing(ring)
+        if crossing is None:
+            break
+        i, j, point = crossing
+        inner = np.vstack([point, ring[i + 1:j + 1]])
+        outer = np.vstack([ring[:i + 1], point, ring[j + 1:]])
+        ring = outer if abs(signed_area(outer)) >= abs(signed_area(inner)) else inner
+        repairs += 1
+    return _dedupe(ring), repairs
+
+
+class PreparedPolygon:
+    """
+    A cleaned, simplified and valid polygon with its precomputed properties.
+
+    Attributes:
+        array: Vertices (n, 2) [lng, lat], open ring, counter-clockwise
+        coordinates: Same vertices as lists, for JSON and the map tools
+        bbox: (min_lng, min_lat, max_lng, max_lat)
+        centroid: Area centroid (lng, lat)
+        area_km2: Area computed server-side
+        input_vertices: Vertex count received
+        repairs: Number of self-intersections removed
+    """
+
+    def __init__(self, array: np.ndarray, area_km2: float, centroid: Tuple[float, float], input_vertices: int, repairs: int = 0):
+        self.array = array
+        self.coordinates: List[List[float]] = array.tolist()
+        self.bbox = (float(array[:, 0].min()), float(array[:, 1].min()), float(array[:, 0].max()), float(array[:, 1].max()))
+        self.centroid = centroid
+        self.area_km2 = area_km2
+        self.input_vertices = input_vertices
+        self.repairs = repairs
+
+    @property
+    def vertices(self) -> int:
+        return len(self.array)
+
+    def contains(self, lng: float, lat: float) -> bool:
+        """Point-in-polygon test with a bounding box shortcut."""
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        if not (min_lng <= lng <= max_lng and min_lat <= lat <= max_lat):
+            return False
+        return bool(points_in_polygon(np.array([lng]), np.array([lat]), self.array)[0])
+
+    def contains_many(self, lngs: Sequence[float], lats: Sequence[float]) -> np.ndarray:
+        """Vectorized point-in-polygon test: boolean mask, True for points inside."""
+        lngs = np.asarray(lngs, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        inside = (lngs >= min_lng) & (lngs <= max_lng) & (lats >= min_lat) & (lats <= max_lat)
+        candidates = np.flatnonzero(inside)
+        if len(candidates):
+            inside[candidates] = points_in_polygon(lngs[candidates], lats[candidates], self.array)
+        return inside
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "vertices": self.vertices,
+            "input_vertices": self.input_vertices,
+            "repairs": self.repairs,
+            "area_km2": round(self.area_km2, 4),
+            "centroid": [round(self.centroid[0], 6), round(self.centroid[1], 6)],
+        }
+
+
+def prepare_polygon(
+    coordinates: Sequence[Sequence[float]],
+    tolerance_m: float = DEFAULT_TOLERANCE_M,
+    max_vertices: int = DEFAULT_MAX_VERTICES,
+    max_input_vertices: int = DEFAULT_MAX_INPUT_VERTICES,
+) -> PreparedPolygon:
+    """
+    Cleans, simplifies, repairs and measures a drawn polygon.
+
+    Args:
+        coordinates: Ring [[lng, lat], ...], closed or not
+        tolerance_m: Douglas-Peucker tolerance in meters
+        max_vertices: Vertex budget of the prepared ring
+        max_input_vertices: Largest ring accepted
+
+    Returns:
+        PreparedPolygon
+
+    Raises:
+        ValueError: if the ring is too large, or fewer than 3 distinct vertices
+            or a degenerate area remain
+    """
+    raw = np.asarray(coordinates, dtype=np.float64)
+    if raw.ndim != 2 or raw.shape[1] < 2:
+        raise ValueError("Polygon coordinates must be [[lng, lat], ...]")
+    if not np.isfinite(raw[:, :2]).all():
+        raise ValueError("Polygon coordinates must be finite numbers")
+    input_vertices = len(raw)
+    if input_vertices > max_input_vertices:
+        raise ValueError(f"Polygon has {input_vertices} vertices, at most {max_input_vertices} are accepted")
+    lnglat = _dedupe(raw[:, :2])
+    if len(lnglat) < 3:
+        raise ValueError(f"Polygon needs at least 3 distinct vertices, got {len(lnglat)}")
+
+    # Local projection in meters around the bounding box center
+    lng0 = float(lnglat[:, 0].min() + lnglat[:, 0].max()) / 2
+    lat0 = float(lnglat[:, 1].min() + lnglat[:, 1].max()) / 2
+    scale_x = M_PER_DEGREE_LAT * math.cos(math.radians(lat0))
+    ring = np.column_stack([(lnglat[:, 0] - lng0) * scale_x, (lnglat[:, 1] - lat0) * M_PER_DEGREE_LAT])
+
+    tolerance = tolerance_m
+    simplified = simplify_ring(ring, tolerance)
+    while len(simplified) > REPAIR_MAX_VERTICES:
+        tolerance = max(tolerance, 0.5) * 2
+        simplified = simplify_ring(ring, tolerance)
+    for _ in range(_TOPOLOGY_RETRIES):
+        if _first_crossing(simplified) is None or tolerance <= 0:
+            break
+        finer = simplify_ring(ring, tolerance / 2)
+        if len(finer) > REPAIR_MAX_VERTICES:
+            break  # Left to the repair
+        tolerance /= 2
+        simplified = finer
+    ring, repairs = repair_ring(simplified)
+
+    # Vertex budget: coarser tolerance until the ring fits
+    while len(ring) > max_vertices:
+        tolerance = max(tolerance, 0.5) * 2
+        ring, extra_repairs = repair_ring(simplify_ring(ring, tolerance))
+        repairs += extra_repairs
+
+    area = signed_area(ring) if len(ring) >= 3 else 0.0
+    if abs(area) < MIN_AREA_M2:
+        raise ValueError("Polygon area is degenerate")
+    if area < 0:
+        ring = ring[::-1]
+        area = -area
+
+    # Area centroid
+    x, y = ring[:, 0], ring[:, 1]
+    x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    cx = float(np.dot(x + x_next, cross)) / (6 * area)
+    cy = float(np.dot(y + y_next, cross)) / (6 * area)
+
+    array = np.column_stack([ring[:, 0] / scale_x + lng0, ring[:, 1] / M_PER_DEGREE_LAT + lat0])
+    return PreparedPolygon(
+        array,
+        area_km2=area / 1e6,
+        centroid=(cx / scale_x + lng0, cy / M_PER_DEGREE_LAT + lat0),
+        input_vertices=input_vertices,
+        repairs=repairs,
+    )
+
+
+def circle_ring(lng: float, lat: float, radius_m: float, vertices: int = 32) -> List[List[float]]:
+    """Counter-clockwise ring [[lng, lat], ...] approximating a circle (zone around a point)."""
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    dlat = radius_m / M_PER_DEGREE_LAT
+    dlng = radius_m / (M_PER_DEGREE_LAT * math.cos(math.radians(lat)))
+    return np.column_stack([lng + dlng * np.cos(angles), lat + dlat * np.sin(angles)]).tolist()
+
+
+# Drawn polygon of the current request, prepared once and shared by the tools
+_current_polygon: ContextVar[Optional[PreparedPolygon]] = ContextVar("current_polygon", default=None)
+
+
+@contextmanager
+def polygon_scope(polygon: Optional[PreparedPolygon]) -> Iterator[Optional[PreparedPolygon]]:
+    """Makes `polygon` the drawn zone of the code (and tasks) run inside the block."""
+    token = _current_polygon.set(polygon)
+    try:
+        yield polygon
+    finally:
+        _current_polygon.reset(token)
+
+
+def current_polygon() -> Optional[PreparedPolygon]:
+    """Prepared drawn zone of the current request, if any."""
+    return _current_polygon.get()
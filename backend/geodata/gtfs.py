@@ -0,0 +1,375 @@
+"""
+Public transport engine built from local GTFS feeds (RATP, SNCF, TCL, ...).
+
+An offline ingest streams the feeds once and precomputes, for every station
+and line serving it, the daytime frequency and the operating hours on a
+typical weekday. The result is stored as memory-mapped arrays: stations in a
+geodata.spatial.PointIndex, lines as CSR ranges per station. A point or
+polygon query is then a radius query plus a few array reads, and returns a
+TransportationData without any LLM or web search.
+
+Store layout (directory):
+
+    manifest.json       {"grid": {...}, "feeds": [...], "stations": int, "lines": int}
+    lat.npy lon.npy     station coordinates, sorted by grid cell
+    cell_start.npy      CSR offsets of the stations per grid cell
+    station_name.npy    station names
+    line_start.npy      CSR offsets: lines of station s are [line_start[s], line_start[s + 1])
+    line_name.npy       route short (or long) names
+    line_type.npy       uint8 index into TRANSPORT_TYPES
+    line_frequency.npy  float32 daytime headway in minutes (NaN if no daytime service)
+    line_first.npy      int32 first departure, minutes after midnight
+    line_last.npy       int32 last departure, minutes after midnight (may exceed 24h)
+
+Build:
+
+    python -m geodata.gtfs ratp.zip sncf-transilien.zip --out data/transport
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import zipfile
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodata.geometry import points_in_polygon
+from geodata.spatial import PointIndex, haversine_km
+from models.zone_analysis import TransportationData, TransportOption, TransportType
+
+DEFAULT_TRANSPORT_DIR = os.getenv(
+    "TRANSPORT_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "transport"),
+)
+
+TRANSPORT_TYPES = [TransportType.METRO, TransportType.BUS, TransportType.TRAIN, TransportType.TRAM, TransportType.BIKE_SHARE]
+
+# Daytime window used for the headways (07:00-20:00)
+DAYTIME_START_MIN = 7 * 60
+DAYTIME_END_MIN = 20 * 60
+
+# Default walking radius around a point
+DEFAULT_RADIUS_KM = 0.8
+
+# Weight of a line in the accessibility score, by transport type
+TYPE_WEIGHTS = {
+    TransportType.METRO: 1.0,
+    TransportType.TRAIN: 1.0,
+    TransportType.TRAM: 0.7,
+    TransportType.BUS: 0.4,
+    TransportType.BIKE_SHARE: 0.2,
+}
+
+# Accessibility at which the score reaches ~6/10
+SCORE_SCALE = 3.0
+
+# Station grid cell size (degrees)
+STATION_CELL_DEG = 0.01
+
+
+def route_transport_type(route_type: int) -> TransportType:
+    """Maps a GTFS route_type (basic or extended) to a TransportType."""
+    if route_type in (1, 5, 6, 7) or 400 <= route_type < 500:
+        return TransportType.METRO
+    if route_type == 2 or 100 <= route_type < 200:
+        return TransportType.TRAIN
+    if route_type == 0 or 900 <= route_type < 1000:
+        return TransportType.TRAM
+    return TransportType.BUS
+
+
+def parse_gtfs_time(value: str) -> Optional[int]:
+    """'HH:MM:SS' (hours may exceed 24) -> minutes after midnight."""
+    try:
+        hours, minutes, _ = value.strip().split(":")
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return None
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
+def _read_table(feed: zipfile.ZipFile, name: str) -> Iterator[Dict[str, str]]:
+    """Streams the rows of a GTFS table (also found in a sub-folder of the zip)."""
+    members = [member for member in feed.namelist() if os.path.basename(member) == name]
+    if not members:
+        return
+    with feed.open(members[0]) as raw:
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+
+
+def _reference_services(feed: zipfile.ZipFile) -> Optional[set]:
+    """Service ids running on a typical weekday (None = keep every trip)."""
+    services = {row["service_id"] for row in _read_table(feed, "calendar.txt") if row.get("tuesday") == "1"}
+    if services:
+        return services
+    # Feeds without calendar.txt (SNCF): busiest date of calendar_dates.txt
+    by_date = defaultdict(set)
+    for row in _read_table(feed, "calendar_dates.txt"):
+        if row.get("exception_type") == "1":
+            by_date[row["date"]].add(row["service_id"])
+    if not by_date:
+        return None
+    return max(by_date.values(), key=len)
+
+
+def ingest_feed(path: str, prefix: str, stations: Dict[str, Dict[str, Any]], lines: Dict[Tuple[str, str], Dict[str, Any]]):
+    """
+    Streams one GTFS zip into the station and line aggregates.
+
+    Args:
+        path: GTFS zip file
+        prefix: Prefix of the ids of this feed (ids are only unique within a feed)
+        stations: station id -> {"name", "lat", "lon"} (updated)
+        lines: (station id, route id) -> aggregates (updated)
+    """
+    with zipfile.ZipFile(path) as feed:
+        parents, platforms = {}, {}
+        for row in _read_table(feed, "stops.txt"):
+            location_type = row.get("location_type") or "0"
+            if location_type not in ("0", "1"):
+                continue  # Entrances, nodes, boarding areas
+            stop_id = prefix + row["stop_id"]
+            position = {"name": row.get("stop_name", ""), "lat": float(row["stop_lat"]), "lon": float(row["stop_lon"])}
+            if location_type == "0" and row.get("parent_station"):
+                parents[stop_id] = prefix + row["parent_station"]
+                platforms[stop_id] = position
+            else:
+                stations[stop_id] = position
+        # Platforms whose parent station is missing from the feed stand for themselves
+        for stop_id, parent in list(parents.items()):
+            if parent not in stations:
+                del parents[stop_id]
+                stations[stop_id] = platforms[stop_id]
+
+        routes = {
+            prefix + row["route_id"]: (
+                row.get("route_short_name") or row.get("route_long_name") or row["route_id"],
+                route_transport_type(int(row.get("route_type") or 3)),
+            )
+            for row in _read_table(feed, "routes.txt")
+        }
+        services = _reference_services(feed)
+        trips = {
+            prefix + row["trip_id"]: (prefix + row["route_id"], row.get("direction_id") or "0")
+            for row in _read_table(feed, "trips.txt")
+            if services is None or row["service_id"] in services
+        }
+
+        for row in _read_table(feed, "stop_times.txt"):
+            trip = trips.get(prefix + row["trip_id"])
+            if trip is None:
+                continue
+            minutes = parse_gtfs_time(row.get("departure_time") or row.get("arrival_time") or "")
+            if minutes is None:
+                continue
+            stop_id = prefix + row["stop_id"]
+            station_id = parents.get(stop_id, stop_id)
+            if station_id not in stations:
+                continue
+            route_id, direction = trip
+            line = lines.get((station_id, route_id))
+            if line is None:
+                name, transport_type = routes.get(route_id, (route_id, TransportType.BUS))
+                line = lines[(station_id, route_id)] = {
+                    "name": name, "type": transport_type, "first": minutes, "last": minutes, "daytime": Counter(),
+                }
+            line["first"] = min(line["first"], minutes)
+            line["last"] = max(line["last"], minutes)
+            if DAYTIME_START_MIN <= minutes < DAYTIME_END_MIN:
+                line["daytime"][direction] += 1
+
+
+def write_store(path: str, stations: Dict[str, Dict[str, Any]], lines: Dict[Tuple[str, str], Dict[str, Any]], feeds: Sequence[str] = ()) -> "TransportEngine":
+    """Writes the aggregates as a memory-mappable store and opens it."""
+    by_station = defaultdict(list)
+    for (station_id, _), line in lines.items():
+        by_station[station_id].append(line)
+    station_ids = [station_id for station_id in stations if by_station.get(station_id)]
+    if not station_ids:
+        raise ValueError("No station with scheduled departures")
+
+    points, order = PointIndex.build(
+        [stations[station_id]["lat"] for station_id in station_ids],
+        [stations[station_id]["lon"] for station_id in station_ids],
+        STATION_CELL_DEG,
+    )
+    station_ids = [station_ids[i] for i in order]
+
+    names, types, frequencies, firsts, lasts, line_start = [], [], [], [], [], [0]
+    for station_id in station_ids:
+        for line in sorted(by_station[station_id], key=lambda line: (TRANSPORT_TYPES.index(line["type"]), line["name"])):
+            # Busiest direction: the headway seen by a passenger going one way
+            departures = max(line["daytime"].values(), default=0)
+            names.append(line["name"])
+            types.append(TRANSPORT_TYPES.index(line["type"]))
+            frequencies.append((DAYTIME_END_MIN - DAYTIME_START_MIN) / departures if departures else np.nan)
+            firsts.append(line["first"])
+            lasts.append(line["last"])
+        line_start.append(len(names))
+
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "lat": points.lat, "lon": points.lng, "cell_start": points.cell_start,
+        "station_name": np.array([stations[station_id]["name"] for station_id in station_ids], dtype=str),
+        "line_start": np.array(line_start, dtype=np.int64),
+        "line_name": np.array(names, dtype=str),
+        "line_type": np.array(types, dtype=np.uint8),
+        "line_frequency": np.array(frequencies, dtype=np.float32),
+        "line_first": np.array(firsts, dtype=np.int32),
+        "line_last": np.array(lasts, dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    manifest = {
+        "grid": {"lat0": points.lat0, "lon0": points.lon0, "cell_deg": points.cell_deg, "nrows": points.nrows, "ncols": points.ncols},
+        "feeds": [os.path.basename(feed) for feed in feeds],
+        "stations": len(station_ids),
+        "lines": len(names),
+    }
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return TransportEngine(path)
+
+
+def build_store(feeds: Sequence[str], out: str) -> "TransportEngine":
+    """Ingests GTFS zips into a transport store."""
+    stations: Dict[str, Dict[str, Any]] = {}
+    lines: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for number, feed in enumerate(feeds):
+        print(f"[DEBUG] Ingesting GTFS feed {feed}")
+        ingest_feed(feed, f"{number}:", stations, lines)
+    return write_store(out, stations, lines, feeds)
+
+
+class TransportEngine:
+    """Station and line lookups over a memory-mapped transport store."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        grid = manifest["grid"]
+        self.path = path
+        self.feeds = manifest.get("feeds", [])
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.stations = PointIndex(
+            load("lat"), load("lon"), float(grid["lat0"]), float(grid["lon0"]), float(grid["cell_deg"]),
+            int(grid["nrows"]), int(grid["ncols"]), load("cell_start"),
+        )
+        self.station_name = load("station_name")
+        self.line_start = load("line_start")
+        self.line_name = load("line_name")
+        self.line_type = load("line_type")
+        self.line_frequency = load("line_frequency")
+        self.line_first = load("line_first")
+        self.line_last = load("line_last")
+
+    def options_near(self, lat: float, lng: float, radius_km: float = DEFAULT_RADIUS_KM, polygon: Optional[Sequence[Sequence[float]]] = None) -> List[Tuple[TransportOption, float]]:
+        """
+        Lines serving the stations around a point, each at its nearest station.
+
+        Args:
+            lat: Latitude of the center
+            lng: Longitude of the center
+            radius_km: Walking radius around the center
+            polygon: Optional zone [[lng, lat], ...]: its stations count whatever their distance
+
+        Returns:
+            [(TransportOption, weight)] nearest first, weight being the line contribution to the score
+        """
+        search_km = radius_km
+        if polygon is not None and len(polygon) >= 3:
+            vertices = np.asarray(polygon, dtype=np.float64)
+            search_km = max(radius_km, float(haversine_km(lat, lng, vertices[:, 1], vertices[:, 0]).max()))
+        indices, distances = self.stations.query_radius(lat, lng, search_km)
+        if polygon is not None and len(polygon) >= 3 and len(indices):
+            inside = points_in_polygon(np.asarray(self.stations.lng[indices]), np.asarray(self.stations.lat[indices]), polygon)
+            keep = inside | (distances <= radius_km)
+            indices, distances = indices[keep], distances[keep]
+
+        best: Dict[Tuple[int, str], Tuple[TransportOption, float]] = {}
+        for station, distance in zip(indices, distances):
+            for line in range(int(self.line_start[station]), int(self.line_start[station + 1])):
+                transport_type = TRANSPORT_TYPES[int(self.line_type[line])]
+                key = (int(self.line_type[line]), str(self.line_name[line]))
+                if key in best:
+                    continue  # Already served by a nearer station
+                frequency = float(self.line_frequency[line])
+                option = TransportOption(
+                    transport_type=transport_type,
+                    name=f"{transport_type.value.title()} {self.line_name[line]} - {self.station_name[station]}",
+                    distance_meters=int(round(distance * 1000)),
+                    frequency_minutes=None if math.isnan(frequency) else max(1, int(round(frequency))),
+                    operating_hours=f"{format_minutes(int(self.line_first[line]))}-{format_minutes(int(self.line_last[line]))}",
+                )
+                best[key] = (option, self._line_weight(transport_type, distance, radius_km, frequency))
+        return sorted(best.values(), key=lambda item: item[0].distance_meters)
+
+    @staticmethod
+    def _line_weight(transport_type: TransportType, distance_km: float, radius_km: float, frequency: float) -> float:
+        """Contribution of a line: type weight, decayed by walking distance and headway."""
+        proximity = max(0.0, 1.0 - distance_km / (2 * radius_km))
+        service = 0.0 if math.isnan(frequency) else min(1.0, 10.0 / frequency)
+        return TYPE_WEIGHTS[transport_type] * proximity * service
+
+    def analyze(self, lat: float, lng: float, polygon: Optional[Sequence[Sequence[float]]] = None,
+                radius_km: float = DEFAULT_RADIUS_KM, max_options: int = 10) -> TransportationData:
+        """
+        TransportationData for a point (or a drawn zone around it).
+
+        Args:
+            lat: Latitude of the center
+            lng: Longitude of the center
+            polygon: Optional zone [[lng, lat], ...]
+            radius_km: Walking radius around the center
+            max_options: Number of nearest options returned
+
+        Returns:
+            TransportationData with the accessibility score (1-10) and the nearest lines
+        """
+        options = self.options_near(lat, lng, radius_km, polygon)
+        accessibility = sum(weight for _, weight in options)
+        score = 1 + int(round(9 * (1 - math.exp(-accessibility / SCORE_SCALE))))
+        return TransportationData(
+            public_transport_score=min(10, max(1, score)),
+            transport_options=[option for option, _ in options[:max_options]],
+        )
+
+
+_engine: Optional[TransportEngine] = None
+_engine_loaded = False
+
+
+def get_transport_engine() -> Optional[TransportEngine]:
+    """Returns the shared transport engine, or None if no GTFS store is installed."""
+    global _engine, _engine_loaded
+    if not _engine_loaded:
+        _engine_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_TRANSPORT_DIR, "manifest.json")):
+            _engine = TransportEngine(DEFAULT_TRANSPORT_DIR)
+            print(f"[DEBUG] Transport store loaded: {len(_engine.stations)} stations from {DEFAULT_TRANSPORT_DIR}")
+    return _engine
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the transport store from GTFS feeds")
+    parser.add_argument("feeds", nargs="+", help="GTFS zip files")
+    parser.add_argument("--out", default=DEFAULT_TRANSPORT_DIR, help="Output directory")
+    args = parser.parse_args(argv)
+
+    engine = build_store(args.feeds, args.out)
+    print(f"Store written to {args.out}: {len(engine.stations)} stations, {len(engine.line_name)} lines")
+
+
+if __name__ == "__main__":
+    main()
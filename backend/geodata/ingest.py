@@ -0,0 +1,291 @@
+"""
+Streaming ingestion helpers for the store builders (bounded memory).
+
+National flood or cadastre exports are GeoJSON files of several GB: a
+whole-document json.load needs many times that in RAM. Here the file is read
+in blocks and the members of the "features" array are decoded one at a time,
+so memory stays at about one block plus one feature; store columns are
+appended block by block to raw files on disk and only turned into .npy
+arrays (memory-mapped) at the end.
+
+    stream = FeatureStream("n_tri_inond_s.json", report_every_s=5)
+    crs = crs_from_geojson(stream.read_header())
+    for feature in stream:
+        ...
+"""
+
+import codecs
+import itertools
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Rows copied at once when turning a raw column into a .npy array
+_COPY_BYTES = 1 << 24
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def normalize_properties(properties: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Strips the padding of string attributes (fixed-width fields of the
+    shapefile exports, e.g. "id_carte": "FRD_TRI_CHAT   ").
+    """
+    return {key: value.strip() if isinstance(value, str) else value for key, value in (properties or {}).items()}
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class FeatureStream:
+    """
+    Incremental reader of a GeoJSON FeatureCollection.
+
+    Top-level members before "features" (type, name, crs, ...) are available
+    from read_header(); members after it are added to `header` once the
+    features have been read.
+    """
+
+    def __init__(self, path: str, block_size: int = DEFAULT_BLOCK_SIZE, report_every_s: Optional[float] = None):
+        self.path = path
+        self.block_size = block_size
+        self.report_every_s = report_every_s
+        self.size = os.path.getsize(path)
+        self.header: Dict[str, Any] = {}
+        self.count = 0
+        self.bytes_read = 0
+        self._file = None
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._pos = 0
+        self._in_features = False
+        self._last_report = 0.0
+
+    def _read(self, size: Optional[int] = None) -> bool:
+        """Appends a block to the buffer (dropping what was consumed). False at end of file."""
+        data = self._file.read(size or self.block_size)
+        self.bytes_read += len(data)
+        self._buffer = self._buffer[self._pos:] + self._text.decode(data, final=not data)
+        self._pos = 0
+        return bool(data)
+
+    def _peek(self) -> str:
+        """Next non-whitespace character ("" at end of file)."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"{self.path}: expected {char!r} near byte {self.bytes_read}, found {found!r}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decodes the next JSON value, reading more of the file until it is complete."""
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # Incomplete value, or a number possibly cut at the end of the buffer:
+            # read as much again as what is buffered (linear time for large features)
+            if end is None or end == len(self._buffer):
+                if self._read(max(self.block_size, len(self._buffer) - self._pos)):
+                    continue
+                if end is None:
+                    raise ValueError(f"{self.path}: invalid or truncated JSON near byte {self.bytes_read}")
+            self._pos = end
+            return value
+
+    def _members(self):
+        """Reads top-level members into the header, up to "features" or the end of the object."""
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                return
+            if char == ",":
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(":")
+            if key == "features":
+                self._expect("[")
+                self._in_features = True
+                return
+            self.header[key] = self._value()
+
+    def read_header(self) -> Dict[str, Any]:
+        """Opens the file and reads the members preceding the features."""
+        if self._file is None:
+            self._file = open(self.path, "rb")
+            self._expect("{")
+            self._members()
+        return self.header
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.read_header()
+        started = time.perf_counter()
+        try:
+            while self._in_features:
+                char = self._peek()
+                if char == ",":
+                    self._pos += 1
+                    continue
+                if char == "]":
+                    self._pos += 1
+                    self._in_features = False
+                    self._members()
+                    break
+                feature = self._value()
+                self.count += 1
+                if self.report_every_s is not None and self.count % 1000 == 0:
+                    now = time.perf_counter()
+                    if now - self._last_report >= self.report_every_s:
+                        self._last_report = now
+                        self.report(now - started)
+                if isinstance(feature, dict):
+                    yield feature
+        finally:
+            self._file.close()
+        if self.report_every_s is not None:
+            self.report(time.perf_counter() - started)
+
+    def report(self, elapsed_s: float):
+        """Prints the progress of the read."""
+        percent = 100 * self.bytes_read / self.size if self.size else 100.0
+        print(f"{os.path.basename(self.path)}: {percent:.0f}% ({self.count} features, "
+              f"{self.bytes_read / 1e6:.0f}/{self.size / 1e6:.0f} MB, {elapsed_s:.0f}s)")
+
+
+class ColumnWriter:
+    """
+    Typed column appended block by block to a raw file next to its .npy target.
+
+    Args:
+        path: Target .npy file (the raw data goes to path + ".part")
+        dtype: Element type
+        shape: Trailing shape of a row (e.g. (2,) for x, y vertices)
+    """
+
+    def __init__(self, path: str, dtype: Any, shape: Tuple[int, ...] = ()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.length = 0
+        self._raw = path + ".part"
+        self._file = open(self._raw, "wb")
+
+    def append(self, values: Any):
+        array = np.ascontiguousarray(values, dtype=self.dtype).reshape((-1,) + self.shape)
+        self._file.write(array.tobytes())
+        self.length += len(array)
+
+    def _rows_per_block(self) -> int:
+        row_bytes = self.dtype.itemsize * int(np.prod(self.shape, dtype=np.int64))
+        return max(1, _COPY_BYTES // max(1, row_bytes))
+
+    def mapped(self) -> np.ndarray:
+        """Read-only memory map of the data appended so far."""
+        self._file.flush()
+        if self.length == 0:
+            return np.empty((0,) + self.shape, dtype=self.dtype)
+        return np.memmap(self._raw, dtype=self.dtype, mode="r", shape=(self.length,) + self.shape)
+
+    def blocks(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """(start row, rows) blocks of the data appended so far."""
+        raw = self.mapped()
+        step = self._rows_per_block()
+        for start in range(0, self.length, step):
+            yield start, np.array(raw[start:start + step])
+        del raw
+
+    def save(self, transform=None) -> np.ndarray:
+        """
+        Writes the .npy target block by block and removes the raw file.
+
+        Args:
+            transform: Optional function applied to each block (same length and dtype)
+
+        Returns:
+            The column, memory-mapped
+        """
+        target = np.lib.format.open_memmap(self.path, mode="w+", dtype=self.dtype, shape=(self.length,) + self.shape)
+        for start, block in self.blocks():
+            target[start:start + len(block)] = block if transform is None else transform(block)
+        target.flush()
+        del target
+        self.discard()
+        return np.load(self.path, mmap_mode="r")
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self._raw):
+            os.remove(self._raw)
+
+
+class StringColumnWriter:
+    """
+    Unicode column appended block by block (one line per value), saved as a
+    fixed-width "<U{longest}" .npy like np.asarray(values, dtype=str).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.length = 0
+        self.width = 1
+        self._raw = path + ".part"
+        self._file = open(self._raw, "w", encoding="utf-8", newline="\n")
+
+    def append(self, values: Sequence[str]):
+        for value in values:
+            value = (value or "").replace("\r", " ").replace("\n", " ")
+            self.width = max(self.width, len(value))
+            self._file.write(value + "\n")
+            self.length += 1
+
+    def blocks(self, rows: int = 1 << 16) -> Iterator[Tuple[int, np.ndarray]]:
+        """(start row, values) blocks of the data appended so far."""
+        self._file.flush()
+        with open(self._raw, encoding="utf-8", newline="\n") as f:
+            start = 0
+            for lines in chunked(f, rows):
+                yield start, np.asarray([line[:-1] for line in lines], dtype=f"<U{self.width}")
+                start += len(lines)
+
+    def open_target(self) -> np.ndarray:
+        """Writable memory-mapped .npy target of the column's final size."""
+        return np.lib.format.open_memmap(self.path, mode="w+", dtype=f"<U{self.width}", shape=(self.length,))
+
+    def save(self) -> np.ndarray:
+        """Writes the .npy target block by block and removes the raw file."""
+        target = self.open_target()
+        for start, block in self.blocks():
+            target[start:start + len(block)] = block
+        target.flush()
+        del target
+        self.discard()
+        return np.load(self.path, mmap_mode="r")
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self._raw):
+            os.remove(self._raw)
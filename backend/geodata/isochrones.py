@@ -0,0 +1,554 @@
+"""
+Precomputed walking times to the nearest metro / RER station.
+
+An offline job computes, for every cell of a regular grid, the minutes on
+foot to the nearest rail station:
+
+- with a street graph (OSM extract exported as GeoJSON lines): a
+  multi-source Dijkstra from the stations over the walkable ways, then each
+  cell takes the best "node time + straight walk to the node" among the
+  graph nodes within SNAP_M;
+- without one: straight-line distance times a detour factor.
+
+Times are stored as uint16 tenths of a minute in a memory-mapped grid
+(BEYOND: computed, more than max_minutes away; NO_DATA: not computed), with summed-area tables so that the mean over any
+rectangle is O(1); a point lookup is a single cell read. Node times and
+their source station are kept, so when stations change only the affected
+part of the graph and of the grid is recomputed (`update`).
+
+    python -m geodata.isochrones build --streets paris-ways.geojson
+    python -m geodata.isochrones update     # after a new transport store build
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodata.geometry import points_in_polygon
+from geodata.spatial import KM_PER_DEGREE_LAT, PointIndex
+
+DEFAULT_ISOCHRONE_DIR = os.getenv(
+    "ISOCHRONE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "isochrones"),
+)
+
+WALK_SPEED_M_PER_MIN = 80.0  # 4.8 km/h
+DEFAULT_MAX_MINUTES = 30.0
+DEFAULT_CELL_M = 50.0
+SNAP_M = 250.0              # Max straight walk between a cell (or a station) and the street graph
+DETOUR_FACTOR = 1.3         # Street distance / straight-line distance, without a street graph
+NO_DATA = np.iinfo(np.uint16).max
+BEYOND = NO_DATA - 1
+
+WALKABLE_HIGHWAYS = {
+    "footway", "path", "pedestrian", "steps", "living_street", "residential", "service", "unclassified",
+    "tertiary", "tertiary_link", "secondary", "secondary_link", "primary", "primary_link", "track", "cycleway",
+    "road", "corridor", "platform",
+}
+
+M_PER_DEGREE_LAT = KM_PER_DEGREE_LAT * 1000
+
+
+class StreetGraph:
+    """Walkable street graph as CSR arrays (edge lengths in meters)."""
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, start: np.ndarray, target: np.ndarray, length: np.ndarray):
+        self.lat, self.lon = lat, lon
+        self.start, self.target, self.length = start, target, length
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "StreetGraph":
+        """Builds the graph from OSM ways exported as GeoJSON (LineString / MultiLineString)."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        node_ids: Dict[Tuple[float, float], int] = {}
+        edges: List[Tuple[int, int]] = []
+
+        def node(lng: float, lat: float) -> int:
+            key = (round(lng, 7), round(lat, 7))  # Ways share the coordinates of their common nodes
+            if key not in node_ids:
+                node_ids[key] = len(node_ids)
+            return node_ids[key]
+
+        for feature in data.get("features", []):
+            properties = feature.get("properties") or {}
+            tags = properties.get("tags", properties)
+            if tags.get("highway") not in WALKABLE_HIGHWAYS or tags.get("foot") == "no" or tags.get("access") == "private":
+                continue
+            geometry = feature.get("geometry") or {}
+            lines = [geometry.get("coordinates", [])] if geometry.get("type") == "LineString" else geometry.get("coordinates", [])
+            for line in lines:
+                previous = None
+                for lng, lat, *_ in line:
+                    current = node(lng, lat)
+                    if previous is not None and previous != current:
+                        edges.append((previous, current))
+                    previous = current
+
+        if not node_ids:
+            raise ValueError(f"No walkable way in {path}")
+        coords = np.array(list(node_ids), dtype=np.float64)
+        return cls.from_edges(coords[:, 1], coords[:, 0], np.array(edges, dtype=np.int64).reshape(-1, 2))
+
+    @classmethod
+    def from_edges(cls, lat: np.ndarray, lon: np.ndarray, edges: np.ndarray) -> "StreetGraph":
+        """CSR graph from node coordinates and undirected (a, b) edges."""
+        both = np.concatenate([edges, edges[:, ::-1]])
+        order = np.argsort(both[:, 0], kind="stable")
+        both = both[order]
+        start = np.zeros(len(lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(both[:, 0], minlength=len(lat)), out=start[1:])
+        a, b = both[:, 0], both[:, 1]
+        dy = (lat[b] - lat[a]) * M_PER_DEGREE_LAT
+        dx = (lon[b] - lon[a]) * M_PER_DEGREE_LAT * np.cos(np.radians((lat[a] + lat[b]) / 2))
+        return cls(lat, lon, start, b.astype(np.int32), np.hypot(dx, dy).astype(np.float32))
+
+    def save(self, path: str):
+        for name in ("lat", "lon", "start", "target", "length"):
+            np.save(os.path.join(path, f"graph_{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["StreetGraph"]:
+        if not os.path.exists(os.path.join(path, "graph_lat.npy")):
+            return None
+        return cls(*(np.load(os.path.join(path, f"graph_{name}.npy")) for name in ("lat", "lon", "start", "target", "length")))
+
+
+def _dijkstra(graph: StreetGraph, minutes: np.ndarray, source: np.ndarray, heap: List[Tuple[float, int, int]], max_minutes: float) -> np.ndarray:
+    """
+    Multi-source Dijkstra improving `minutes` / `source` in place from the seeds in `heap`.
+
+    Returns:
+        Indices of the nodes whose time changed
+    """
+    start, target, length = graph.start.tolist(), graph.target.tolist(), (graph.length / WALK_SPEED_M_PER_MIN).tolist()
+    best = minutes.tolist()
+    changed = set()
+    while heap:
+        time, node, origin = heapq.heappop(heap)
+        if time > best[node] or time > max_minutes:
+            continue
+        if time < minutes[node] or source[node] != origin:
+            minutes[node], source[node] = time, origin
+            changed.add(node)
+        for edge in range(start[node], start[node + 1]):
+            neighbour = target[edge]
+            candidate = time + length[edge]
+            if candidate < best[neighbour] and candidate <= max_minutes:
+                best[neighbour] = candidate
+                heapq.heappush(heap, (candidate, neighbour, origin))
+    return np.fromiter(changed, dtype=np.int64, count=len(changed))
+
+
+class WalkingTimeGrid:
+    """Memory-mapped walking-time grid with O(1) point and rectangle lookups."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        grid = self.manifest["grid"]
+        self.path = path
+        self.lat0, self.lon0 = float(grid["lat0"]), float(grid["lon0"])
+        self.dlat, self.dlon = float(grid["dlat"]), float(grid["dlon"])
+        self.shape = (int(grid["nlat"]), int(grid["nlon"]))
+        self.max_minutes = float(self.manifest["max_minutes"])
+        # Cells beyond max_minutes read as max_minutes (a lower bound)
+        self.beyond_tenths = round(self.max_minutes * 10)
+        self.tenths = np.load(os.path.join(path, "minutes.npy"), mmap_mode="r")
+        self.sat_sum = np.load(os.path.join(path, "sat_sum.npy"), mmap_mode="r")
+        self.sat_count = np.load(os.path.join(path, "sat_count.npy"), mmap_mode="r")
+
+    def _cell(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.floor((lat - self.lat0) / self.dlat).astype(np.intp)
+        cols = np.floor((lng - self.lon0) / self.dlon).astype(np.intp)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        return np.clip(rows, 0, self.shape[0] - 1), np.clip(cols, 0, self.shape[1] - 1), inside
+
+    def minutes_at_many(self, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+        """
+        Walking minutes to the nearest station for many points (NaN: unknown,
+        max_minutes: max_minutes or more).
+        """
+        rows, cols, inside = self._cell(np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64))
+        values = np.asarray(self.tenths[rows, cols])
+        values = np.where(values == BEYOND, self.beyond_tenths, values)
+        return np.where(inside & (values != NO_DATA), values / 10.0, np.nan)
+
+    def minutes_at(self, lat: float, lng: float) -> Optional[float]:
+        """
+        Walking minutes to the nearest station from a point (None if unknown,
+        max_minutes if max_minutes or more).
+        """
+        row, col = self._scalar_cell(lat, lng)
+        if not (0 <= row < self.shape[0] and 0 <= col < self.shape[1]):
+            return None
+        value = int(self.tenths[row, col])
+        if value == BEYOND:
+            return self.max_minutes
+        return None if value == NO_DATA else value / 10.0
+
+    def _scalar_cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor((lat - self.lat0) / self.dlat), math.floor((lng - self.lon0) / self.dlon)
+
+    def bbox_mean(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> Tuple[Optional[float], float]:
+        """
+        O(1) mean walking time over a rectangle, from the summed-area tables.
+
+        Returns:
+            (mean minutes over the cells with data, cells beyond max_minutes
+            counting as max_minutes; share of cells with data)
+        """
+        r0, c0 = self._scalar_cell(min_lat, min_lng)
+        r1, c1 = self._scalar_cell(max_lat, max_lng)
+        r0, c0 = min(max(r0, 0), self.shape[0]), min(max(c0, 0), self.shape[1])
+        r1, c1 = min(max(r1 + 1, 0), self.shape[0]), min(max(c1 + 1, 0), self.shape[1])
+        cells = (r1 - r0) * (c1 - c0)
+        if cells <= 0:
+            return None, 0.0
+
+        def window(table: np.ndarray) -> float:
+            return float(table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0])
+
+        count = window(self.sat_count)
+        if count == 0:
+            return None, 0.0
+        return window(self.sat_sum) / count / 10.0, count / cells
+
+    def zone_mean(self, polygon_coords: Sequence[Sequence[float]]) -> Tuple[Optional[float], float]:
+        """
+        Mean walking time over the cells whose center lies in a polygon.
+
+        Returns:
+            (mean minutes over the cells with data, cells beyond max_minutes
+            counting as max_minutes; share of the zone cells with data)
+        """
+        polygon = np.asarray(polygon_coords, dtype=np.float64)
+        r0, c0 = self._scalar_cell(polygon[:, 1].min(), polygon[:, 0].min())
+        r1, c1 = self._scalar_cell(polygon[:, 1].max(), polygon[:, 0].max())
+        rows, cols = np.mgrid[max(r0, 0):min(r1 + 1, self.shape[0]), max(c0, 0):min(c1 + 1, self.shape[1])]
+        lats = self.lat0 + (rows.ravel() + 0.5) * self.dlat
+        lngs = self.lon0 + (cols.ravel() + 0.5) * self.dlon
+        inside = points_in_polygon(lngs, lats, polygon)
+        if not inside.any():
+            # Zone smaller than a cell: use the cell under its centroid
+            minutes = self.minutes_at(float(polygon[:, 1].mean()), float(polygon[:, 0].mean()))
+            return minutes, 1.0 if minutes is not None else 0.0
+        values = np.asarray(self.tenths[rows.ravel()[inside], cols.ravel()[inside]])
+        values = np.where(values == BEYOND, self.beyond_tenths, values)
+        valid = values != NO_DATA
+        if not valid.any():
+            return None, 0.0
+        return float(values[valid].mean()) / 10.0, float(valid.mean())
+
+
+def walking_score(minutes: Optional[float]) -> Optional[int]:
+    """
+    1-10 score from the walking minutes to the nearest station (10 at <= 3 min,
+    1 at >= 25 min), or None when the grid has no data there (callers fall back).
+    """
+    if minutes is None:
+        return None
+    return int(round(min(10.0, max(1.0, 10 - 9 * (minutes - 3) / 22))))
+
+
+class IsochroneBuilder:
+    """Offline (re)builder of the walking-time grid."""
+
+    def __init__(self, path: str, stations: np.ndarray, graph: Optional[StreetGraph], grid: Dict[str, Any],
+                 max_minutes: float = DEFAULT_MAX_MINUTES, source: str = ""):
+        self.path = path
+        self.stations = stations  # (n, 2) lat, lon
+        self.graph = graph
+        self.grid = grid
+        self.max_minutes = max_minutes
+        self.source = source
+        self.node_minutes = np.full(len(graph) if graph else 0, np.inf, dtype=np.float64)
+        self.node_source = np.full(len(graph) if graph else 0, -1, dtype=np.int64)
+        self.tenths = np.full((grid["nlat"], grid["nlon"]), NO_DATA, dtype=np.uint16)
+
+    @staticmethod
+    def grid_for(lats: np.ndarray, lons: np.ndarray, cell_m: float, margin_m: float) -> Dict[str, Any]:
+        """Grid covering points with a margin, with cells of ~cell_m meters."""
+        lat_mid = float((lats.min() + lats.max()) / 2)
+        dlat = cell_m / M_PER_DEGREE_LAT
+        dlon = dlat / math.cos(math.radians(lat_mid))
+        lat0 = float(lats.min()) - margin_m / M_PER_DEGREE_LAT
+        lon0 = float(lons.min()) - margin_m / M_PER_DEGREE_LAT / math.cos(math.radians(lat_mid))
+        nlat = int(math.ceil((float(lats.max()) - lat0) / dlat + margin_m / cell_m)) + 1
+        nlon = int(math.ceil((float(lons.max()) - lon0) / dlon + margin_m / cell_m)) + 1
+        return {"lat0": lat0, "lon0": lon0, "dlat": dlat, "dlon": dlon, "nlat": nlat, "nlon": nlon}
+
+    # -- Graph propagation -------------------------------------------------
+
+    def _station_seeds(self, station_ids: Sequence[int]) -> List[Tuple[float, int, int]]:
+        """Heap seeds: each station enters the graph at its nearest node."""
+        nodes, order = PointIndex.build(self.graph.lat, self.graph.lon)
+        seeds = []
+        for station in station_ids:
+            lat, lon = self.stations[station]
+            found, distances = nodes.nearest(lat, lon, k=1, max_radius_km=SNAP_M / 1000)
+            if len(found):
+                seeds.append((distances[0] * 1000 / WALK_SPEED_M_PER_MIN, int(order[found[0]]), int(station)))
+        heapq.heapify(seeds)
+        return seeds
+
+    def propagate(self, station_ids: Sequence[int]) -> np.ndarray:
+        """Improves the node times from these stations; returns the changed nodes."""
+        return _dijkstra(self.graph, self.node_minutes, self.node_source, self._station_seeds(station_ids), self.max_minutes)
+
+    def invalidate(self, removed_station_ids: Sequence[int]) -> np.ndarray:
+        """Forgets the nodes reached from removed stations and re-floods them from their neighbours."""
+        lost = np.flatnonzero(np.isin(self.node_source, removed_station_ids))
+        if not len(lost):
+            return lost
+        self.node_minutes[lost] = np.inf
+        self.node_source[lost] = -1
+        lost_set = set(lost.tolist())
+        seeds = []
+        for node in lost_set:
+            for edge in range(self.graph.start[node], self.graph.start[node + 1]):
+                neighbour = int(self.graph.target[edge])
+                if neighbour not in lost_set and np.isfinite(self.node_minutes[neighbour]):
+                    seeds.append((float(self.node_minutes[neighbour]), neighbour, int(self.node_source[neighbour])))
+        heapq.heapify(seeds)
+        changed = _dijkstra(self.graph, self.node_minutes, self.node_source, seeds, self.max_minutes)
+        return np.union1d(lost, changed)
+
+    # -- Rasterization -----------------------------------------------------
+
+    def _origins(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float, float]:
+        """(lat, lon, minutes, reach_m, meters_per_minute) of the points splatted on the grid."""
+        if self.graph is not None:
+            reached = np.isfinite(self.node_minutes)
+            return (self.graph.lat[reached], self.graph.lon[reached], self.node_minutes[reached],
+                    SNAP_M, WALK_SPEED_M_PER_MIN)
+        reach = self.max_minutes * WALK_SPEED_M_PER_MIN / DETOUR_FACTOR
+        return (self.stations[:, 0], self.stations[:, 1], np.zeros(len(self.stations)),
+                reach, WALK_SPEED_M_PER_MIN / DETOUR_FACTOR)
+
+    def rasterize(self, region: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Recomputes the cells of `region` (row0, row1, col0, col1; whole grid if None):
+        each cell takes min(origin minutes + straight walk) over the origins within reach.
+        """
+        g = self.grid
+        nlat, nlon = g["nlat"], g["nlon"]
+        row0, row1, col0, col1 = region or (0, nlat, 0, nlon)
+        lat, lon, minutes, reach_m, speed = self._origins()
+        cos_lat = math.cos(math.radians(g["lat0"] + nlat * g["dlat"] / 2))
+        cell_h, cell_w = g["dlat"] * M_PER_DEGREE_LAT, g["dlon"] * M_PER_DEGREE_LAT * cos_lat
+        reach_rows, reach_cols = int(math.ceil(reach_m / cell_h)), int(math.ceil(reach_m / cell_w))
+
+        origin_rows = np.floor((lat - g["lat0"]) / g["dlat"]).astype(np.int64)
+        origin_cols = np.floor((lon - g["lon0"]) / g["dlon"]).astype(np.int64)
+        near = ((origin_rows >= row0 - reach_rows) & (origin_rows < row1 + reach_rows)
+                & (origin_cols >= col0 - reach_cols) & (origin_cols < col1 + reach_cols))
+        lat, lon, minutes = lat[near], lon[near], minutes[near]
+        origin_rows, origin_cols = origin_rows[near], origin_cols[near]
+
+        best = np.full((row1 - row0, col1 - col0), np.inf)
+        for di in range(-reach_rows, reach_rows + 1):
+            rows = origin_rows + di
+            row_ok = (rows >= row0) & (rows < row1)
+            if not row_ok.any():
+                continue
+            dy = (g["lat0"] + (rows + 0.5) * g["dlat"] - lat) * M_PER_DEGREE_LAT
+            for dj in range(-reach_cols, reach_cols + 1):
+                cols = origin_cols + dj
+                ok = row_ok & (cols >= col0) & (cols < col1)
+                if not ok.any():
+                    continue
+                dx = (g["lon0"] + (cols[ok] + 0.5) * g["dlon"] - lon[ok]) * M_PER_DEGREE_LAT * cos_lat
+                distance = np.hypot(dx, dy[ok])
+                within = distance <= reach_m
+                np.minimum.at(best, (rows[ok][within] - row0, cols[ok][within] - col0),
+                              minutes[ok][within] + distance[within] / speed)
+
+        tenths = np.where(best <= self.max_minutes, np.round(best * 10), BEYOND)
+        self.tenths[row0:row1, col0:col1] = tenths.astype(np.uint16)
+
+    def region_around(self, lats: np.ndarray, lons: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Grid region whose cells may depend on origins at these positions."""
+        if not len(lats):
+            return None
+        g = self.grid
+        _, _, _, reach_m, _ = self._origins()
+        cos_lat = math.cos(math.radians(g["lat0"] + g["nlat"] * g["dlat"] / 2))
+        margin = int(math.ceil(reach_m / (g["dlon"] * M_PER_DEGREE_LAT * cos_lat))) + 1
+        rows = np.floor((lats - g["lat0"]) / g["dlat"]).astype(np.int64)
+        cols = np.floor((lons - g["lon0"]) / g["dlon"]).astype(np.int64)
+        return (max(0, int(rows.min()) - margin), min(g["nlat"], int(rows.max()) + margin + 1),
+                max(0, int(cols.min()) - margin), min(g["nlon"], int(cols.max()) + margin + 1))
+
+    # -- Persistence -------------------------------------------------------
+
+    def save(self) -> WalkingTimeGrid:
+        os.makedirs(self.path, exist_ok=True)
+        valid = self.tenths != NO_DATA
+        tenths = np.where(self.tenths == BEYOND, round(self.max_minutes * 10), self.tenths)
+        sat_sum = np.zeros((self.grid["nlat"] + 1, self.grid["nlon"] + 1), dtype=np.float64)
+        sat_count = np.zeros_like(sat_sum, dtype=np.int64)
+        sat_sum[1:, 1:] = np.where(valid, tenths, 0).cumsum(axis=0).cumsum(axis=1)
+        sat_count[1:, 1:] = valid.cumsum(axis=0).cumsum(axis=1)
+        arrays = {
+            "minutes": self.tenths, "sat_sum": sat_sum, "sat_count": sat_count, "stations": self.stations,
+            "node_minutes": self.node_minutes, "node_source": self.node_source,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(self.path, f"{name}.npy"), array)
+        if self.graph is not None:
+            self.graph.save(self.path)
+        manifest = {
+            "grid": self.grid, "max_minutes": self.max_minutes, "walk_speed_m_per_min": WALK_SPEED_M_PER_MIN,
+            "mode": "street_graph" if self.graph is not None else "straight_line", "stations": len(self.stations),
+            "source": self.source,
+        }
+        with open(os.path.join(self.path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return WalkingTimeGrid(self.path)
+
+    @classmethod
+    def load(cls, path: str) -> "IsochroneBuilder":
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        builder = cls(path, np.load(os.path.join(path, "stations.npy")), StreetGraph.load(path),
+                      manifest["grid"], manifest["max_minutes"], manifest.get("source", ""))
+        builder.tenths = np.load(os.path.join(path, "minutes.npy"))
+        builder.node_minutes = np.load(os.path.join(path, "node_minutes.npy"))
+        builder.node_source = np.load(os.path.join(path, "node_source.npy"))
+        return builder
+
+
+def build(path: str, stations: np.ndarray, graph: Optional[StreetGraph] = None, cell_m: float = DEFAULT_CELL_M,
+          max_minutes: float = DEFAULT_MAX_MINUTES, source: str = "") -> WalkingTimeGrid:
+    """
+    Full offline build.
+
+    Args:
+        path: Output directory
+        stations: (n, 2) array of station lat, lon
+        graph: Walkable street graph (straight-line times if None)
+        cell_m: Grid cell size in meters
+        max_minutes: Walking times above this are stored as BEYOND (read as max_minutes)
+        source: Free text describing the data origin
+    """
+    if graph is not None:
+        grid = IsochroneBuilder.grid_for(graph.lat, graph.lon, cell_m, SNAP_M)
+    else:
+        grid = IsochroneBuilder.grid_for(stations[:, 0], stations[:, 1], cell_m, max_minutes * WALK_SPEED_M_PER_MIN / DETOUR_FACTOR)
+    builder = IsochroneBuilder(path, stations, graph, grid, max_minutes, source)
+    if graph is not None:
+        builder.propagate(range(len(stations)))
+    builder.rasterize()
+    return builder.save()
+
+
+def update(path: str, stations: np.ndarray) -> Tuple[WalkingTimeGrid, Dict[str, int]]:
+    """
+    Incremental rebuild after the station set changed.
+
+    Removed stations invalidate only the nodes they served; added stations
+    only flood the nodes they improve; only the grid cells around the
+    changed nodes (or stations) are recomputed.
+
+    The grid extent is kept: stations far outside it need a full build.
+
+    Returns:
+        (grid, {"added", "removed", "changed_nodes"})
+    """
+    builder = IsochroneBuilder.load(path)
+    old_keys = {(round(lat, 6), round(lon, 6)): i for i, (lat, lon) in enumerate(builder.stations)}
+    new_keys = {(round(lat, 6), round(lon, 6)) for lat, lon in stations}
+    removed = [i for key, i in old_keys.items() if key not in new_keys]
+    kept = [i for key, i in old_keys.items() if key in new_keys]
+    added = [tuple(station) for station in stations if (round(station[0], 6), round(station[1], 6)) not in old_keys]
+
+    # Keep the surviving stations first so that node_source stays valid
+    merged = np.array([builder.stations[i] for i in kept] + added, dtype=np.float64).reshape(-1, 2)
+    remap = np.full(len(builder.stations) + 1, -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+    changed_positions = [builder.stations[i] for i in removed] + list(added)
+
+    if builder.graph is not None:
+        changed = builder.invalidate(removed)
+        builder.node_source = np.where(builder.node_source >= 0, remap[builder.node_source], -1)
+        builder.stations = merged
+        changed = np.union1d(changed, builder.propagate(range(len(kept), len(merged))))
+        lats, lons = builder.graph.lat[changed], builder.graph.lon[changed]
+    else:
+        builder.stations = merged
+        changed = np.empty(0, dtype=np.int64)
+        positions = np.array(changed_positions, dtype=np.float64).reshape(-1, 2)
+        lats, lons = positions[:, 0], positions[:, 1]
+
+    region = builder.region_around(lats, lons)
+    if region is not None:
+        builder.rasterize(region)
+    return builder.save(), {"added": len(added), "removed": len(removed), "changed_nodes": int(len(changed))}
+
+
+def rail_stations_from_transport_store() -> np.ndarray:
+    """Metro / RER / train stations of the GTFS transport store, as (n, 2) lat, lon."""
+    from geodata.gtfs import TRANSPORT_TYPES, get_transport_engine
+    from models.zone_analysis import TransportType
+
+    engine = get_transport_engine()
+    if engine is None:
+        raise FileNotFoundError("No transport store: run python -m geodata.gtfs first, or pass --stations")
+    rail = np.isin(np.asarray(engine.line_type), [TRANSPORT_TYPES.index(TransportType.METRO), TRANSPORT_TYPES.index(TransportType.TRAIN)])
+    line_station = np.repeat(np.arange(len(engine.stations)), np.diff(np.asarray(engine.line_start)))
+    stations = np.unique(line_station[rail])
+    return np.column_stack([np.asarray(engine.stations.lat)[stations], np.asarray(engine.stations.lng)[stations]])
+
+
+def read_stations_csv(path: str) -> np.ndarray:
+    data = np.genfromtxt(path, delimiter=",", names=True, dtype=None, encoding="utf-8")
+    return np.column_stack([np.atleast_1d(data["lat"]), np.atleast_1d(data["lon"])]).astype(np.float64)
+
+
+_grid: Optional[WalkingTimeGrid] = None
+_grid_loaded = False
+
+
+def get_walking_grid() -> Optional[WalkingTimeGrid]:
+    """Returns the shared walking-time grid, or None if none is installed."""
+    global _grid, _grid_loaded
+    if not _grid_loaded:
+        _grid_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_ISOCHRONE_DIR, "manifest.json")):
+            _grid = WalkingTimeGrid(DEFAULT_ISOCHRONE_DIR)
+            print(f"[DEBUG] Walking-time grid loaded: {_grid.shape} from {DEFAULT_ISOCHRONE_DIR}")
+    return _grid
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the walking-time grid to the nearest metro / RER station")
+    parser.add_argument("command", choices=["build", "update"])
+    parser.add_argument("--out", default=DEFAULT_ISOCHRONE_DIR, help="Store directory")
+    parser.add_argument("--streets", help="OSM ways exported as GeoJSON (build only; straight-line times if omitted)")
+    parser.add_argument("--stations", help="CSV with lat, lon columns (default: rail stations of the transport store)")
+    parser.add_argument("--cell-m", type=float, default=DEFAULT_CELL_M, help="Grid cell size in meters")
+    parser.add_argument("--max-minutes", type=float, default=DEFAULT_MAX_MINUTES)
+    args = parser.parse_args(argv)
+
+    stations = read_stations_csv(args.stations) if args.stations else rail_stations_from_transport_store()
+    if args.command == "build":
+        graph = StreetGraph.from_geojson(args.streets) if args.streets else None
+        source = os.path.basename(args.streets) if args.streets else "straight line"
+        grid = build(args.out, stations, graph, args.cell_m, args.max_minutes, source)
+        print(f"Grid written to {args.out}: {grid.shape}, {len(stations)} stations")
+    else:
+        grid, stats = update(args.out, stations)
+        print(f"Grid updated in {args.out}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Local index of points of interest (OSM extract) for the drawn-area analysis.
+
+POIs are bucketed on a regular lat/lng grid and sorted by cell, so the POIs
+of one grid row are contiguous: a bounding box query is one array slice per
+row (geodata.spatial.PointIndex). The polygon test, per-category counts and nearest distances are then
+computed with numpy in a single pass over the candidates.
+
+Store layout (directory):
+
+    manifest.json   {"lat0", "lon0", "cell_deg", "nrows", "ncols", "categories", "count", "source"}
+    lat.npy lon.npy float64 coordinates, sorted by cell
+    category.npy    uint8 index into "categories"
+    name.npy        unicode names
+    cell_start.npy  int64 offsets (CSR): POIs of cell c are [cell_start[c], cell_start[c + 1])
+
+Build from an OSM extract exported as GeoJSON points (osmium export,
+Overpass "out center", ...) or a CSV with lat, lon, category, name columns;
+both are streamed and indexed chunk by chunk (geodata.ingest):
+
+    python -m geodata.poi_index ile-de-france-pois.geojson --out data/poi
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from geodata.geometry import points_in_polygon
+from geodata.ingest import ColumnWriter, FeatureStream, StringColumnWriter, chunked, normalize_properties
+from geodata.shards import SHARD_INDEX, ShardCache, ShardedDataset
+from geodata.spatial import PointIndex, haversine_km, km_to_degrees
+
+DEFAULT_POI_INDEX_DIR = os.getenv(
+    "POI_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "poi"),
+)
+
+# Grid cell size in degrees (~500 m in latitude)
+DEFAULT_CELL_DEG = 0.005
+
+# POIs processed at once when building
+DEFAULT_CHUNK_POIS = 100000
+
+# Categories returned by analyze_drawn_area, with their display names
+POI_CATEGORIES = {
+    "transport": "Transports",
+    "commerces": "Commerces",
+    "services": "Services publics",
+    "espaces_verts": "Espaces verts",
+    "education": "Éducation",
+    "sante": "Santé",
+}
+
+# OSM tag -> category ("*" matches any value)
+OSM_TAG_CATEGORIES = [
+    ("railway", {"station", "halt", "subway_entrance", "tram_stop"}, "transport"),
+    ("public_transport", {"station", "stop_position", "platform"}, "transport"),
+    ("highway", {"bus_stop"}, "transport"),
+    ("amenity", {"bicycle_rental", "bus_station", "ferry_terminal"}, "transport"),
+    ("amenity", {"school", "kindergarten", "college", "university", "library"}, "education"),
+    ("amenity", {"hospital", "clinic", "doctors", "dentist", "pharmacy"}, "sante"),
+    ("healthcare", {"*"}, "sante"),
+    ("amenity", {"townhall", "post_office", "police", "fire_station", "courthouse", "community_centre"}, "services"),
+    ("office", {"government"}, "services"),
+    ("shop", {"*"}, "commerces"),
+    ("amenity", {"marketplace", "restaurant", "cafe", "bar", "fast_food", "bank"}, "commerces"),
+    ("leisure", {"park", "garden", "nature_reserve", "playground"}, "espaces_verts"),
+    ("landuse", {"forest", "recreation_ground"}, "espaces_verts"),
+]
+
+def categorize(tags: Dict[str, Any]) -> Optional[str]:
+    """Returns the POI category of an OSM feature from its tags (None if irrelevant)."""
+    category = tags.get("category")
+    if category in POI_CATEGORIES:
+        return category
+    for key, values, category in OSM_TAG_CATEGORIES:
+        value = tags.get(key)
+        if value and ("*" in values or value in values):
+            return category
+    return None
+
+
+class PoiIndex:
+    """Grid-bucketed POI arrays (memory-mapped) with polygon and box queries."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.path = path
+        self.source = manifest.get("source", "")
+        self.lat0, self.lon0 = float(manifest["lat0"]), float(manifest["lon0"])
+        self.cell_deg = float(manifest["cell_deg"])
+        self.nrows, self.ncols = int(manifest["nrows"]), int(manifest["ncols"])
+        self.categories: List[str] = manifest["categories"]
+        self.lat = np.load(os.path.join(path, "lat.npy"), mmap_mode="r")
+        self.lon = np.load(os.path.join(path, "lon.npy"), mmap_mode="r")
+        self.category = np.load(os.path.join(path, "category.npy"), mmap_mode="r")
+        self.name = np.load(os.path.join(path, "name.npy"), mmap_mode="r")
+        self.cell_start = np.load(os.path.join(path, "cell_start.npy"), mmap_mode="r")
+        self.points = PointIndex(self.lat, self.lon, self.lat0, self.lon0, self.cell_deg, self.nrows, self.ncols, self.cell_start)
+        self._category_indexes: Dict[str, Tuple[PointIndex, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def candidates(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> np.ndarray:
+        """Indices of the POIs in the grid cells overlapping a bounding box."""
+        return self.points.bbox_candidates(min_lng, min_lat, max_lng, max_lat)
+
+    def nearest(self, lat: float, lng: float, category: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        The k nearest POIs of a category (e.g. "transport", "education", "commerces").
+
+        Returns:
+            [{"name", "type", "latitude", "longitude", "distance_km"}, ...] nearest first
+        """
+        index, positions = self._category_index(category)
+        found, distances = index.nearest(lat, lng, k)
+        return [
+            {
+                "name": str(self.name[positions[i]]),
+                "type": category,
+                "latitude": float(index.lat[i]),
+                "longitude": float(index.lng[i]),
+                "distance_km": round(float(distance), 3),
+            }
+            for i, distance in zip(found, distances)
+        ]
+
+    def nearest_many(self, lats: Sequence[float], lngs: Sequence[float], category: str, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch kNN over a category for many centers.
+
+        Returns:
+            (poi_indices, distances_km) of shape (n_centers, k), -1 / inf where missing
+        """
+        index, positions = self._category_index(category)
+        found, distances = index.nearest_many(lats, lngs, k)
+        return np.where(found >= 0, positions[found], -1), distances
+
+    def _category_index(self, category: str) -> Tuple[PointIndex, np.ndarray]:
+        """In-memory point index of one category (built on first use)."""
+        if category not in self._category_indexes:
+            code = self.categories.index(category)
+            positions = np.flatnonzero(np.asarray(self.category) == code)
+            index, order = PointIndex.build(self.lat[positions], self.lon[positions], self.cell_deg)
+            self._category_indexes[category] = (index, positions[order])
+        return self._category_indexes[category]
+
+    def analyze_polygon(
+        self,
+        polygon_coords: Sequence[Sequence[float]],
+        center: Tuple[float, float],
+        area_km2: float,
+        nearby_radius_km: float = 1.0,
+        max_nearby: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Counts, densities and nearest distances of the POIs of a drawn area.
+
+        Args:
+            polygon_coords: Polygon [[lng, lat], ...]
+            center: Center of the area [lng, lat], origin of the distances
+            area_km2: Area of the polygon, for densities
+            nearby_radius_km: Search margin around the polygon for nearest/nearby POIs
+            max_nearby: Number of nearby POIs (outside the polygon) to return
+
+        Returns:
+            {"points_of_interest": [...], "nearby_elements": [...], "counts": {...}, "total": int}
+        """
+        polygon = np.asarray(polygon_coords, dtype=np.float64)
+        center_lng, center_lat = center
+        margin_lat, margin_lng = km_to_degrees(nearby_radius_km, center_lat)
+        indices = self.candidates(
+            polygon[:, 0].min() - margin_lng, polygon[:, 1].min() - margin_lat,
+            polygon[:, 0].max() + margin_lng, polygon[:, 1].max() + margin_lat,
+        )
+
+        lats = np.asarray(self.lat[indices])
+        lngs = np.asarray(self.lon[indices])
+        categories = np.asarray(self.category[indices])
+        inside = points_in_polygon(lngs, lats, polygon)
+        distances = haversine_km(center_lat, center_lng, lats, lngs)
+        counts = np.bincount(categories[inside], minlength=len(self.categories))
+
+        points_of_interest = []
+        for code, category in enumerate(self.categories):
+            of_category = categories == code
+            nearest = None
+            if of_category.any():
+                candidates = np.flatnonzero(of_category)
+                nearest = candidates[np.argmin(distances[candidates])]
+            points_of_interest.append({
+                "type": category,
+                "name": POI_CATEGORIES.get(category, category),
+                "count": int(counts[code]),
+                "density_per_km2": round(float(counts[code]) / area_km2, 1) if area_km2 > 0 else None,
+                "distance_km": round(float(distances[nearest]), 3) if nearest is not None else None,
+                "nearest_name": str(self.name[indices[nearest]]) if nearest is not None else None,
+            })
+
+        outside = np.flatnonzero(~inside & (distances <= nearby_radius_km + self._radius_km(polygon, center)))
+        outside = outside[np.argsort(distances[outside])[:max_nearby]]
+        nearby_elements = [
+            {
+                "type": self.categories[categories[i]],
+                "name": str(self.name[indices[i]]),
+                "description": f"{POI_CATEGORIES.get(self.categories[categories[i]], '')} à {distances[i] * 1000:.0f} m",
+                "distance_km": round(float(distances[i]), 3),
+            }
+            for i in outside
+        ]
+
+        return {
+            "points_of_interest": points_of_interest,
+            "nearby_elements": nearby_elements,
+            "counts": {category: int(counts[code]) for code, category in enumerate(self.categories)},
+            "total": int(counts.sum()),
+        }
+
+    @staticmethod
+    def _radius_km(polygon: np.ndarray, center: Tuple[float, float]) -> float:
+        """Distance from the center to the farthest vertex of the polygon."""
+        return float(haversine_km(center[1], center[0], polygon[:, 1], polygon[:, 0]).max())
+
+
+def merge_polygon_analyses(results: Sequence[Dict[str, Any]], area_km2: float, max_nearby: int = 10) -> Dict[str, Any]:
+    """
+    Combines PoiIndex.analyze_polygon results of disjoint shards: counts add
+    up, the nearest POI of each category and the nearby elements are the
+    closest over all the shards.
+    """
+    counts = {category: sum(result["counts"].get(category, 0) for result in results) for category in POI_CATEGORIES}
+    points_of_interest = []
+    for category, display_name in POI_CATEGORIES.items():
+        nearest = min(
+            (poi for result in results for poi in result["points_of_interest"] if poi["type"] == category and poi["distance_km"] is not None),
+            key=lambda poi: poi["distance_km"],
+            default=None,
+        )
+        points_of_interest.append({
+            "type": category,
+            "name": display_name,
+            "count": counts[category],
+            "density_per_km2": round(counts[category] / area_km2, 1) if area_km2 > 0 else None,
+            "distance_km": nearest["distance_km"] if nearest is not None else None,
+            "nearest_name": nearest["nearest_name"] if nearest is not None else None,
+        })
+    nearby_elements = sorted((element for result in results for element in result["nearby_elements"]), key=lambda element: element["distance_km"])
+    return {
+        "points_of_interest": points_of_interest,
+        "nearby_elements": nearby_elements[:max_nearby],
+        "counts": counts,
+        "total": sum(counts.values()),
+    }
+
+
+class ShardedPoiIndex(ShardedDataset):
+    """POI index split in département / tile shards, opened on demand (see geodata.shards)."""
+
+    kind = "poi"
+
+    def __init__(self, root: str, cache: Optional[ShardCache] = None):
+        super().__init__(root, PoiIndex, cache)
+        self.categories: List[str] = list(POI_CATEGORIES)
+
+    def analyze_polygon(
+        self,
+        polygon_coords: Sequence[Sequence[float]],
+        center: Tuple[float, float],
+        area_km2: float,
+        nearby_radius_km: float = 1.0,
+        max_nearby: int = 10,
+    ) -> Dict[str, Any]:
+        """PoiIndex.analyze_polygon over the shards the area (and its search margin) touches."""
+        polygon = np.asarray(polygon_coords, dtype=np.float64)
+        margin_lat, margin_lng = km_to_degrees(nearby_radius_km, center[1])
+        shards = self.covering((
+            polygon[:, 0].min() - margin_lng, polygon[:, 1].min() - margin_lat,
+            polygon[:, 0].max() + margin_lng, polygon[:, 1].max() + margin_lat,
+        ))
+        results = [index.analyze_polygon(polygon, center, area_km2, nearby_radius_km, max_nearby) for index in shards]
+        if len(results) == 1:
+            return results[0]
+        return merge_polygon_analyses(results, area_km2, max_nearby)
+
+
+_index: Optional[Union[PoiIndex, ShardedPoiIndex]] = None
+_index_loaded = False
+
+
+def get_poi_index() -> Optional[Union[PoiIndex, ShardedPoiIndex]]:
+    """Returns the shared POI index (single store or shards), or None if none is installed."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        _index_loaded = True
+        if os.path.exists(os.path.join(DEFAULT_POI_INDEX_DIR, "manifest.json")):
+            _index = PoiIndex(DEFAULT_POI_INDEX_DIR)
+            print(f"[DEBUG] POI index loaded: {len(_index)} POIs from {DEFAULT_POI_INDEX_DIR}")
+        elif os.path.exists(os.path.join(DEFAULT_POI_INDEX_DIR, SHARD_INDEX)):
+            _index = ShardedPoiIndex(DEFAULT_POI_INDEX_DIR)
+            print(f"[DEBUG] POI index indexed: {len(_index.shards)} shards, {len(_index)} POIs from {DEFAULT_POI_INDEX_DIR}")
+    return _index
+
+
+def write_index(path: str, pois: Iterable[Tuple[float, float, str, str]], cell_deg: float = DEFAULT_CELL_DEG, source: str = "",
+                chunk_size: int = DEFAULT_CHUNK_POIS) -> PoiIndex:
+    """
+    Writes a POI index and opens it.
+
+    POIs are consumed chunk by chunk into raw columns on disk, then sorted by
+    grid cell with a two-pass counting sort (cell counts, then each chunk
+    scattered to its final positions), so memory does not grow with the
+    number of POIs.
+
+    Args:
+        path: Output directory
+        pois: (lat, lng, category, name) tuples
+        cell_deg: Grid cell size in degrees
+        source: Free text describing the data origin
+        chunk_size: POIs processed at once
+    """
+    categories = list(POI_CATEGORIES)
+    os.makedirs(path, exist_ok=True)
+    raw = {
+        "lat": ColumnWriter(os.path.join(path, "lat.npy"), np.float64),
+        "lon": ColumnWriter(os.path.join(path, "lon.npy"), np.float64),
+        "category": ColumnWriter(os.path.join(path, "category.npy"), np.uint8),
+    }
+    names = StringColumnWriter(os.path.join(path, "name.npy"))
+    bounds = [np.inf, np.inf, -np.inf, -np.inf]
+    for chunk in chunked((poi for poi in pois if poi[2] in POI_CATEGORIES), chunk_size):
+        lat = np.array([row[0] for row in chunk], dtype=np.float64)
+        lon = np.array([row[1] for row in chunk], dtype=np.float64)
+        raw["lat"].append(lat)
+        raw["lon"].append(lon)
+        raw["category"].append([categories.index(row[2]) for row in chunk])
+        names.append([row[3] or "" for row in chunk])
+        bounds = [min(bounds[0], lat.min()), min(bounds[1], lon.min()), max(bounds[2], lat.max()), max(bounds[3], lon.max())]
+    count = names.length
+    if not count:
+        for writer in (*raw.values(), names):
+            writer.discard()
+        raise ValueError("No POI of a known category to index")
+
+    # Same grid as PointIndex.build
+    lat0 = math.floor(bounds[0] / cell_deg) * cell_deg
+    lon0 = math.floor(bounds[1] / cell_deg) * cell_deg
+    nrows = int((bounds[2] - lat0) // cell_deg) + 1
+    ncols = int((bounds[3] - lon0) // cell_deg) + 1
+
+    sources = {name: writer.mapped() for name, writer in raw.items()}
+
+    def cells(start: int, length: int) -> np.ndarray:
+        lat = np.asarray(sources["lat"][start:start + length])
+        lon = np.asarray(sources["lon"][start:start + length])
+        return ((lat - lat0) // cell_deg).astype(np.int64) * ncols + ((lon - lon0) // cell_deg).astype(np.int64)
+
+    # Pass 1: POIs per cell
+    cell_start = np.zeros(nrows * ncols + 1, dtype=np.int64)
+    for start in range(0, count, chunk_size):
+        found, counts = np.unique(cells(start, chunk_size), return_counts=True)
+        cell_start[found + 1] += counts
+    np.cumsum(cell_start, out=cell_start)
+
+    # Pass 2: stable scatter of each chunk to its final positions
+    cursor = cell_start[:-1].copy()
+    targets = {
+        name: np.lib.format.open_memmap(writer.path, mode="w+", dtype=writer.dtype, shape=(count,))
+        for name, writer in raw.items()
+    }
+    name_target = names.open_target()
+    for start, name_block in names.blocks(chunk_size):
+        cell = cells(start, len(name_block))
+        order = np.argsort(cell, kind="stable")
+        found, first, counts = np.unique(cell[order], return_index=True, return_counts=True)
+        positions = np.repeat(cursor[found] - first, counts) + np.arange(len(cell))
+        cursor[found] += counts
+        for name, target in targets.items():
+            target[positions] = np.asarray(sources[name][start:start + len(cell)])[order]
+        name_target[positions] = name_block[order]
+
+    for target in (*targets.values(), name_target):
+        target.flush()
+    del targets, name_target, sources
+    for writer in (*raw.values(), names):
+        writer.discard()
+    np.save(os.path.join(path, "cell_start.npy"), cell_start)
+    manifest = {
+        "lat0": lat0, "lon0": lon0, "cell_deg": cell_deg, "nrows": nrows, "ncols": ncols,
+        "categories": categories, "count": count, "source": source,
+    }
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return PoiIndex(path)
+
+
+def read_geojson_pois(geojson_path: str, report_every_s: Optional[float] = None) -> Iterable[Tuple[float, float, str, str]]:
+    """Yields (lat, lng, category, name) from a GeoJSON of OSM features (centroid for non-points), streamed."""
+    for feature in FeatureStream(geojson_path, report_every_s=report_every_s):
+        properties = normalize_properties(feature.get("properties"))
+        category = categorize(properties.get("tags", properties))
+        geometry = feature.get("geometry") or {}
+        if category is None or not geometry.get("coordinates"):
+            continue
+        if geometry["type"] == "Point":
+            lng, lat = geometry["coordinates"][:2]
+        else:
+            coords = np.asarray(_flatten_coordinates(geometry["coordinates"]), dtype=np.float64)
+            lng, lat = coords[:, 0].mean(), coords[:, 1].mean()
+        yield float(lat), float(lng), category, properties.get("name", "")
+
+
+def _flatten_coordinates(coordinates: Any) -> List[List[float]]:
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return [coordinates]
+    return [point for part in coordinates for point in _flatten_coordinates(part)]
+
+
+def read_csv_pois(csv_path: str) -> Iterable[Tuple[float, float, str, str]]:
+    """Yields (lat, lng, category, name) from a CSV with lat, lon, category, name columns."""
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            category = categorize(row)
+            if category is not None:
+                yield float(row["lat"]), float(row["lon"]), category, row.get("name", "")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the local POI index from an OSM extract")
+    parser.add_argument("input", help="GeoJSON (OSM features) or CSV (lat, lon, category, name)")
+    parser.add_argument("--out", default=DEFAULT_POI_INDEX_DIR, help="Output directory")
+    parser.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG, help="Grid cell size in degrees")
+    parser.add_argument("--report-every-s", type=float, default=10.0, help="Progress report interval (GeoJSON input)")
+    args = parser.parse_args(argv)
+
+    if args.input.lower().endswith(".csv"):
+        pois = read_csv_pois(args.input)
+    else:
+        pois = read_geojson_pois(args.input, report_every_s=args.report_every_s)
+    index = write_index(args.out, pois, args.cell_deg, source=os.path.basename(args.input))
+    print(f"Index written to {args.out}: {len(index)} POIs, grid {index.nrows}x{index.ncols}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Projections from WGS84 (lng, lat) to the metric CRS used by the local flood data.
+
+Only the forward direction is needed: stored geometries stay in their projected
+CRS and query polygons are projected into it. Supported CRS:
+
+- EPSG:326xx / EPSG:327xx: UTM north / south zones (Krüger series, mm accuracy)
+- EPSG:2154: Lambert-93, the French national projection
+
+Everything is vectorized over numpy arrays.
+"""
+
+import math
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+GRS80_F = 1 / 298.257222101
+
+_EPSG_PATTERN = re.compile(r"EPSG:+(\d+)$", re.IGNORECASE)
+_WGS84_NAMES = ("CRS84", "EPSG:4326", "EPSG::4326")
+
+
+def crs_from_geojson(data: Dict[str, Any]) -> str:
+    """
+    CRS of a GeoJSON object as "EPSG:<code>" ("EPSG:4326" when absent or CRS84).
+    """
+    name = ((data.get("crs") or {}).get("properties") or {}).get("name", "")
+    if not name or any(name.upper().endswith(wgs84) for wgs84 in _WGS84_NAMES):
+        return "EPSG:4326"
+    match = _EPSG_PATTERN.search(name.replace("urn:ogc:def:crs:", ""))
+    if not match:
+        raise ValueError(f"Unsupported CRS name: {name}")
+    return f"EPSG:{int(match.group(1))}"
+
+
+def utm_crs(lng: float, lat: float) -> str:
+    """UTM CRS of the zone containing a point."""
+    zone = int((lng + 180) // 6) % 60 + 1
+    return f"EPSG:{32600 + zone if lat >= 0 else 32700 + zone}"
+
+
+def _utm_zone(crs: str) -> Optional[Tuple[int, bool]]:
+    code = int(crs.split(":")[1])
+    if 32601 <= code <= 32660:
+        return code - 32600, False
+    if 32701 <= code <= 32760:
+        return code - 32700, True
+    return None
+
+
+def _utm_forward(lngs: np.ndarray, lats: np.ndarray, zone: int, south: bool) -> Tuple[np.ndarray, np.ndarray]:
+    n = WGS84_F / (2 - WGS84_F)
+    big_a = WGS84_A / (1 + n) * (1 + n ** 2 / 4 + n ** 4 / 64)
+    alphas = (
+        n / 2 - 2 * n ** 2 / 3 + 5 * n ** 3 / 16,
+        13 * n ** 2 / 48 - 3 * n ** 3 / 5,
+        61 * n ** 3 / 240,
+    )
+    e = math.sqrt(WGS84_F * (2 - WGS84_F))
+
+    phi = np.radians(lats)
+    dlambda = np.radians(lngs - ((zone - 1) * 6 - 180 + 3))
+    sin_phi = np.sin(phi)
+    t = np.sinh(np.arctanh(sin_phi) - e * np.arctanh(e * sin_phi))
+    xi = np.arctan2(t, np.cos(dlambda))
+    eta = np.arctanh(np.sin(dlambda) / np.sqrt(1 + t ** 2))
+
+    easting = eta.copy()
+    northing = xi.copy()
+    for j, alpha in enumerate(alphas, start=1):
+        easting += alpha * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+        northing += alpha * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+    k0 = 0.9996
+    return 500000 + k0 * big_a * easting, (10000000 if south else 0) + k0 * big_a * northing
+
+
+def _lambert93_forward(lngs: np.ndarray, lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    e = math.sqrt(GRS80_F * (2 - GRS80_F))
+
+    def m(phi):
+        return np.cos(phi) / np.sqrt(1 - (e * np.sin(phi)) ** 2)
+
+    def t(phi):
+        return np.tan(math.pi / 4 - phi / 2) / ((1 - e * np.sin(phi)) / (1 + e * np.sin(phi))) ** (e / 2)
+
+    phi0, phi1, phi2 = math.radians(46.5), math.radians(49.0), math.radians(44.0)
+    n = (math.log(m(phi1)) - math.log(m(phi2))) / (math.log(t(phi1)) - math.log(t(phi2)))
+    big_f = m(phi1) / (n * t(phi1) ** n)
+    rho0 = WGS84_A * big_f * t(phi0) ** n
+
+    rho = WGS84_A * big_f * t(np.radians(lats)) ** n
+    theta = n * np.radians(lngs - 3.0)
+    return 700000 + rho * np.sin(theta), 6600000 + rho0 - rho * np.cos(theta)
+
+
+def project(crs: str, lngs, lats) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Projects WGS84 coordinates into a metric CRS.
+
+    Args:
+        crs: "EPSG:<code>" (UTM zone or 2154)
+        lngs: Longitudes in degrees
+        lats: Latitudes in degrees
+
+    Returns:
+        (x, y) in meters
+    """
+    lngs = np.asarray(lngs, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    if crs == "EPSG:2154":
+        return _lambert93_forward(lngs, lats)
+    zone = _utm_zone(crs)
+    if zone is None:
+        raise ValueError(f"Unsupported projected CRS: {crs}")
+    return _utm_forward(lngs, lats, *zone)
+
+
+def is_supported(crs: str) -> bool:
+    return crs == "EPSG:2154" or _utm_zone(crs) is not None
@@ -0,0 +1,295 @@
+"""
+Region-sharded stores, opened on demand and kept in an LRU of resident shards.
+
+A national dataset is split on disk into regular stores, one per département
+or tile, under a root directory indexed by shards.json. A query only opens
+the shards its zone touches; opened shards stay resident in a cache shared by
+all the datasets, bounded by a byte budget (the on-disk size of the shards),
+and the least recently used ones are dropped when it is exceeded. A process
+can then serve the whole country while holding only the regions in use.
+
+Layout (root directory):
+
+    shards.json     {"kind": "flood" | "poi" | "climate",
+                     "shards": [{"id", "path", "crs", "bbox", "bytes", "count", ...}]}
+    <id>/           a regular store of that kind (manifest.json + .npy files)
+
+bbox is (min_x, min_y, max_x, max_y) in the shard CRS ("EPSG:4326": lng/lat).
+Build each shard with the store's own builder, then index the root:
+
+    python -m geodata.flood_overlay tri-75.json --out data/flood/75
+    python -m geodata.flood_overlay tri-92.json --out data/flood/92
+    python -m geodata.shards index data/flood
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+SHARD_INDEX = "shards.json"
+DEFAULT_SHARD_BUDGET_BYTES = int(float(os.getenv("GEODATA_SHARD_BUDGET_MB", "1024")) * 1_000_000)
+
+# Load latencies kept for the percentiles
+_LATENCY_WINDOW = 256
+
+BBox = Tuple[float, float, float, float]
+
+
+class _PendingLoad:
+    """A shard being loaded: the other threads asking for it wait for this load."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.store: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ShardCache:
+    """
+    LRU of opened shards with a byte budget, shared by all the sharded datasets.
+
+    A shard larger than the whole budget is still opened (alone). Shards are
+    loaded outside the lock: a slow load only blocks the threads waiting for
+    that same shard.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_SHARD_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], _PendingLoad] = {}
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_ms: deque = deque(maxlen=_LATENCY_WINDOW)
+        self._load_total_ms = 0.0
+        self._by_kind: Dict[str, Dict[str, int]] = {}
+
+    def get(self, kind: str, path: str, nbytes: int, loader: Callable[[str], Any]) -> Any:
+        """
+        Returns the opened shard at `path`, loading it (and evicting cold shards) on a miss.
+        """
+        key = (kind, path)
+        with self._lock:
+            counters = self._by_kind.setdefault(kind, {"hits": 0, "misses": 0})
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                counters["hits"] += 1
+                return entry[0]
+
+            pending = self._loading.get(key)
+            if pending is None:
+                pending = self._loading[key] = _PendingLoad()
+                self.misses += 1
+                counters["misses"] += 1
+                loading = True
+            else:
+                # Already being loaded by another thread
+                self.hits += 1
+                counters["hits"] += 1
+                loading = False
+
+        if not loading:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.store
+
+        started = time.perf_counter()
+        try:
+            store = loader(path)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            pending.error = e
+            pending.done.set()
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[DEBUG] Shard loaded: {kind} {os.path.basename(path)} ({nbytes / 1e6:.1f} MB) in {elapsed_ms:.1f} ms")
+
+        with self._lock:
+            del self._loading[key]
+            self._load_ms.append(elapsed_ms)
+            self._load_total_ms += elapsed_ms
+            self._entries[key] = (store, nbytes)
+            self.resident_bytes += nbytes
+            while self.resident_bytes > self.budget_bytes and len(self._entries) > 1:
+                (evicted_kind, evicted_path), (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.resident_bytes -= evicted_bytes
+                self.evictions += 1
+                print(f"[DEBUG] Shard evicted: {evicted_kind} {os.path.basename(evicted_path)}")
+        pending.store = store
+        pending.done.set()
+        return store
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns counters on the resident shards and their loads."""
+        with self._lock:
+            latencies = sorted(self._load_ms)
+            loads = self.misses
+
+            def percentile(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes,
+                "resident": [f"{kind}:{os.path.basename(path)}" for kind, path in self._entries],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_ms": {
+                    "mean": round(self._load_total_ms / loads, 2) if loads else None,
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "max": round(latencies[-1], 2) if latencies else None,
+                },
+                "by_kind": {kind: dict(counters) for kind, counters in self._by_kind.items()},
+            }
+
+
+# Shared by every sharded dataset of the process
+shard_cache = ShardCache()
+
+
+class ShardedDataset:
+    """
+    Shard index of a root directory; shards are opened through the shared cache.
+
+    Subclasses (one per store kind) implement the store's query methods on top
+    of covering() / at().
+    """
+
+    kind = ""
+
+    def __init__(self, root: str, loader: Callable[[str], Any], cache: Optional[ShardCache] = None):
+        with open(os.path.join(root, SHARD_INDEX), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("kind") != self.kind:
+            raise ValueError(f"{root}: {SHARD_INDEX} indexes {manifest.get('kind')} shards, not {self.kind}")
+        self.root = root
+        self.loader = loader
+        self.cache = cache or shard_cache
+        self.shards: List[Dict[str, Any]] = manifest["shards"]
+
+    def __len__(self) -> int:
+        return sum(shard.get("count", 0) for shard in self.shards)
+
+    def _overlaps(self, shard: Dict[str, Any], bbox: BBox) -> bool:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        crs = shard.get("crs", "EPSG:4326")
+        if crs == "EPSG:4326":
+            xs, ys = (min_lng, max_lng), (min_lat, max_lat)
+        else:
+            from geodata.projection import project
+
+            # Corners and edge midpoints of the lng/lat box, projected
+            lngs = [min_lng, max_lng, max_lng, min_lng, (min_lng + max_lng) / 2, max_lng, (min_lng + max_lng) / 2, min_lng]
+            lats = [min_lat, min_lat, max_lat, max_lat, min_lat, (min_lat + max_lat) / 2, max_lat, (min_lat + max_lat) / 2]
+            xs, ys = project(crs, lngs, lats)
+        min_x, min_y, max_x, max_y = shard["bbox"]
+        return bool(max(xs) >= min_x and min(xs) <= max_x and max(ys) >= min_y and min(ys) <= max_y)
+
+    def open(self, shard: Dict[str, Any]) -> Any:
+        return self.cache.get(self.kind, os.path.join(self.root, shard["path"]), shard.get("bytes", 0), self.loader)
+
+    def covering(self, bbox: BBox) -> List[Any]:
+        """Opened shards overlapping a (min_lng, min_lat, max_lng, max_lat) box."""
+        return [self.open(shard) for shard in self.shards if self._overlaps(shard, bbox)]
+
+    def at(self, lat: float, lng: float) -> Optional[Any]:
+        """Opened shard containing a point (the first one), or None."""
+        for shard in self.shards:
+            if self._overlaps(shard, (lng, lat, lng, lat)):
+                return self.open(shard)
+        return None
+
+
+def ring_bbox(coordinates: Sequence[Sequence[float]]) -> BBox:
+    """(min_lng, min_lat, max_lng, max_lat) of a [[lng, lat], ...] ring."""
+    lngs = [point[0] for point in coordinates]
+    lats = [point[1] for point in coordinates]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name)))
+
+
+def describe_shard(path: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Kind and index entry of a store directory, from its manifest.
+
+    Returns:
+        (kind, {"crs", "bbox", "count", ...})
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if "scenarios" in manifest:
+        return "flood", {"crs": manifest["crs"], "bbox": manifest["extent"], "count": manifest["count"],
+                         "scenarios": manifest["scenarios"]}
+    if "categories" in manifest:
+        cell = manifest["cell_deg"]
+        bbox = [manifest["lon0"], manifest["lat0"], manifest["lon0"] + manifest["ncols"] * cell, manifest["lat0"] + manifest["nrows"] * cell]
+        return "poi", {"crs": "EPSG:4326", "bbox": bbox, "count": manifest["count"], "categories": manifest["categories"]}
+    if "layers" in manifest:
+        grid = manifest["grid"]
+        bbox = [grid["lon0"] - grid["dlon"] / 2, grid["lat0"] - grid["dlat"] / 2,
+                grid["lon0"] + (grid["nlon"] - 0.5) * grid["dlon"], grid["lat0"] + (grid["nlat"] - 0.5) * grid["dlat"]]
+        return "climate", {"crs": "EPSG:4326", "bbox": bbox, "count": grid["nlat"] * grid["nlon"], "layers": list(manifest["layers"])}
+    raise ValueError(f"{path}: not a flood, POI or climate store")
+
+
+def write_index(root: str) -> Dict[str, Any]:
+    """
+    Indexes the stores found in the subdirectories of root into shards.json.
+
+    Returns:
+        The index
+    """
+    kinds, shards = set(), []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            continue
+        kind, entry = describe_shard(path)
+        kinds.add(kind)
+        if not all(math.isfinite(value) for value in entry["bbox"]):
+            continue
+        shards.append({"id": name, "path": name, "bytes": _directory_bytes(path), **entry})
+    if len(kinds) != 1:
+        raise ValueError(f"{root}: expected shards of one kind, found {sorted(kinds) or 'none'}")
+    index = {"kind": kinds.pop(), "shards": shards}
+    with open(os.path.join(root, SHARD_INDEX), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Index region shards (one store per subdirectory)")
+    parser.add_argument("command", choices=["index"])
+    parser.add_argument("root", help="Directory containing one store per département or tile")
+    args = parser.parse_args(argv)
+
+    index = write_index(args.root)
+    total = sum(shard["bytes"] for shard in index["shards"])
+    print(f"{SHARD_INDEX} written to {args.root}: {len(index['shards'])} {index['kind']} shards, {total / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
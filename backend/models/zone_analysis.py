@@ -29,6 +29,14 @@ class TransportType(str, Enum):
     BIKE_SHARE = "bike_share"
 
 
+class FloodScenarioCoverage(BaseModel):
+    scenario: str = Field(..., description="TRI scenario code (01For, 02Moy, 03Mcc, 04Fai)")
+    label: str = Field(..., description="Scenario description")
+    return_period_years: Optional[int] = Field(None, description="Typical return period of the scenario (years)")
+    coverage_percent: float = Field(..., description="Share of the zone inside the scenario flood extent (%)")
+    area_km2: float = Field(..., description="Area of the zone inside the scenario flood extent (km²)")
+
+
 class FloodRiskData(BaseModel):
     risk_level: RiskLevel = Field(..., description="Overall flood risk level")
     flood_probability_10_years: float = Field(..., description="Flood probability in next 10 years (%)")
@@ -37,6 +45,7 @@ class FloodRiskData(BaseModel):
     water_sources: List[str] = Field(default=[], description="Nearby water sources")
     elevation_meters: Optional[float] = Field(None, description="Area elevation in meters")
     drainage_quality: Optional[str] = Field(None, description="Drainage system quality assessment")
+    flood_zone_coverage: List[FloodScenarioCoverage] = Field(default=[], description="Share of the zone in each mapped flood scenario (TRI)")
 
 
 class HeatWaveRiskData(BaseModel):
@@ -8,6 +8,7 @@ from agentX.flood_risk_agent import create_flood_risk_agent
 from agentX.heat_wave_agent import create_heat_wave_agent
 from agentX.real_estate_agent import create_real_estate_agent
 from agentX.construction_agent import create_construction_agent
+from agentX.transportation_agent import create_transportation_agent
 
 
 
@@ -137,4 +138,6 @@ async def test_all_agents_simple():
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     asyncio.run(test_all_agents_simple())
\ No newline at end of file
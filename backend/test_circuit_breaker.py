@@ -0,0 +1,131 @@
+"""
+Tests du disjoncteur (tools/circuit_breaker.py) : ouverture sur taux d'erreur
+ou appels lents, sonde demi-ouverte unique, tickets d'une époque précédente.
+"""
+
+import pytest
+
+from tools import circuit_breaker
+from tools.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", error_rate=0.5, slow_call_s=1.0, min_calls=4, open_s=30.0, window=10)
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(breaker.allow(), False, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_opens_on_error_rate_after_min_calls(clock):
+    """Le circuit ne s'ouvre qu'après min_calls appels, au taux d'erreur configuré."""
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(breaker.allow(), False, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(breaker.allow(), True, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_slow_successes_count_as_failures(clock):
+    """Un succès plus lent que slow_call_s compte comme un échec."""
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(breaker.allow(), True, 5.0)
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 4
+    assert breaker.stats()["failures"] == 0
+
+
+def test_half_open_admits_a_single_probe(clock):
+    """Après open_s, une seule sonde passe ; available() ne la consomme pas."""
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 29
+    assert not breaker.available()
+    clock.now += 1
+    assert breaker.available()
+    assert breaker.available()
+    probe = breaker.allow()
+    assert probe is not None and probe.probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.available()
+    assert breaker.allow() is None
+
+
+@pytest.mark.parametrize("success, elapsed_s, state", [(True, 0.1, CLOSED), (False, 0.1, OPEN), (True, 5.0, OPEN)])
+def test_probe_outcome_closes_or_reopens(clock, success, elapsed_s, state):
+    """La sonde ferme le circuit si elle réussit vite, le rouvre sinon."""
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    breaker.record(breaker.allow(), success, elapsed_s)
+    assert breaker.state == state
+    if state == CLOSED:
+        assert breaker.stats()["recent_error_rate"] is None
+    else:
+        assert breaker.stats()["opened"] == 2
+        assert breaker.stats()["half_open_in_s"] == 30.0
+
+
+def test_call_admitted_while_closed_does_not_close_the_circuit(clock):
+    """Un appel admis avant l'ouverture et terminé pendant la sonde est ignoré."""
+    breaker = make_breaker()
+    late = breaker.allow()
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow()
+    breaker.record(late, True, 0.1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # La sonde est toujours en cours
+    breaker.record(probe, False, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_call_admitted_while_closed_does_not_reopen_the_circuit(clock):
+    """Un échec d'une époque précédente ne rouvre pas un circuit refermé."""
+    breaker = make_breaker()
+    late = breaker.allow()
+    trip(breaker)
+    clock.now += 30
+    breaker.record(breaker.allow(), True, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(late, False, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_error_rate"] is None
+    assert breaker.stats()["failures"] == breaker.min_calls + 1  # Compté malgré tout
+
+
+def test_stale_probe_is_ignored(clock):
+    """La sonde d'une demi-ouverture précédente ne décide pas de la suivante."""
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    stale = breaker.allow()
+    breaker.record(stale, False, 0.1)  # Rouvre
+    clock.now += 30
+    probe = breaker.allow()
+    assert probe is not None and probe is not stale
+    breaker.record(stale, True, 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record(probe, True, 0.1)
+    assert breaker.state == CLOSED
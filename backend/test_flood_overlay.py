@@ -0,0 +1,95 @@
+"""
+Tests de l'aire d'intersection zone ∩ union des polygones d'inondation,
+comparée à un échantillonnage brute force.
+"""
+
+import numpy as np
+import pytest
+
+from geodata.flood_overlay import union_intersection_area, write_store, zone_coverage
+from geodata.geometry import points_in_polygon
+from geodata.projection import project
+
+# Zone de requête 10 x 10 (sens trigonométrique)
+QUERY = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], dtype=np.float64)
+
+# Points d'échantillonnage par côté de la zone
+SAMPLES = 400
+
+
+def rect(x0: float, y0: float, x1: float, y1: float, counter_clockwise: bool = True) -> np.ndarray:
+    ring = np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float64)
+    return ring if counter_clockwise else ring[::-1]
+
+
+def edges(polygons):
+    """Arêtes concaténées de polygones [[anneau extérieur, *trous], ...]."""
+    edge_a, edge_b, edge_group = [], [], []
+    for group, rings in enumerate(polygons):
+        for ring in rings:
+            edge_a.append(ring)
+            edge_b.append(np.roll(ring, -1, axis=0))
+            edge_group.append(np.full(len(ring), group, dtype=np.int64))
+    return np.concatenate(edge_a), np.concatenate(edge_b), np.concatenate(edge_group), len(polygons)
+
+
+def brute_force_area(query: np.ndarray, polygons) -> float:
+    """Aire de query ∩ union, par comptage des centres d'une grille fine."""
+    (min_x, min_y), (max_x, max_y) = query.min(axis=0), query.max(axis=0)
+    step_x, step_y = (max_x - min_x) / SAMPLES, (max_y - min_y) / SAMPLES
+    xs, ys = np.meshgrid(min_x + (np.arange(SAMPLES) + 0.5) * step_x, min_y + (np.arange(SAMPLES) + 0.5) * step_y)
+    xs, ys = xs.ravel(), ys.ravel()
+    in_union = np.zeros(len(xs), dtype=bool)
+    for rings in polygons:
+        inside = np.zeros(len(xs), dtype=bool)
+        for ring in rings:
+            inside ^= points_in_polygon(xs, ys, ring)  # Pair-impair : les trous sont retirés
+        in_union |= inside
+    return float((points_in_polygon(xs, ys, query) & in_union).sum() * step_x * step_y)
+
+
+CASES = {
+    "adjacent": [[rect(2, 2, 5, 8)], [rect(5, 2, 8, 8)]],
+    "halves": [[rect(0, 0, 5, 10)], [rect(5, 0, 10, 10)]],
+    "identical": [[rect(2, 2, 6, 6)], [rect(2, 2, 6, 6)]],
+    "nested": [[rect(1, 1, 9, 9)], [rect(3, 3, 6, 6)]],
+    "collinear_overlap": [[rect(2, 2, 6, 6)], [rect(4, 2, 8, 6)]],
+    "t_junction": [[rect(2, 2, 6, 6)], [rect(6, 3, 8, 5)]],
+    "shared_query_edge": [[rect(0, 0, 4, 4)]],
+    "touching_outside": [[rect(10, 0, 12, 10)]],
+    "crossing": [[rect(-2, 3, 12, 5)], [rect(3, -2, 5, 12)]],
+    "covering": [[rect(-5, -5, 15, 15)]],
+    "diamond": [[np.array([[5, -2], [12, 5], [5, 12], [-2, 5]], dtype=np.float64)]],
+    "hole": [[rect(1, 1, 9, 9), rect(3, 3, 6, 6, counter_clockwise=False)]],
+    "hole_filled": [[rect(1, 1, 9, 9), rect(3, 3, 6, 6, counter_clockwise=False)], [rect(3, 3, 6, 6)]],
+    "identical_triple": [[rect(1, 1, 4, 9)], [rect(1, 1, 4, 9)], [rect(1, 1, 4, 9)]],
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_union_intersection_area_matches_brute_force(name):
+    """Bords communs, polygones identiques ou imbriqués : même aire que l'échantillonnage."""
+    polygons = CASES[name]
+    area = union_intersection_area(QUERY, *edges(polygons))
+    expected = brute_force_area(QUERY, polygons)
+    assert area == pytest.approx(expected, abs=0.25), f"{name}: {area:.3f} instead of {expected:.3f}"
+
+
+def test_zone_coverage_counts_polygons_repeated_across_shards_once(tmp_path):
+    """Un même polygone présent dans deux shards n'est compté qu'une fois."""
+    crs = "EPSG:2154"
+    zone = [[2.340, 48.850], [2.350, 48.850], [2.350, 48.856], [2.340, 48.856]]
+    lngs, lats = np.array(zone).T
+    x, y = project(crs, lngs, lats)
+    (min_x, min_y), (max_x, max_y) = np.column_stack([x, y]).min(axis=0), np.column_stack([x, y]).max(axis=0)
+    left = rect(min_x - 100, min_y - 100, (min_x + max_x) / 2, max_y + 100)
+    right = rect((min_x + max_x) / 2, min_y - 100, max_x + 100, max_y + 100)
+
+    shard_a = write_store(str(tmp_path / "a"), crs, [{"scenario": "01For", "id_carte": "a", "rings": [left]}])
+    shard_b = write_store(str(tmp_path / "b"), crs, [
+        {"scenario": "01For", "id_carte": "b", "rings": [left]},
+        {"scenario": "01For", "id_carte": "b", "rings": [right]},
+    ])
+
+    percents, _ = zone_coverage(zone, [shard_a, shard_b])
+    assert percents["01For"] == pytest.approx(100.0, abs=0.01)
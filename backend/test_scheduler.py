@@ -0,0 +1,171 @@
+"""
+Tests de la file d'exécution priorisée (agentX/scheduler.py) : ordre de
+passage, éviction des requêtes batch par les requêtes interactives,
+SchedulerSaturated et estimation du Retry-After.
+"""
+
+import asyncio
+
+import pytest
+
+from agentX.deadline import Deadline, DeadlineExceeded, deadline_scope
+from agentX.scheduler import Priority, RunPool, SchedulerSaturated
+
+
+async def settle():
+    """Laisse tourner les tâches prêtes."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(pool: RunPool, priority: Priority, order: list, release: asyncio.Event):
+    async with pool.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+
+def test_free_slot_is_taken_without_queuing():
+    """Sous la limite, acquire() rend la main sans file d'attente."""
+    async def main():
+        pool = RunPool("test", max_concurrent=2, max_queue=1)
+        assert pool.has_free_slot()
+        await pool.acquire(Priority.BATCH)
+        await pool.acquire(Priority.BATCH)
+        assert pool.running == 2
+        assert not pool.has_free_slot()
+        pool.release()
+        pool.release()
+        assert pool.running == 0
+
+    asyncio.run(main())
+
+
+def test_interactive_waiters_pass_before_batch():
+    """Un créneau libéré va au plus prioritaire, puis au plus ancien."""
+    async def main():
+        pool = RunPool("test", max_concurrent=1, max_queue=3)
+        await pool.acquire(Priority.BATCH)
+        order, release = [], asyncio.Event()
+        release.set()
+        tasks = [asyncio.create_task(hold(pool, priority, order, release))
+                 for priority in (Priority.BATCH, Priority.INTERACTIVE, Priority.BATCH)]
+        await settle()
+        assert pool.stats()["queue_depth"] == 3
+        pool.release()
+        await asyncio.gather(*tasks)
+        assert order == [Priority.INTERACTIVE, Priority.BATCH, Priority.BATCH]
+        assert pool.running == 0
+
+    asyncio.run(main())
+
+
+def test_full_queue_rejects_with_retry_after():
+    """File pleine : rejet immédiat, Retry-After selon la durée moyenne et l'arriéré."""
+    async def main():
+        pool = RunPool("test", max_concurrent=2, max_queue=2)
+        for _ in range(2):
+            pool.record_run_time(10.0)  # Moyenne glissante : 5 -> 6 -> 6.8 s
+        await pool.acquire(Priority.INTERACTIVE)
+        await pool.acquire(Priority.INTERACTIVE)
+        waiters = [asyncio.create_task(pool.acquire(Priority.INTERACTIVE)) for _ in range(2)]
+        await settle()
+        assert not pool.has_capacity(Priority.INTERACTIVE)
+        with pytest.raises(SchedulerSaturated) as raised:
+            await pool.acquire(Priority.INTERACTIVE)
+        # (2 en attente + 1) * 6.8 s / 2 créneaux, arrondi au-dessus
+        assert raised.value.retry_after == 11
+        assert raised.value.pool == "test"
+        assert pool.stats()["rejected"] == 1
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert pool.stats()["queue_depth"] == 0
+
+    asyncio.run(main())
+
+
+def test_retry_after_is_at_least_one_second():
+    """Des exécutions très courtes donnent tout de même un Retry-After d'au moins 1 s."""
+    pool = RunPool("test", max_concurrent=8, max_queue=1)
+    for _ in range(50):
+        pool.record_run_time(0.01)
+    assert pool.retry_after() == 1.0
+
+
+def test_interactive_evicts_newest_batch_waiter():
+    """File pleine : une requête interactive évince la requête batch la plus récente."""
+    async def main():
+        pool = RunPool("test", max_concurrent=1, max_queue=2)
+        await pool.acquire(Priority.INTERACTIVE)
+        oldest = asyncio.create_task(pool.acquire(Priority.BATCH))
+        newest = asyncio.create_task(pool.acquire(Priority.BATCH))
+        await settle()
+        assert pool.has_capacity(Priority.INTERACTIVE)
+        assert not pool.has_capacity(Priority.BATCH)
+
+        interactive = asyncio.create_task(pool.acquire(Priority.INTERACTIVE))
+        await settle()
+        with pytest.raises(SchedulerSaturated):
+            await newest
+        assert not oldest.done()
+        assert pool.stats()["queue_depth"] == 2
+
+        pool.release()
+        await interactive
+        assert not oldest.done()
+        pool.release()
+        await oldest
+        pool.release()
+        assert pool.running == 0
+
+    asyncio.run(main())
+
+
+def test_batch_does_not_evict():
+    """Une requête batch n'évince personne : elle est rejetée."""
+    async def main():
+        pool = RunPool("test", max_concurrent=1, max_queue=1)
+        await pool.acquire(Priority.INTERACTIVE)
+        queued = asyncio.create_task(pool.acquire(Priority.BATCH))
+        await settle()
+        with pytest.raises(SchedulerSaturated):
+            await pool.acquire(Priority.BATCH)
+        assert not queued.done()
+        pool.release()
+        await queued
+        pool.release()
+        assert pool.running == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_back_a_handed_over_slot():
+    """Annulé juste après avoir reçu le créneau : le créneau est rendu."""
+    async def main():
+        pool = RunPool("test", max_concurrent=1, max_queue=1)
+        await pool.acquire(Priority.INTERACTIVE)
+        waiter = asyncio.create_task(pool.acquire(Priority.INTERACTIVE))
+        await settle()
+        pool.release()  # Créneau transmis au waiter, pas encore réveillé
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert pool.running == 0
+        assert pool.has_free_slot()
+
+    asyncio.run(main())
+
+
+def test_deadline_while_queued_frees_the_place():
+    """Échéance dépassée en file : DeadlineExceeded, et la place est rendue."""
+    async def main():
+        pool = RunPool("test", max_concurrent=1, max_queue=1)
+        await pool.acquire(Priority.INTERACTIVE)
+        with deadline_scope(Deadline.after(0.05)):
+            with pytest.raises(DeadlineExceeded):
+                await pool.acquire(Priority.INTERACTIVE)
+        assert pool.stats()["queue_depth"] == 0
+        assert pool.has_capacity(Priority.BATCH)
+        pool.release()
+        assert pool.running == 0
+
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Tests du regroupement des analyses identiques en cours (agentX/singleflight.py) :
+une seule exécution partagée, échéance propre à chaque appelant, annulation
+quand le dernier appelant abandonne.
+"""
+
+import asyncio
+
+import pytest
+
+from agentX.deadline import DEFAULT_REQUEST_TIMEOUT_S, Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from agentX.singleflight import SingleFlight, analysis_key
+
+
+class Analysis:
+    """Analyse factice : compte ses démarrages, se termine sur `release`."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = False
+        self.deadline = None
+
+    async def __call__(self):
+        self.started += 1
+        self.deadline = current_deadline()
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"run": self.started}
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_share_one_run():
+    """Des appels simultanés de même clé n'exécutent l'analyse qu'une fois."""
+    async def main():
+        flight, analysis = SingleFlight(), Analysis()
+        callers = [asyncio.create_task(flight.run("zone", analysis)) for _ in range(3)]
+        await settle()
+        assert flight.stats() == {"in_flight": 1, "started": 1, "coalesced": 2}
+        analysis.release.set()
+        results = await asyncio.gather(*callers)
+        assert results == [{"run": 1}] * 3
+        assert analysis.started == 1
+        assert flight.stats()["in_flight"] == 0
+
+        # Terminée : un nouvel appel relance l'analyse
+        assert await flight.run("zone", analysis) == {"run": 2}
+
+    asyncio.run(main())
+
+
+def test_different_keys_run_separately():
+    """Des clés différentes ne sont pas regroupées."""
+    async def main():
+        flight, analysis = SingleFlight(), Analysis()
+        analysis.release.set()
+        await asyncio.gather(flight.run("a", analysis), flight.run("b", analysis))
+        assert analysis.started == 2
+        assert flight.stats()["coalesced"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_run():
+    """Un appelant annulé arrête d'attendre ; les autres reçoivent le résultat."""
+    async def main():
+        flight, analysis = SingleFlight(), Analysis()
+        first = asyncio.create_task(flight.run("zone", analysis))
+        second = asyncio.create_task(flight.run("zone", analysis))
+        await settle()
+        first.cancel()
+        await settle()
+        assert first.cancelled()
+        assert not analysis.cancelled
+        analysis.release.set()
+        assert await second == {"run": 1}
+
+    asyncio.run(main())
+
+
+def test_run_is_cancelled_when_every_waiter_leaves():
+    """Plus aucun appelant : l'analyse est annulée et oubliée."""
+    async def main():
+        flight, analysis = SingleFlight(), Analysis()
+        callers = [asyncio.create_task(flight.run("zone", analysis)) for _ in range(2)]
+        await settle()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await settle()
+        assert analysis.cancelled
+        assert flight.stats()["in_flight"] == 0
+
+        # Un nouvel appel ne rejoint pas l'exécution annulée
+        analysis.release.set()
+        assert await flight.run("zone", analysis) == {"run": 2}
+
+    asyncio.run(main())
+
+
+def test_each_waiter_waits_within_its_own_deadline():
+    """L'échéance d'un appelant pressé ne s'impose ni à l'analyse ni aux autres."""
+    async def main():
+        flight, analysis = SingleFlight(), Analysis()
+
+        async def hurried():
+            with deadline_scope(Deadline.after(0.05)):
+                return await flight.run("zone", analysis)
+
+        first = asyncio.create_task(hurried())
+        second = asyncio.create_task(flight.run("zone", analysis))
+        with pytest.raises(DeadlineExceeded):
+            await first
+        assert not analysis.cancelled
+        # L'analyse partagée tourne sous l'échéance par défaut du serveur
+        assert analysis.deadline.remaining() > DEFAULT_REQUEST_TIMEOUT_S - 5
+        analysis.release.set()
+        assert await second == {"run": 1}
+
+    asyncio.run(main())
+
+
+def test_errors_reach_every_waiter():
+    """Une erreur de l'analyse partagée est levée chez chaque appelant."""
+    async def main():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("service down")
+
+        results = await asyncio.gather(*(flight.run("zone", failing) for _ in range(2)), return_exceptions=True)
+        assert [str(result) for result in results] == ["service down"] * 2
+        assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 1}
+
+    asyncio.run(main())
+
+
+def test_analysis_key_normalizes_the_address():
+    """Deux écritures de la même adresse donnent la même clé."""
+    assert analysis_key("flood_risk", "  Place de la  Bastille PARIS ") == analysis_key("flood_risk", "place de la bastille paris")
+    assert analysis_key("flood_risk", "Lyon") != analysis_key("heat_wave", "Lyon")
@@ -0,0 +1,28 @@
+"""
+Test du budget de démarrage du backend (temps d'import de `api`).
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from import_time import DEFAULT_BUDGET_S, deferred_imports, measure, project_self_time
+
+BUDGET_S = float(os.getenv("REVAGENT_STARTUP_BUDGET_S", DEFAULT_BUDGET_S))
+
+
+def test_startup_budget():
+    """L'import de l'API reste sous le budget et ne charge ni sous-agents ni geodata."""
+    modules = measure("api")
+
+    own = project_self_time(modules)
+    assert own <= BUDGET_S, f"Project import time {own:.2f}s over the {BUDGET_S:.2f}s budget"
+
+    deferred = deferred_imports(modules)
+    assert not deferred, f"Modules imported at startup instead of on first use: {deferred}"
+
+
+if __name__ == "__main__":
+    test_startup_budget()
+    print("✅ Startup within budget")
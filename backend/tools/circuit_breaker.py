@@ -0,0 +1,150 @@
+"""
+Circuit breaker for remote services (Mapbox geocoding).
+
+When a remote service is down or very slow, every call waits for its full
+timeout and the agent often retries. The breaker watches the last calls and
+opens when too many of them failed or were slow; while open, callers skip the
+service at once and use their local fallback. After `open_s` seconds it lets
+a single probe call through (half-open): a success closes it again, a failure
+reopens it.
+
+allow() returns a ticket to pass back to record(). Only the outcomes of calls
+admitted in the current state move the breaker: a slow call admitted while
+closed that ends after the circuit opened, or during the probe, is counted
+but does not close or reopen it.
+
+    ticket = breaker.allow()
+    if ticket is not None:
+        started = time.monotonic()
+        try:
+            result = call_service()
+        except Exception:
+            breaker.record(ticket, False, time.monotonic() - started)
+            raise
+        breaker.record(ticket, True, time.monotonic() - started)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Ticket:
+    """Admission of one call by CircuitBreaker.allow(), passed back to record()."""
+
+    __slots__ = ("epoch", "probe")
+
+    def __init__(self, epoch: int, probe: bool):
+        self.epoch = epoch
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """
+    Error-rate and latency circuit breaker (thread-safe: sync tools run in threads).
+
+    Args:
+        name: Service name (logs, metrics)
+        error_rate: Share of failed or slow calls, among the last `window`, that opens the circuit
+        slow_call_s: A successful call slower than this counts as a failure
+        min_calls: Calls observed before the error rate is considered
+        open_s: Time spent open before a probe call is allowed
+        window: Number of recent calls observed
+    """
+
+    def __init__(self, name: str, error_rate: float = 0.5, slow_call_s: float = 2.0, min_calls: int = 5,
+                 open_s: float = 30.0, window: int = 20):
+        self.name = name
+        self.error_rate = error_rate
+        self.slow_call_s = slow_call_s
+        self.min_calls = min_calls
+        self.open_s = open_s
+        self.state = CLOSED
+        self._calls: Deque[bool] = deque(maxlen=window)  # True: failed or slow
+        self._opened_at = 0.0
+        self._epoch = 0  # Incremented on every state change
+        self._probe: Optional[Ticket] = None
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.short_circuited = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+            self._set_state(HALF_OPEN)
+
+    def available(self) -> bool:
+        """True if allow() would admit a call right now (without admitting it)."""
+        with self._lock:
+            self._refresh()
+            return self.state == CLOSED or (self.state == HALF_OPEN and self._probe is None)
+
+    def allow(self) -> Optional[Ticket]:
+        """
+        A ticket if a call may go to the service (closed, or the half-open
+        probe), else None.
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == CLOSED:
+                return Ticket(self._epoch, False)
+            if self.state == HALF_OPEN and self._probe is None:
+                self._probe = Ticket(self._epoch, True)
+                return self._probe
+            self.short_circuited += 1
+            return None
+
+    def record(self, ticket: Ticket, success: bool, elapsed_s: float):
+        """Records the outcome of a call admitted by allow()."""
+        slow = success and elapsed_s > self.slow_call_s
+        bad = not success or slow
+        with self._lock:
+            self.failures += not success
+            self.slow_calls += slow
+            if ticket.epoch != self._epoch:
+                return  # Admitted before the last state change
+            if ticket.probe:
+                if ticket is self._probe:
+                    if bad:
+                        self._open()
+                    else:
+                        self._set_state(CLOSED)
+                        self._calls.clear()
+                        print(f"[DEBUG] Circuit {self.name} closed")
+                return
+            self._calls.append(bad)
+            if len(self._calls) >= self.min_calls and sum(self._calls) / len(self._calls) >= self.error_rate:
+                self._open()
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._epoch += 1
+        self._probe = None
+
+    def _open(self):
+        self._set_state(OPEN)
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        print(f"[DEBUG] Circuit {self.name} open for {self.open_s:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the state and counters of the breaker."""
+        with self._lock:
+            reopen_in: Optional[float] = None
+            if self.state == OPEN:
+                reopen_in = round(max(0.0, self.open_s - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self.state,
+                "recent_error_rate": round(sum(self._calls) / len(self._calls), 2) if self._calls else None,
+                "half_open_in_s": reopen_in,
+                "opened": self.opened,
+                "short_circuited": self.short_circuited,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+            }
@@ -4,14 +4,22 @@ Geocoding tool to convert addresses to geographic coordinates.
 
 from pydantic import BaseModel
 from agents.tool import function_tool
-from typing import Optional
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import asyncio
 import requests
+import threading
+import time
+
+from tools.circuit_breaker import CircuitBreaker
+from tools.map_actions import geocode_address as local_geocode_address, normalize_address
 
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
-API_KEY = os.getenv('MAPBOX_ACCESS_TOKEN')
+
+def _api_key() -> Optional[str]:
+    """Mapbox token, read at call time (the .env file is loaded by the entry point)."""
+    return os.getenv('MAPBOX_ACCESS_TOKEN')
 
 class GeocodeResult(BaseModel):
     """Result of geocoding an address."""
@@ -19,6 +27,58 @@ class GeocodeResult(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     found: bool = False
+    source: Optional[str] = None  # "mapbox", "cache" or "gazetteer"
+    degraded: bool = False  # Mapbox unavailable: answered from the local fallback
+
+
+# Mapbox is skipped (local gazetteer / cache) while too many recent calls failed or were slow
+mapbox_breaker = CircuitBreaker(
+    "mapbox",
+    error_rate=float(os.getenv("REVAGENT_GEOCODER_ERROR_RATE", "0.5")),
+    slow_call_s=float(os.getenv("REVAGENT_GEOCODER_SLOW_CALL_S", "2.0")),
+    min_calls=int(os.getenv("REVAGENT_GEOCODER_MIN_CALLS", "5")),
+    open_s=float(os.getenv("REVAGENT_GEOCODER_OPEN_S", "30")),
+)
+
+# Batch geocoding: concurrent Mapbox calls and their rate (shared by all the batches),
+# or the Mapbox batch API (REVAGENT_MAPBOX_BATCH=1, up to 1000 addresses per call)
+GEOCODE_CONCURRENCY = int(os.getenv("REVAGENT_GEOCODE_CONCURRENCY", "8"))
+GEOCODE_RATE_PER_S = float(os.getenv("REVAGENT_GEOCODE_RATE_PER_S", "10"))
+MAPBOX_BATCH_ENABLED = os.getenv("REVAGENT_MAPBOX_BATCH", "0") == "1"
+MAPBOX_BATCH_SIZE = 1000
+
+# Addresses found by Mapbox, keyed on the normalized address (least recently used evicted)
+GEOCODE_CACHE_SIZE = int(os.getenv("REVAGENT_GEOCODE_CACHE_SIZE", "1024"))
+_geocode_cache: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+_geocode_cache_lock = threading.Lock()
+
+
+def cached_geocode(address: str) -> Optional[GeocodeResult]:
+    """Result of an address already found by Mapbox, or None."""
+    key = normalize_address(address)
+    with _geocode_cache_lock:
+        coordinates = _geocode_cache.get(key)
+        if coordinates is None:
+            return None
+        _geocode_cache.move_to_end(key)
+    return GeocodeResult(address=address, latitude=coordinates[0], longitude=coordinates[1], found=True, source="cache")
+
+
+def _remember(address: str, latitude: float, longitude: float):
+    key = normalize_address(address)
+    with _geocode_cache_lock:
+        _geocode_cache[key] = (latitude, longitude)
+        _geocode_cache.move_to_end(key)
+        while len(_geocode_cache) > GEOCODE_CACHE_SIZE:
+            _geocode_cache.popitem(last=False)
+
+
+def local_geocode(address: str) -> GeocodeResult:
+    """Degraded result from the local gazetteer (Mapbox unavailable)."""
+    coordinates = local_geocode_address(address)
+    if coordinates is None:
+        return GeocodeResult(address=address, found=False, source="gazetteer", degraded=True)
+    return GeocodeResult(address=address, latitude=coordinates[0], longitude=coordinates[1], found=True, source="gazetteer", degraded=True)
 
 @function_tool
 def geocode_address(address: str) -> GeocodeResult:
@@ -31,34 +91,203 @@ def geocode_address(address: str) -> GeocodeResult:
     Returns:
         GeocodeResult: Object containing coordinates
     """
+    return geocode(address)
+
+
+def geocode(address: str) -> GeocodeResult:
+    """
+    Geocodes an address (plain function, usable outside the agents): cache,
+    then Mapbox, then the local gazetteer when Mapbox fails or its circuit is open.
+    """
+    cached = cached_geocode(address)
+    if cached is not None:
+        return cached
+    
+    # Use the Mapbox token for geocoding service
+    api_key = _api_key()
+    if not api_key:
+        return GeocodeResult(address=address, found=False)
+    ticket = mapbox_breaker.allow()
+    if ticket is None:
+        print(f"[DEBUG] Mapbox circuit open, local geocoding for: {address}")
+        return local_geocode(address)
+    
+    started = time.monotonic()
     try:
-        # Use API_KEY for geocoding service
-        if API_KEY:
-            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{address}.json"
-            params = {
-                'access_token': API_KEY,
-                'limit': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get('features') and len(data['features']) > 0:
-                feature = data['features'][0]
-                coordinates = feature['geometry']['coordinates']
-                
-                return GeocodeResult(
-                    address=address,
-                    latitude=coordinates[1],
-                    longitude=coordinates[0],
-                    found=True
-                )
+        url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{address}.json"
+        params = {
+            'access_token': api_key,
+            'limit': 1
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        response.raise_for_status()
+        
+        data = response.json()
     except Exception as e:
+        mapbox_breaker.record(ticket, False, time.monotonic() - started)
         print(f"Geocoding failed: {e}")
+        return local_geocode(address)
+    mapbox_breaker.record(ticket, True, time.monotonic() - started)
+    
+    if data.get('features') and len(data['features']) > 0:
+        feature = data['features'][0]
+        coordinates = feature['geometry']['coordinates']
+        _remember(address, coordinates[1], coordinates[0])
+        
+        return GeocodeResult(
+            address=address,
+            latitude=coordinates[1],
+            longitude=coordinates[0],
+            found=True,
+            source="mapbox"
+        )
     
-    return GeocodeResult(address=address, found=False)
+    return GeocodeResult(address=address, found=False, source="mapbox")
+
+class RateLimiter:
+    """Spaces calls to at most `rate_per_s` per second, across concurrent callers."""
+
+    def __init__(self, rate_per_s: float):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+mapbox_rate = RateLimiter(GEOCODE_RATE_PER_S)
+
+
+async def _geocode_one(address: str, semaphore: asyncio.Semaphore) -> GeocodeResult:
+    async with semaphore:
+        # Only the calls that will reach Mapbox count against its rate limit
+        if _api_key() and mapbox_breaker.available():
+            await mapbox_rate.acquire()
+        return await asyncio.to_thread(geocode, address)
+
+
+def geocode_batch(addresses: Sequence[str]) -> Optional[List[GeocodeResult]]:
+    """
+    Geocodes up to MAPBOX_BATCH_SIZE addresses in one call to the Mapbox batch API.
+
+    Returns:
+        One result per address, or None if Mapbox is unavailable (circuit open, error)
+    """
+    api_key = _api_key()
+    if not api_key:
+        return None
+    ticket = mapbox_breaker.allow()
+    if ticket is None:
+        return None
+    
+    started = time.monotonic()
+    try:
+        response = requests.post(
+            "https://api.mapbox.com/search/geocode/v6/batch",
+            params={'access_token': api_key},
+            json=[{'q': address, 'limit': 1} for address in addresses],
+            timeout=30,
+        )
+        response.raise_for_status()
+        
+        collections = response.json()['batch']
+    except Exception as e:
+        mapbox_breaker.record(ticket, False, 0.0)
+        print(f"Batch geocoding failed: {e}")
+        return None
+    # One call for the whole batch: its latency is not comparable to a single lookup
+    mapbox_breaker.record(ticket, True, (time.monotonic() - started) / max(1, len(addresses)))
+    
+    results = []
+    for address, collection in zip(addresses, collections):
+        features = collection.get('features') or []
+        if features:
+            coordinates = features[0]['geometry']['coordinates']
+            _remember(address, coordinates[1], coordinates[0])
+            results.append(GeocodeResult(address=address, latitude=coordinates[1], longitude=coordinates[0], found=True, source="mapbox"))
+        else:
+            results.append(GeocodeResult(address=address, found=False, source="mapbox"))
+    return results
+
+
+async def _geocode_chunk(addresses: List[str], semaphore: asyncio.Semaphore) -> List[GeocodeResult]:
+    """Batch API call for a chunk, falling back to one lookup per address."""
+    results = await asyncio.to_thread(geocode_batch, addresses)
+    if results is None:
+        results = await asyncio.gather(*(_geocode_one(address, semaphore) for address in addresses))
+    return list(results)
+
+
+async def _nth(chunk: "asyncio.Task[List[GeocodeResult]]", index: int) -> GeocodeResult:
+    return (await chunk)[index]
+
+
+async def geocode_many(
+    addresses: Sequence[str],
+    concurrency: int = GEOCODE_CONCURRENCY,
+    use_batch: bool = MAPBOX_BATCH_ENABLED,
+) -> AsyncIterator[GeocodeResult]:
+    """
+    Geocodes many addresses, yielding the results in input order.
+    
+    Addresses are normalized and deduplicated (one lookup per normalized
+    address), cached ones are answered at once, and the others are sent to
+    Mapbox concurrently under the shared rate limit (or through its batch API).
+    A result is yielded as soon as it and all the results before it are known.
+    
+    Args:
+        addresses: Addresses to geocode (duplicates allowed)
+        concurrency: Lookups running at the same time
+        use_batch: Use the Mapbox batch API instead of one call per address
+        
+    Yields:
+        GeocodeResult: One per input address, with the address as given
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    keys = [normalize_address(address) for address in addresses]
+    unique: Dict[str, str] = {}
+    for address, key in zip(addresses, keys):
+        unique.setdefault(key, address)
+    
+    lookups: Dict[str, "asyncio.Future[GeocodeResult]"] = {}
+    missing = []
+    for key, address in unique.items():
+        cached = cached_geocode(address)
+        if cached is not None:
+            lookups[key] = loop.create_future()
+            lookups[key].set_result(cached)
+        else:
+            missing.append(key)
+    
+    chunks = []
+    if use_batch and _api_key():
+        for start in range(0, len(missing), MAPBOX_BATCH_SIZE):
+            chunk_keys = missing[start:start + MAPBOX_BATCH_SIZE]
+            chunk = asyncio.ensure_future(_geocode_chunk([unique[key] for key in chunk_keys], semaphore))
+            chunks.append(chunk)
+            for index, key in enumerate(chunk_keys):
+                lookups[key] = asyncio.ensure_future(_nth(chunk, index))
+    else:
+        for key in missing:
+            lookups[key] = asyncio.ensure_future(_geocode_one(unique[key], semaphore))
+    print(f"[DEBUG] geocode_many: {len(addresses)} addresses, {len(unique)} unique, {len(unique) - len(missing)} cached")
+    
+    try:
+        for address, key in zip(addresses, keys):
+            result = await lookups[key]
+            yield result if result.address == address else result.model_copy(update={"address": address})
+    finally:
+        # Consumer gone (client disconnected): drop the lookups not started yet
+        for lookup in [*lookups.values(), *chunks]:
+            if not lookup.done():
+                lookup.cancel()
+
 
 @function_tool
 def geocode_structured_address(
@@ -86,7 +315,7 @@ def geocode_structured_address(
         address_parts.append(country.strip())
     
     full_address = ", ".join(address_parts)
-    return geocode_address(full_address)
+    return geocode(full_address)
 
 
 
@@ -103,67 +332,69 @@ def reverse_geocode(latitude: float, longitude: float) -> GeocodeResult:
     Returns:
         GeocodeResult: Object containing the address
     """
+    api_key = _api_key()
+    if not api_key:
+        return GeocodeResult(address="", found=False)
+    # No local reverse geocoding: answer "not found" at once while Mapbox is unavailable
+    ticket = mapbox_breaker.allow()
+    if ticket is None:
+        return GeocodeResult(address="", latitude=latitude, longitude=longitude, found=False, degraded=True)
+    
+    started = time.monotonic()
     try:
-        if API_KEY:
-            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{longitude},{latitude}.json"
-            params = {
-                'access_token': API_KEY,
-                'limit': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get('features') and len(data['features']) > 0:
-                feature = data['features'][0]
-                place_name = feature.get('place_name', '')
-                
-                return GeocodeResult(
-                    address=place_name,
-                    latitude=latitude,
-                    longitude=longitude,
-                    found=True
-                )
+        url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{longitude},{latitude}.json"
+        params = {
+            'access_token': api_key,
+            'limit': 1
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        response.raise_for_status()
+        
+        data = response.json()
     except Exception as e:
+        mapbox_breaker.record(ticket, False, time.monotonic() - started)
         print(f"Reverse geocoding failed: {e}")
+        return GeocodeResult(address="", latitude=latitude, longitude=longitude, found=False, degraded=True)
+    mapbox_breaker.record(ticket, True, time.monotonic() - started)
+    
+    if data.get('features') and len(data['features']) > 0:
+        feature = data['features'][0]
+        place_name = feature.get('place_name', '')
+        
+        return GeocodeResult(
+            address=place_name,
+            latitude=latitude,
+            longitude=longitude,
+            found=True,
+            source="mapbox"
+        )
     
-    return GeocodeResult(address="", found=False)
+    return GeocodeResult(address="", found=False, source="mapbox")
 
 
 def _test_geocode_address(address: str) -> GeocodeResult:
     """Version de test sans décorateur"""
-    try:
-        if API_KEY:
-            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{address}.json"
-            params = {
-                'access_token': API_KEY,
-                'limit': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get('features') and len(data['features']) > 0:
-                feature = data['features'][0]
-                coordinates = feature['geometry']['coordinates']
-                
-                return GeocodeResult(
-                    address=address,
-                    latitude=coordinates[1],
-                    longitude=coordinates[0],
-                    found=True
-                )
-    except Exception as e:
-        print(f"Geocoding failed: {e}")
-    
-    return GeocodeResult(address=address, found=False)
+    return geocode(address)
+
+
+def locate(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Returns (latitude, longitude) of an address: cache or Mapbox when
+    configured, otherwise (or if not found) the local gazetteer.
+    """
+    result = geocode(address)
+    if result.found:
+        return result.latitude, result.longitude
+    if result.source == "gazetteer":
+        return None  # Gazetteer already tried (Mapbox unavailable)
+    return local_geocode_address(address)
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     # Test avec l'adresse demandée
     result = _test_geocode_address("20 rue ernestine a paris")
     print(f"Adresse testée: 20 rue ernestine a paris")
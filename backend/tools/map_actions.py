@@ -5,8 +5,6 @@ Tools pour manipuler la carte côté frontend via l'agent.
 from pydantic import BaseModel
 from agents.tool import function_tool
 from typing import List, Dict, Any, Optional
-import requests
-import json
 
 # Global variable pour stocker les actions de carte courantes
 _current_map_actions: List[Dict[str, Any]] = []
@@ -157,6 +155,11 @@ def navigate_to_address(
         address: Adresse à rechercher (ex: "123 rue de Rivoli, Paris")
         zoom_level: Niveau de zoom (1-20)
     """
+    return navigate_to_address_action(address, zoom_level)
+
+
+def navigate_to_address_action(address: str, zoom_level: int = 15) -> MapAction:
+    """Implémentation de navigate_to_address, appelable hors de l'agent."""
     print(f"[DEBUG] navigate_to_address called: {address}")
     
     # Simuler la géocodage pour obtenir les coordonnées
@@ -205,6 +208,17 @@ def search_properties(
         min_rooms: Nombre minimum de pièces
         search_radius_km: Rayon de recherche en km
     """
+    return search_properties_action(max_price, location, property_type, min_rooms, search_radius_km)
+
+
+def search_properties_action(
+    max_price: int,
+    location: str = "Paris",
+    property_type: str = "appartement",
+    min_rooms: int = 1,
+    search_radius_km: float = 2.0
+) -> MapAction:
+    """Implémentation de search_properties, appelable hors de l'agent."""
     print(f"[DEBUG] search_properties called: max_price={max_price}, location={location}")
     
     # Simuler une recherche de propriétés
@@ -287,11 +301,12 @@ def search_properties_in_zone(
         num_properties=25  # Plus de propriétés générées
     )
     
-    # Filtrer les propriétés qui sont dans le polygone dessiné
+    # Filtrer les propriétés qui sont dans le polygone dessiné (test vectorisé sur le polygone préparé)
+    polygon = prepared_zone(zone_coordinates)
     properties_in_zone = []
-    for prop in all_properties:
-        if is_point_in_polygon(prop["longitude"], prop["latitude"], zone_coordinates):
-            properties_in_zone.append(prop)
+    if polygon is not None and all_properties:
+        inside = polygon.contains_many([prop["longitude"] for prop in all_properties], [prop["latitude"] for prop in all_properties])
+        properties_in_zone = [prop for prop, is_inside in zip(all_properties, inside) if is_inside]
     
     # Convertir en markers pour la carte
     markers = []
@@ -330,6 +345,11 @@ def clear_map_markers() -> MapAction:
     """
     Efface tous les marqueurs de la carte.
     """
+    return clear_map_markers_action()
+
+
+def clear_map_markers_action() -> MapAction:
+    """Implémentation de clear_map_markers, appelable hors de l'agent."""
     print("[DEBUG] clear_map_markers called")
     
     action_result = MapAction(
@@ -372,13 +392,63 @@ def analyze_drawn_area(
     print(f"[DEBUG] analyze_drawn_area called for: {location_address}")
     print(f"[DEBUG] Area center: {area_center}, Size: {area_size_km2} km²")
     
-    lng, lat = area_center
+    # Données locales (numpy) importées à la première analyse, pas au démarrage
+    from geodata.flood_overlay import get_flood_overlay
+    from geodata.gtfs import get_transport_engine
+    from geodata.isochrones import get_walking_grid, walking_score
+    from geodata.poi_index import get_poi_index
+    from agentX.sections import publish_section
     
-    # Analyser les points d'intérêt dans la zone
-    points_of_interest = analyze_points_of_interest(lng, lat, area_size_km2)
+    lng, lat = area_center
     
-    # Analyser les éléments urbains proches
-    nearby_elements = analyze_nearby_elements(lng, lat, area_size_km2)
+    # Polygone nettoyé / simplifié / réparé, et surface calculée côté serveur
+    polygon = prepared_zone(coordinates)
+    if polygon is not None:
+        area_size_km2 = round(polygon.area_km2, 4)
+        print(f"[DEBUG] Prepared polygon: {polygon.summary()}")
+    
+    poi_index = get_poi_index()
+    if poi_index is not None and polygon is not None:
+        # Comptages réels dans le polygone à partir de l'index POI local (une seule passe)
+        poi_analysis = poi_index.analyze_polygon(polygon.array, (lng, lat), area_size_km2)
+        points_of_interest = poi_analysis["points_of_interest"]
+        nearby_elements = poi_analysis["nearby_elements"]
+        infrastructure_analysis = infrastructure_from_pois(poi_analysis)
+        print(f"[DEBUG] POI index: {poi_analysis['total']} POIs in the drawn area")
+    else:
+        # Analyser les points d'intérêt dans la zone
+        points_of_interest = analyze_points_of_interest(lng, lat, area_size_km2)
+        
+        # Analyser les éléments urbains proches
+        nearby_elements = analyze_nearby_elements(lng, lat, area_size_km2)
+        
+        # Analyse d'infrastructure
+        infrastructure_analysis = analyze_infrastructure(lng, lat, area_size_km2)
+    
+    # Desserte en transports en commun depuis les données GTFS locales
+    transport_engine = get_transport_engine()
+    if transport_engine is not None:
+        transportation = transport_engine.analyze(lat, lng, polygon=polygon.array if polygon is not None else None)
+        # Section transports envoyée tout de suite au client (streaming par sections)
+        publish_section("transportation", transportation)
+        infrastructure_analysis = dict(
+            infrastructure_analysis,
+            public_transport_score=transportation.public_transport_score,
+            transport_options=[option.model_dump(mode="json") for option in transportation.transport_options],
+        )
+    
+    # Temps de marche jusqu'au métro / RER le plus proche (grille précalculée)
+    walking_grid = get_walking_grid()
+    if walking_grid is not None and polygon is not None:
+        walk_minutes, coverage = walking_grid.zone_mean(polygon.array)
+        infrastructure_analysis = dict(
+            infrastructure_analysis,
+            walk_minutes_to_station=round(walk_minutes, 1) if walk_minutes is not None else None,
+            walk_minutes_coverage=round(coverage, 2),
+        )
+        # Pas de score si la grille ne couvre pas la zone (l'agent l'estime)
+        if walk_minutes is not None:
+            infrastructure_analysis["walking_score"] = walking_score(walk_minutes)
     
     # Analyse démographique simulée
     demographic_insights = get_demographic_insights(lng, lat, location_address)
@@ -386,8 +456,17 @@ def analyze_drawn_area(
     # Évaluation des risques
     risk_assessment = assess_area_risks(lng, lat, area_size_km2)
     
-    # Analyse d'infrastructure
-    infrastructure_analysis = analyze_infrastructure(lng, lat, area_size_km2)
+    # Part de la zone dans chaque scénario d'inondation (cartes TRI locales)
+    flood_overlay = get_flood_overlay()
+    if flood_overlay is not None and polygon is not None:
+        flood_risk = flood_overlay.flood_risk(polygon.coordinates)
+        if flood_risk is not None:
+            publish_section("flood_risk", flood_risk)
+            risk_assessment = dict(
+                risk_assessment,
+                flood_risk=flood_risk.risk_level.value,
+                flood_zone_coverage=[coverage.model_dump() for coverage in flood_risk.flood_zone_coverage],
+            )
     
     return AreaAnalysis(
         area_center=area_center,
@@ -401,6 +480,26 @@ def analyze_drawn_area(
     )
 
 
+def prepared_zone(coordinates: List[List[float]]):
+    """
+    Polygone préparé d'une zone : celui de la requête en cours s'il existe
+    (préparé une seule fois par /analyze-area), sinon préparé à partir des coordonnées.
+    
+    Returns:
+        PreparedPolygon, ou None si le polygone est invalide
+    """
+    from geodata.geometry import current_polygon, prepare_polygon
+    
+    polygon = current_polygon()
+    if polygon is not None:
+        return polygon
+    try:
+        return prepare_polygon(coordinates)
+    except ValueError as e:
+        print(f"[DEBUG] Invalid polygon: {e}")
+        return None
+
+
 def analyze_points_of_interest(lng: float, lat: float, radius_km: float) -> List[Dict[str, Any]]:
     """Analyse les points d'intérêt dans la zone."""
     # Version simplifiée avec moins de détails
@@ -458,97 +557,129 @@ def analyze_infrastructure(lng: float, lat: float, radius_km: float) -> Dict[str
     }
 
 
+def infrastructure_from_pois(poi_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Dérive l'analyse d'infrastructure des comptages de l'index POI."""
+    by_type = {poi["type"]: poi for poi in poi_analysis["points_of_interest"]}
+    transport = by_type.get("transport", {})
+    nearest_transport = transport.get("distance_km")
+    
+    if nearest_transport is None:
+        transport_score = "Faible"
+    elif nearest_transport <= 0.3 and transport.get("count", 0) >= 3:
+        transport_score = "Excellent"
+    elif nearest_transport <= 0.6:
+        transport_score = "Bon"
+    elif nearest_transport <= 1.2:
+        transport_score = "Moyen"
+    else:
+        transport_score = "Faible"
+    
+    return {
+        "transport_score": transport_score,
+        "transport_stops": transport.get("count", 0),
+        "nearest_transport_km": nearest_transport,
+        "commerces": by_type.get("commerces", {}).get("count", 0),
+        "services": by_type.get("services", {}).get("count", 0),
+        "education": by_type.get("education", {}).get("count", 0),
+        "sante": by_type.get("sante", {}).get("count", 0),
+    }
+
+
+def normalize_address(address: str) -> str:
+    """
+    Normalise une adresse pour la comparaison : minuscules, sans accents,
+    tirets/underscores remplacés par des espaces, espaces multiples réduits.
+    """
+    import unicodedata
+    normalized = unicodedata.normalize('NFD', address.lower().strip())
+    normalized = ''.join(c for c in normalized if unicodedata.category(c) != 'Mn')
+    normalized = normalized.replace('-', ' ').replace('_', ' ')
+    return ' '.join(normalized.split())  # Normaliser les espaces multiples
+
+
+# Base de données simulée d'adresses (gazetteer local)
+ADDRESS_DB = {
+    # Paris
+    "paris": (48.8566, 2.3522),
+    "république paris": (48.8676, 2.3631),
+    "bastille paris": (48.8532, 2.3693),
+    "châtelet paris": (48.8606, 2.3471),
+    "louvre paris": (48.8606, 2.3376),
+    "notre-dame paris": (48.8530, 2.3499),
+    "tour eiffel paris": (48.8584, 2.2945),
+    "champs-élysées paris": (48.8698, 2.3076),
+    "montmartre paris": (48.8867, 2.3431),
+    "marais paris": (48.8566, 2.3522),
+    
+    # Autres villes
+    "lyon": (45.7640, 4.8357),
+    "marseille": (43.2965, 5.3698),
+    "toulouse": (43.6047, 1.4442),
+    "nice": (43.7102, 7.2620),
+    "nantes": (47.2184, -1.5536),
+    "strasbourg": (48.5734, 7.7521),
+    "montpellier": (43.6119, 3.8772),
+    "bordeaux": (44.8378, -0.5792),
+    
+    # Banlieue parisienne
+    "epinay sur seine": (48.9537, 2.3177),
+    "epinay-sur-seine": (48.9537, 2.3177),  
+    "saint-denis": (48.9356, 2.3539),
+    "aubervilliers": (48.9145, 2.3837),
+    "la courneuve": (48.9278, 2.3919),
+    "stains": (48.9556, 2.3864),
+    "villetaneuse": (48.9604, 2.3434),
+    "pierrefitte sur seine": (48.9648, 2.3619),
+    "villepinte": (48.9548, 2.5434),
+    "aulnay sous bois": (48.9344, 2.4947),
+    "sevran": (48.9417, 2.5331),
+    "livry gargan": (48.9192, 2.5331),
+    "clichy sous bois": (48.9044, 2.5497),
+    "montfermeil": (48.8997, 2.5836),
+    "neuilly sur marne": (48.8597, 2.5308),
+    "gournay sur marne": (48.8636, 2.5747),
+    "chelles": (48.8772, 2.5908),
+    "vaires sur marne": (48.8736, 2.6356),
+    "torcy": (48.8506, 2.6536),
+    "noisiel": (48.8497, 2.6203),
+    "lognes": (48.8331, 2.6331),
+    "bailly romainvilliers": (48.8431, 2.8214),
+    "meaux": (48.9606, 2.8789),
+    
+    # Arrondissements de Paris
+    "75001": (48.8606, 2.3376),  # 1er arrondissement
+    "75002": (48.8696, 2.3411),  # 2ème arrondissement
+    "75003": (48.8630, 2.3596),  # 3ème arrondissement
+    "75004": (48.8566, 2.3522),  # 4ème arrondissement
+    "75011": (48.8555, 2.3765),  # 11ème arrondissement
+    "75020": (48.8631, 2.3969),  # 20ème arrondissement
+}
+
+
+
 def geocode_address(address: str) -> Optional[tuple]:
     """
     Simule le géocodage d'une adresse pour obtenir lat/lng.
     Dans une vraie implémentation, utiliser l'API Mapbox Geocoding.
     """
-    # Base de données simulée d'adresses
-    address_db = {
-        # Paris
-        "paris": (48.8566, 2.3522),
-        "république paris": (48.8676, 2.3631),
-        "bastille paris": (48.8532, 2.3693),
-        "châtelet paris": (48.8606, 2.3471),
-        "louvre paris": (48.8606, 2.3376),
-        "notre-dame paris": (48.8530, 2.3499),
-        "tour eiffel paris": (48.8584, 2.2945),
-        "champs-élysées paris": (48.8698, 2.3076),
-        "montmartre paris": (48.8867, 2.3431),
-        "marais paris": (48.8566, 2.3522),
-        
-        # Autres villes
-        "lyon": (45.7640, 4.8357),
-        "marseille": (43.2965, 5.3698),
-        "toulouse": (43.6047, 1.4442),
-        "nice": (43.7102, 7.2620),
-        "nantes": (47.2184, -1.5536),
-        "strasbourg": (48.5734, 7.7521),
-        "montpellier": (43.6119, 3.8772),
-        "bordeaux": (44.8378, -0.5792),
-        
-        # Banlieue parisienne
-        "epinay sur seine": (48.9537, 2.3177),
-        "epinay-sur-seine": (48.9537, 2.3177),  
-        "saint-denis": (48.9356, 2.3539),
-        "aubervilliers": (48.9145, 2.3837),
-        "la courneuve": (48.9278, 2.3919),
-        "stains": (48.9556, 2.3864),
-        "villetaneuse": (48.9604, 2.3434),
-        "pierrefitte sur seine": (48.9648, 2.3619),
-        "villepinte": (48.9548, 2.5434),
-        "aulnay sous bois": (48.9344, 2.4947),
-        "sevran": (48.9417, 2.5331),
-        "livry gargan": (48.9192, 2.5331),
-        "clichy sous bois": (48.9044, 2.5497),
-        "montfermeil": (48.8997, 2.5836),
-        "neuilly sur marne": (48.8597, 2.5308),
-        "gournay sur marne": (48.8636, 2.5747),
-        "chelles": (48.8772, 2.5908),
-        "vaires sur marne": (48.8736, 2.6356),
-        "torcy": (48.8506, 2.6536),
-        "noisiel": (48.8497, 2.6203),
-        "lognes": (48.8331, 2.6331),
-        "bailly romainvilliers": (48.8431, 2.8214),
-        "meaux": (48.9606, 2.8789),
-        
-        # Arrondissements de Paris
-        "75001": (48.8606, 2.3376),  # 1er arrondissement
-        "75002": (48.8696, 2.3411),  # 2ème arrondissement
-        "75003": (48.8630, 2.3596),  # 3ème arrondissement
-        "75004": (48.8566, 2.3522),  # 4ème arrondissement
-        "75011": (48.8555, 2.3765),  # 11ème arrondissement
-        "75020": (48.8631, 2.3969),  # 20ème arrondissement
-    }
-    
-    # Normaliser l'adresse pour la recherche
-    normalized_address = address.lower().strip()
-    
-    # Nettoyer l'adresse : supprimer les accents et normaliser les espaces/tirets
-    import unicodedata
-    normalized_address = unicodedata.normalize('NFD', normalized_address)
-    normalized_address = ''.join(c for c in normalized_address if unicodedata.category(c) != 'Mn')
-    normalized_address = normalized_address.replace('-', ' ').replace('_', ' ')
-    normalized_address = ' '.join(normalized_address.split())  # Normaliser les espaces multiples
+    # Normaliser l'adresse pour la recherche (accents, espaces, tirets)
+    normalized_address = normalize_address(address)
     
     # Recherche exacte
-    if normalized_address in address_db:
-        return address_db[normalized_address]
+    if normalized_address in ADDRESS_DB:
+        return ADDRESS_DB[normalized_address]
     
     # Recherche partielle avec normalisation
-    for key, coords in address_db.items():
+    for key, coords in ADDRESS_DB.items():
         # Normaliser la clé de la même façon
-        normalized_key = unicodedata.normalize('NFD', key)
-        normalized_key = ''.join(c for c in normalized_key if unicodedata.category(c) != 'Mn')
-        normalized_key = normalized_key.replace('-', ' ').replace('_', ' ')
-        normalized_key = ' '.join(normalized_key.split())
+        normalized_key = normalize_address(key)
         
         if normalized_key in normalized_address or normalized_address in normalized_key:
             return coords
     
     # Recherche encore plus flexible - mots-clés
     address_words = normalized_address.split()
-    for key, coords in address_db.items():
+    for key, coords in ADDRESS_DB.items():
         key_words = key.replace('-', ' ').replace('_', ' ').split()
         # Si au moins 2 mots correspondent (ou 1 si c'est un mot long)
         matches = sum(1 for word in address_words if any(word in key_word or key_word in word for key_word in key_words))
@@ -578,6 +709,7 @@ def simulate_property_search(
     
     # Générer des propriétés simulées
     import random
+    from geodata.spatial import random_point_in_radius
     
     properties = []
     num_properties = random.randint(3, 12)  # Entre 3 et 12 propriétés
@@ -591,14 +723,8 @@ def simulate_property_search(
     ]
     
     for i in range(num_properties):
-        # Générer des coordonnées dans le rayon de recherche
-        import math
-        # Offset aléatoire dans le rayon
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, radius_km / 111.0)  # Conversion approximative km -> degrés
-        
-        lat = center_lat + distance * math.cos(angle)
-        lng = center_lng + distance * math.sin(angle)
+        # Générer des coordonnées dans le rayon de recherche (uniformes dans le disque)
+        lat, lng = random_point_in_radius(center_lat, center_lng, radius_km)
         
         # Générer les caractéristiques de la propriété
         rooms = random.randint(min_rooms, min_rooms + 3)
@@ -681,7 +807,7 @@ def generate_properties_in_area(
     Génère des propriétés dans une zone circulaire.
     """
     import random
-    import math
+    from geodata.spatial import random_point_in_radius
     
     properties = []
     
@@ -695,12 +821,8 @@ def generate_properties_in_area(
     ]
     
     for i in range(num_properties):
-        # Générer des coordonnées dans le rayon
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, radius_km / 111.0)  # Conversion approximative km -> degrés
-        
-        lat = center_lat + distance * math.cos(angle)
-        lng = center_lng + distance * math.sin(angle)
+        # Générer des coordonnées dans le rayon (uniformes dans le disque)
+        lat, lng = random_point_in_radius(center_lat, center_lng, radius_km)
         
         # Générer les caractéristiques de la propriété
         rooms = random.randint(min_rooms, min_rooms + 4)